@@ -0,0 +1,216 @@
+"""
+OASIS Forum - Context policy: which posts an expert sees in its prompt
+
+By default every visible post is rendered into the prompt (_format_posts).
+In long repeat discussions with many experts that grows without bound. A
+schedule can declare a context policy (top-level YAML "context"):
+
+  context:
+    max_tokens: 3000        # budget for the forum section of one expert call (0 = no budget)
+    recent: 5               # always keep the last N posts
+    top_k: 8                # highest-scoring posts (upvotes - downvotes)
+    latest_per_author: true # each author's latest post
+    reply_neighbours: true  # posts replying to the expert, and posts it replied to
+    summaries: extract      # omitted posts of finished rounds → per-round summary:
+                            #   extract (first sentence per post, no LLM) / llm / off
+
+The policy applies uniformly to ExpertAgent, SessionExpert and
+ExternalExpert (first-call context and incremental deltas). When the full
+rendering already fits max_tokens, it is sent unchanged.
+
+Selected posts keep their original format and chronological order; omitted
+posts of finished rounds are replaced by one summary line per round. A
+summary covers only the omitted posts the viewer could see (so it never
+leaks posts hidden by visible_authors / from_round filtering) and is
+computed once per forum, round and set of omitted posts (single-flight,
+not persisted).
+"""
+
+import asyncio
+import heapq
+import re
+import weakref
+from dataclasses import dataclass
+
+SUMMARY_MODES = ("extract", "llm", "off")
+
+# Share of the budget reserved for round summaries (posts are chosen first)
+_SUMMARY_SHARE = 0.25
+# extract mode: characters kept per post
+_EXTRACT_CHARS = 60
+
+
+@dataclass
+class ContextPolicy:
+    """Parsed YAML "context" block."""
+    max_tokens: int = 0
+    recent: int = 5
+    top_k: int = 8
+    latest_per_author: bool = True
+    reply_neighbours: bool = True
+    summaries: str = "extract"
+
+
+def parse_context_policy(data) -> ContextPolicy | None:
+    """YAML "context" value → ContextPolicy (None when absent). Raises ValueError."""
+    if data is None or data is False:
+        return None
+    if data is True:
+        return ContextPolicy()
+    if not isinstance(data, dict):
+        raise ValueError("'context' must be a mapping")
+    unknown = set(data) - set(ContextPolicy.__dataclass_fields__)
+    if unknown:
+        raise ValueError(f"'context': unknown keys {sorted(unknown)}")
+    policy = ContextPolicy(
+        max_tokens=int(data.get("max_tokens", 0) or 0),
+        recent=int(data.get("recent", 5) or 0),
+        top_k=int(data.get("top_k", 8) or 0),
+        latest_per_author=bool(data.get("latest_per_author", True)),
+        reply_neighbours=bool(data.get("reply_neighbours", True)),
+        summaries=str(data.get("summaries", "extract")).strip().lower(),
+    )
+    if min(policy.max_tokens, policy.recent, policy.top_k) < 0:
+        raise ValueError("'context': max_tokens / recent / top_k must be >= 0")
+    if policy.summaries not in SUMMARY_MODES:
+        raise ValueError(f"'context.summaries' must be one of {', '.join(SUMMARY_MODES)}")
+    return policy
+
+
+# ── Selection ──
+
+def _select(policy: ContextPolicy, posts, viewer: str, forum) -> list:
+    """Posts to keep, in priority order (most important first, no duplicates)."""
+    ranked: dict[int, object] = {}
+
+    def keep(items):
+        for p in items:
+            ranked.setdefault(p.id, p)
+
+    if policy.reply_neighbours:
+        own = forum.posts_by(viewer)
+        own_ids = {p.id for p in own}
+        replied = {p.reply_to for p in own if p.reply_to is not None}
+        keep(p for p in reversed(posts) if p.reply_to in own_ids or p.id in replied)
+    if policy.recent:
+        keep(reversed(posts[-policy.recent:]))
+    if policy.latest_per_author:
+        seen: set[str] = set()
+        latest = []
+        for p in reversed(posts):
+            if p.author not in seen:
+                seen.add(p.author)
+                latest.append(p)
+        keep(latest)
+    if policy.top_k:
+        keep(heapq.nlargest(policy.top_k, posts, key=lambda p: (p.upvotes - p.downvotes, p.id)))
+    return list(ranked.values())
+
+
+# ── Round summaries ──
+
+# forum → (round_num, mode, frozenset of omitted post ids) → Future[str]
+_summaries: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _extract_summary(posts) -> str:
+    parts = []
+    for p in posts:
+        first = re.split(r"(?<=[。！？!?.])\s*|\n", p.content.strip(), maxsplit=1)[0]
+        if len(first) > _EXTRACT_CHARS:
+            first = first[:_EXTRACT_CHARS] + "…"
+        parts.append(f"{p.author.split('#', 1)[0]}: {first}")
+    return "；".join(parts)
+
+
+async def _llm_summary(forum, posts) -> str:
+    from oasis.experts import _format_posts, _get_llm, _llm_text
+    prompt = (
+        f"讨论主题: {forum.question}\n\n"
+        f"以下是论坛某一轮的部分发言：\n{_format_posts(posts)}\n\n"
+        "请用 2-4 句话概括这一轮的主要观点、分歧和共识，保留关键的帖子编号（#ID），不要加任何前言。"
+    )
+    return (await _llm_text(_get_llm(0.2), prompt, agent="context_summary")).strip()
+
+
+async def _round_summary(forum, round_num: int, mode: str, posts: list) -> str:
+    """Summary of `posts` (the omitted posts of a finished round), computed once per
+    forum and post set (concurrent callers share it)."""
+    cache = _summaries.setdefault(forum, {})
+    key = (round_num, mode, frozenset(p.id for p in posts))
+    pending = cache.get(key)
+    if pending is not None:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # 生成摘要的专家被取消：自行生成
+    future = asyncio.get_running_loop().create_future()
+    cache[key] = future
+    try:
+        text = _extract_summary(posts)
+        if mode == "llm":
+            try:
+                text = await _llm_summary(forum, posts) or text
+            except Exception as e:
+                print(f"  [OASIS] ⚠️ round {round_num} summary failed, using extract: {e}")
+    except BaseException:
+        del cache[key]
+        future.cancel()
+        raise
+    future.set_result(text)
+    return text
+
+
+# ── Rendering ──
+
+async def render_posts(forum, viewer: str, posts, format_posts) -> str:
+    """Render `posts` for `viewer` under forum.context_policy (format_posts when none)."""
+    policy = getattr(forum, "context_policy", None)
+    full = format_posts(posts)
+    if policy is None or not posts:
+        return full
+
+    from context_budget import estimate_text_tokens
+    budget = policy.max_tokens
+    if budget and estimate_text_tokens(full) <= budget:
+        return full
+
+    summaries = policy.summaries != "off"
+    post_budget = int(budget * (1 - _SUMMARY_SHARE)) if budget and summaries else budget
+    chosen, used = [], 0
+    for p in _select(policy, posts, viewer, forum):
+        cost = estimate_text_tokens(format_posts([p])) + 1
+        if post_budget and used + cost > post_budget:
+            if chosen:
+                continue
+            # always keep at least the most important post
+        chosen.append(p)
+        used += cost
+    if not budget and len(chosen) == len(posts):
+        return full
+
+    chosen_ids = {p.id for p in chosen}
+    omitted: dict[int, list] = {}
+    for p in posts:
+        if p.id not in chosen_ids:
+            omitted.setdefault(p.round_num, []).append(p)
+
+    # Newest rounds claim the remaining budget first; output stays chronological
+    round_lines: dict[int, str] = {}
+    for round_num in sorted(omitted, reverse=True):
+        line = f"🗂 [第 {round_num} 轮，省略 {len(omitted[round_num])} 条帖子]"
+        if summaries and round_num < forum.current_round:
+            summary = await _round_summary(forum, round_num, policy.summaries, omitted[round_num])
+            candidate = f"{line} 摘要: {summary}"
+            cost = estimate_text_tokens(candidate) + 1
+            if not budget or used + cost <= budget:
+                line = candidate
+                used += cost
+        round_lines[round_num] = line
+    lines = [round_lines[r] for r in sorted(round_lines)]
+    chosen.sort(key=lambda p: p.id)
+    if chosen:
+        lines.append(format_posts(chosen))
+    return "\n".join(lines)
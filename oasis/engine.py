@@ -62,6 +62,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src
 from llm_factory import create_chat_model, extract_text
 
 from oasis.forum import DiscussionForum
+from oasis.governor import bind_forum
 from oasis.experts import ExpertAgent, SessionExpert, ExternalExpert, get_all_experts
 from oasis.scheduler import (
     Schedule, ScheduleStep, StepType, Edge, ConditionalEdge, SelectorEdge,
@@ -226,12 +227,23 @@ class DiscussionEngine:
         early_stop: bool = False,
         discussion: bool | None = None,
         team: str = "",
+        llm_dedup: bool | None = None,
+        llm_cache: bool | None = None,
+        stream_drafts: bool | None = None,
+        expert_memory: bool | None = None,
     ):
         self.forum = forum
         self._cancelled = False
         self._early_stop = early_stop
         self._discussion_override = discussion  # API-level override (None = use YAML)
         self._team = team  # Team name for scoped agent storage
+        # ExpertAgent LLM coalescing / response cache (None = env default)
+        self._llm_dedup = llm_dedup
+        self._llm_cache = llm_cache
+        self._expert_memory = expert_memory  # ExpertAgent incremental prompts (None = env default)
+        # Streamed expert drafts (None = OASIS_STREAM_DRAFTS, already set on the forum)
+        if stream_drafts is not None:
+            self.forum.stream_drafts = stream_drafts
 
         # ── Step 1: Parse schedule (required) ──
         self.schedule: Schedule | None = None
@@ -253,6 +265,8 @@ class DiscussionEngine:
             self._discussion = self._discussion_override
         else:
             self._discussion = self.schedule.discussion
+        # Prompt context policy (YAML "context"), read by every expert backend
+        self.forum.context_policy = self.schedule.context
 
         # ── Step 2: Build expert pool from YAML ──
         experts_list: list[ExpertAgent | SessionExpert | ExternalExpert] = []
@@ -337,6 +351,9 @@ class DiscussionEngine:
                     persona=persona,
                     temp_id=int(temp_num) if temp_num.isdigit() else None,
                     tag=first,
+                    llm_dedup=self._llm_dedup,
+                    llm_cache=self._llm_cache,
+                    memory=self._expert_memory,
                 )
             elif "#oasis#" in sid or sid.startswith("oasis#"):
                 # Session agent by name:
@@ -461,6 +478,7 @@ class DiscussionEngine:
 
     async def run(self):
         """Run the full discussion loop (called as a background task)."""
+        bind_forum(self.forum)  # expert calls below queue fairly under this topic
         self.forum.status = "discussing"
         self.forum.discussion = self._discussion
         self.forum.start_clock()
@@ -562,7 +580,13 @@ class DiscussionEngine:
              c. Collect newly activated nodes for next super-step
              d. If no new activations or END reached → stop
           3. Safety: stop after MAX_SUPER_STEPS to prevent infinite loops
+
+        With `executor: dataflow` in the YAML, _run_graph_dataflow() is used instead.
         """
+        if self.schedule.executor == "dataflow":
+            await self._run_graph_dataflow()
+            return
+
         sched = self.schedule
         node_map = sched.node_map
 
@@ -627,109 +651,9 @@ class DiscussionEngine:
             next_activated: set[str] = set()
 
             for nid in activated_list:
-                # Fixed edges: always fire
-                for edge in sched.out_edges.get(nid, []):
-                    if edge.target == END:
-                        reached_end = True
-                        continue
-                    # Check if ALL incoming sources of target are completed
-                    target_in = sched.in_sources.get(edge.target, set())
-                    if target_in.issubset(completed_set):
-                        next_activated.add(edge.target)
-                    # For cycles: if this is a back-edge, activate immediately
-                    # (the node was completed before, so re-activate it)
-                    elif edge.target in completed_set:
-                        # Back-edge: re-activate for next iteration
-                        completed_set.discard(edge.target)
-                        next_activated.add(edge.target)
-
-                # Conditional edges: evaluate condition to pick target
-                for ce in sched.out_cond_edges.get(nid, []):
-                    cond_result = await self._eval_condition(ce.condition)
-                    if cond_result:
-                        target = ce.then_target
-                        print(f"  [OASIS] 🔀 Condition '{ce.condition}' → TRUE → {target}")
-                    else:
-                        target = ce.else_target
-                        print(f"  [OASIS] 🔀 Condition '{ce.condition}' → FALSE → {target or 'none'}")
-
-                    if not target:
-                        continue
-                    if target == END:
-                        reached_end = True
-                        continue
-
-                    self.forum.log_event("condition", detail=f"'{ce.condition}' → {target}")
-
-                    # Conditional edge respects the same AND-trigger rule as fixed edges:
-                    # the target is only activated when ALL its fixed-edge in_sources
-                    # are satisfied.  (in_sources no longer contains conditional-edge
-                    # sources, so this check won't be blocked by unresolved back-edges.)
-                    target_in = sched.in_sources.get(target, set())
-                    if target in completed_set:
-                        # Back-edge / loop: re-activate the already-completed node
-                        completed_set.discard(target)
-                        next_activated.add(target)
-                    elif target_in.issubset(completed_set):
-                        next_activated.add(target)
-                    else:
-                        # Fixed-edge predecessors not yet done — defer activation.
-                        # The target will be picked up later when its fixed-edge
-                        # sources complete.
-                        print(f"  [OASIS] ⏳ Conditional target '{target}' deferred: "
-                              f"waiting for fixed-edge sources {target_in - completed_set}")
-
-                # Selector edges: parse LLM output to pick target
-                se = sched.out_selector_edges.get(nid)
-                if se:
-                    # Get the last post from this node's agent to find the choice
-                    all_posts = await self.forum.browse()
-                    node_step = sched.node_map.get(nid)
-                    node_agents = self._resolve_experts(node_step.expert_names) if node_step else []
-                    node_author_names = {a.name for a in node_agents}
-                    # Find the last post from this node's agents
-                    selector_output = ""
-                    for p in reversed(all_posts):
-                        if p.author in node_author_names:
-                            selector_output = p.content
-                            break
-                    # Parse [oasis reply choose N] — take the LAST occurrence
-                    # because the agent's reasoning may contain multiple
-                    # [oasis choose ...] mentions before settling on a final answer.
-                    print(f"  [OASIS] 🔍 Selector '{nid}' raw output (first 200 chars): {selector_output[:200]!r}")
-                    all_matches = _OASIS_REPLY_CHOOSE_RE.findall(selector_output)
-                    if all_matches:
-                        choice_num = int(all_matches[-1])  # last match is the final decision
-                        target = se.choices.get(choice_num, "")
-                        print(f"  [OASIS] 🎯 Selector '{nid}' chose [{choice_num}] → {target or 'invalid'}")
-                        self.forum.log_event("selector", detail=f"chose [{choice_num}] → {target}")
-                        if target and target != END:
-                            target_in = sched.in_sources.get(target, set())
-                            if target in completed_set:
-                                completed_set.discard(target)
-                                next_activated.add(target)
-                            elif target_in.issubset(completed_set):
-                                next_activated.add(target)
-                            else:
-                                print(f"  [OASIS] ⏳ Selector target '{target}' deferred")
-                        elif target == END:
-                            reached_end = True
-                    else:
-                        # No valid choice found — default to first choice
-                        if se.choices:
-                            first_key = min(se.choices.keys())
-                            target = se.choices[first_key]
-                            print(f"  [OASIS] ⚠️ Selector '{nid}' no valid [oasis reply choose N] found in output, defaulting to [{first_key}] → {target}")
-                            self.forum.log_event("selector_default", detail=f"default [{first_key}] → {target}")
-                            if target and target != END:
-                                target_in = sched.in_sources.get(target, set())
-                                if target in completed_set:
-                                    completed_set.discard(target)
-                                    next_activated.add(target)
-                                elif target_in.issubset(completed_set):
-                                    next_activated.add(target)
-                            elif target == END:
-                                reached_end = True
+                targets, hit_end = await self._route_from(nid, completed_set)
+                next_activated.update(targets)
+                reached_end = reached_end or hit_end
 
             # If END was reached and no other nodes activated, stop
             if reached_end and not next_activated:
@@ -756,6 +680,216 @@ class DiscussionEngine:
         self.forum.log_event("graph_end", detail=f"completed in {super_step} super-steps")
         print(f"  [OASIS] 🏁 Graph completed in {super_step} super-steps, {self._total_node_execs} node executions")
 
+    async def _run_graph_dataflow(self):
+        """Execute the graph dataflow-style: no super-step barrier.
+
+        Every node starts as soon as it is activated, i.e. when its fixed-edge
+        in_sources are complete (or a conditional / selector edge picks it).
+        Edges of a node are evaluated right after that node finishes, with the
+        same rules as the super-step executor (_route_from), so a slow node
+        only delays its own downstream branch.
+
+          - at most `max_concurrency` nodes run at once (0 = unlimited)
+          - a node re-activated while it is still running runs again afterwards
+          - _MAX_TOTAL_NODE_EXECS still bounds loops
+          - the graph ends when nothing is running or ready (END does not
+            cancel branches that are still in flight)
+
+        forum.current_round reports the activation depth (entry nodes = 1).
+        """
+        sched = self.schedule
+        node_map = sched.node_map
+        limit = sched.max_concurrency
+        sem = asyncio.Semaphore(limit) if limit > 0 else None
+
+        completed_set: set[str] = set()
+        depth: dict[str, int] = {nid: 1 for nid in sched.entry_nodes}
+        ready: list[str] = sorted(sched.entry_nodes)
+        running: dict[asyncio.Task, str] = {}
+        rerun: set[str] = set()     # re-activated while running
+        reached_end = False
+        execs = 0
+
+        print(f"  [OASIS] 🚀 Dataflow graph start: {len(sched.nodes)} nodes, entry={ready}, "
+              f"max_concurrency={limit or 'unlimited'}")
+        self.forum.log_event("graph_start", detail=f"nodes={len(sched.nodes)}, entries={ready}, executor=dataflow")
+
+        async def _exec_node(node_id: str, vis: dict):
+            if sem is None:
+                await self._execute_node(node_map[node_id], vis)
+                return
+            async with sem:
+                await self._execute_node(node_map[node_id], vis)
+
+        def _start(node_id: str):
+            nonlocal execs
+            self._total_node_execs += 1
+            if self._total_node_execs > _MAX_TOTAL_NODE_EXECS:
+                raise RuntimeError(
+                    f"Safety limit reached: {self._total_node_execs} total node executions "
+                    f"(max {_MAX_TOTAL_NODE_EXECS}). Possible infinite loop in graph."
+                )
+            execs += 1
+            d = depth.get(node_id, 1)
+            if d > self.forum.current_round:
+                self.forum.current_round = d
+            self.forum.max_rounds = max(self.forum.current_round, len(sched.nodes))
+            # Visibility is fixed at activation time (upstream nodes completed so far)
+            vis = self._build_visibility_filter_graph(node_id, completed_set)
+            print(f"  [OASIS] ⚡ Node '{node_id}' start (depth {d}, running {len(running) + 1})")
+            self.forum.log_event("node_start", detail=f"node={node_id}, depth={d}")
+            running[asyncio.create_task(_exec_node(node_id, vis))] = node_id
+
+        try:
+            while ready or running:
+                self._check_cancelled()
+                while ready:
+                    _start(ready.pop(0))
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: running[t]):  # deterministic order
+                    nid = running.pop(task)
+                    if not task.cancelled() and task.exception() is not None:
+                        # Same as a failed node in a super-step: log and keep routing
+                        print(f"  [OASIS] ❌ Node '{nid}' error: {task.exception()}")
+                    completed_set.add(nid)
+
+                    targets, hit_end = await self._route_from(nid, completed_set)
+                    reached_end = reached_end or hit_end
+                    for target in targets:
+                        depth[target] = depth.get(nid, 1) + 1
+                        if target in running.values():
+                            rerun.add(target)
+                        elif target not in ready:
+                            ready.append(target)
+
+                    if nid in rerun:
+                        rerun.discard(nid)
+                        completed_set.discard(nid)
+                        if nid not in ready:
+                            ready.append(nid)
+        finally:
+            if running:
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+
+        end_label = "END" if reached_end else "no more activations"
+        self.forum.log_event("graph_end", detail=f"dataflow: {execs} node executions ({end_label})")
+        print(f"  [OASIS] 🏁 Dataflow graph completed: {execs} node executions ({end_label}), "
+              f"{self._total_node_execs} total")
+
+    async def _route_from(self, nid: str, completed_set: set[str]) -> tuple[list[str], bool]:
+        """Evaluate the outgoing edges of a completed node (shared by both executors).
+
+        Returns (targets to activate, END reached). Re-activating an already
+        completed node (back-edge / loop) removes it from completed_set.
+        """
+        sched = self.schedule
+        targets: list[str] = []
+        hit_end = False
+
+        # Fixed edges: always fire
+        for edge in sched.out_edges.get(nid, []):
+            if edge.target == END:
+                hit_end = True
+                continue
+            # Check if ALL incoming sources of target are completed
+            target_in = sched.in_sources.get(edge.target, set())
+            if target_in.issubset(completed_set):
+                targets.append(edge.target)
+            # For cycles: if this is a back-edge, activate immediately
+            # (the node was completed before, so re-activate it)
+            elif edge.target in completed_set:
+                # Back-edge: re-activate for next iteration
+                completed_set.discard(edge.target)
+                targets.append(edge.target)
+
+        # Conditional edges: evaluate condition to pick target
+        for ce in sched.out_cond_edges.get(nid, []):
+            cond_result = await self._eval_condition(ce.condition)
+            if cond_result:
+                target = ce.then_target
+                print(f"  [OASIS] 🔀 Condition '{ce.condition}' → TRUE → {target}")
+            else:
+                target = ce.else_target
+                print(f"  [OASIS] 🔀 Condition '{ce.condition}' → FALSE → {target or 'none'}")
+
+            if not target:
+                continue
+            if target == END:
+                hit_end = True
+                continue
+
+            self.forum.log_event("condition", detail=f"'{ce.condition}' → {target}")
+
+            # Conditional edge respects the same AND-trigger rule as fixed edges:
+            # the target is only activated when ALL its fixed-edge in_sources
+            # are satisfied.  (in_sources no longer contains conditional-edge
+            # sources, so this check won't be blocked by unresolved back-edges.)
+            target_in = sched.in_sources.get(target, set())
+            if target in completed_set:
+                # Back-edge / loop: re-activate the already-completed node
+                completed_set.discard(target)
+                targets.append(target)
+            elif target_in.issubset(completed_set):
+                targets.append(target)
+            else:
+                # Fixed-edge predecessors not yet done — defer activation.
+                # The target will be picked up later when its fixed-edge
+                # sources complete.
+                print(f"  [OASIS] ⏳ Conditional target '{target}' deferred: "
+                      f"waiting for fixed-edge sources {target_in - completed_set}")
+
+        # Selector edges: parse LLM output to pick target
+        se = sched.out_selector_edges.get(nid)
+        if se:
+            # Get the last post from this node's agent to find the choice
+            node_step = sched.node_map.get(nid)
+            node_agents = self._resolve_experts(node_step.expert_names) if node_step else []
+            node_author_names = {a.name for a in node_agents}
+            last_post = await self.forum.last_post_by(node_author_names)
+            selector_output = last_post.content if last_post else ""
+            # Parse [oasis reply choose N] — take the LAST occurrence
+            # because the agent's reasoning may contain multiple
+            # [oasis choose ...] mentions before settling on a final answer.
+            print(f"  [OASIS] 🔍 Selector '{nid}' raw output (first 200 chars): {selector_output[:200]!r}")
+            all_matches = _OASIS_REPLY_CHOOSE_RE.findall(selector_output)
+            if all_matches:
+                choice_num = int(all_matches[-1])  # last match is the final decision
+                target = se.choices.get(choice_num, "")
+                print(f"  [OASIS] 🎯 Selector '{nid}' chose [{choice_num}] → {target or 'invalid'}")
+                self.forum.log_event("selector", detail=f"chose [{choice_num}] → {target}")
+                if target and target != END:
+                    target_in = sched.in_sources.get(target, set())
+                    if target in completed_set:
+                        completed_set.discard(target)
+                        targets.append(target)
+                    elif target_in.issubset(completed_set):
+                        targets.append(target)
+                    else:
+                        print(f"  [OASIS] ⏳ Selector target '{target}' deferred")
+                elif target == END:
+                    hit_end = True
+            else:
+                # No valid choice found — default to first choice
+                if se.choices:
+                    first_key = min(se.choices.keys())
+                    target = se.choices[first_key]
+                    print(f"  [OASIS] ⚠️ Selector '{nid}' no valid [oasis reply choose N] found in output, defaulting to [{first_key}] → {target}")
+                    self.forum.log_event("selector_default", detail=f"default [{first_key}] → {target}")
+                    if target and target != END:
+                        target_in = sched.in_sources.get(target, set())
+                        if target in completed_set:
+                            completed_set.discard(target)
+                            targets.append(target)
+                        elif target_in.issubset(completed_set):
+                            targets.append(target)
+                    elif target == END:
+                        hit_end = True
+
+        return targets, hit_end
+
     def _build_visibility_filter_graph(self, node_id: str, completed_set: set[str]) -> dict:
         """Build visibility filter for a node based on its upstream nodes in the graph.
 
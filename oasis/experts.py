@@ -32,17 +32,41 @@ checkpoint DB.
 
 Both participate() methods accept an optional `instruction` parameter,
 which is injected into the expert's prompt to guide their focus.
+
+ExpertAgent LLM calls go through _invoke_llm(), which can (per topic, or
+via OASIS_LLM_DEDUP / OASIS_LLM_CACHE) coalesce identical in-flight
+requests and serve repeated prompts from a deterministic response cache.
+
+A schedule "context" policy (oasis/context.py) can compress the forum
+section of every backend's prompt: top-K, latest per author, reply
+neighbours, recent posts and per-round summaries under a token budget.
+
+ExpertAgent memory mode (per topic expert_memory, or OASIS_EXPERT_MEMORY):
+instead of re-rendering persona + question + the whole forum every round,
+the expert keeps a stable system message and an append-only conversation
+of per-round deltas (new posts only) and its own replies, like
+SessionExpert, so provider-side prefix caching can reuse earlier rounds.
+OASIS_PROMPT_CACHE_HINTS additionally marks the system message and the end
+of the previous conversation with cache_control (Anthropic-style, only for
+providers that accept it).
+
+When forum.stream_drafts is on (per topic, or OASIS_STREAM_DRAFTS), all three
+backends request streamed output and mirror it into the forum draft of the
+expert (_DraftStream); the final text is parsed/published exactly as before.
 """
 
 import asyncio
+import hashlib
 import json
 import os
 import re
 import shutil
 import sys
+import time
+from collections import OrderedDict
 
 import httpx
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 # ACP long-lived connection support (from acptest4)
 try:
@@ -55,8 +79,11 @@ except ImportError:
 # 确保 src/ 在 import 路径中，以便导入 llm_factory
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
 from llm_factory import create_chat_model, extract_text
+from http_pool import get_client
 
+from oasis.context import render_posts
 from oasis.forum import DiscussionForum
+from oasis.governor import governor
 
 
 # --- 加载 prompt 和专家配置（模块级别，导入时执行一次） ---
@@ -322,18 +349,216 @@ def _get_llm(temperature: float = 0.7):
     return create_chat_model(temperature=temperature, max_tokens=1024)
 
 
+# --- LLM request coalescing / deterministic response cache (ExpertAgent) ---
+# 相同模型配置 + 温度 + prompt 的请求：
+#   dedup  正在进行中的相同请求只发一次，其余等待共享结果
+#   cache  完成的结果按 TTL 缓存（适合 temperature=0，或反复调试 YAML 时重放未变的节点）
+_LLM_CACHE_MODES = ("off", "temp0", "all")
+_llm_inflight: dict[str, asyncio.Future] = {}
+_llm_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_llm_stats = {"calls": 0, "coalesced": 0, "cache_hits": 0}
+
+
+def llm_dedup_default() -> bool:
+    return os.getenv("OASIS_LLM_DEDUP", "0").lower() in ("1", "true", "yes")
+
+
+def llm_cache_mode() -> str:
+    mode = os.getenv("OASIS_LLM_CACHE", "off").strip().lower()
+    return mode if mode in _LLM_CACHE_MODES else "off"
+
+
+def expert_memory_default() -> bool:
+    return os.getenv("OASIS_EXPERT_MEMORY", "0").lower() in ("1", "true", "yes")
+
+
+def prompt_cache_hints_default() -> bool:
+    return os.getenv("OASIS_PROMPT_CACHE_HINTS", "0").lower() in ("1", "true", "yes")
+
+
+def _llm_request_key(llm, temperature: float, prompt: "str | list") -> str:
+    ident = "|".join(str(x) for x in (
+        type(llm).__name__,
+        getattr(llm, "model_name", "") or getattr(llm, "model", ""),
+        getattr(llm, "openai_api_base", "") or "",
+        temperature,
+    ))
+    if not isinstance(prompt, str):
+        prompt = json.dumps([(m.type, m.content) for m in prompt], ensure_ascii=False)
+    return hashlib.sha256(f"{ident}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def get_llm_cache_stats() -> dict:
+    return {
+        **_llm_stats,
+        "inflight": len(_llm_inflight),
+        "cached": len(_llm_cache),
+        "mode": llm_cache_mode(),
+        "dedup_default": llm_dedup_default(),
+    }
+
+
+async def _llm_text(llm, prompt: "str | list", draft: "_DraftStream | None" = None, agent: str = "") -> str:
+    """One completion → text; streamed into `draft` when given (governed as "llm").
+
+    `prompt` is a single user prompt or a full message list.
+    """
+    messages = [HumanMessage(content=prompt)] if isinstance(prompt, str) else prompt
+    async with governor.slot("llm", agent):
+        if draft is None:
+            resp = await llm.ainvoke(messages)
+            return extract_text(resp.content)
+        parts: list[str] = []
+        async for chunk in llm.astream(messages):
+            text = extract_text(chunk.content)
+            if text:
+                parts.append(text)
+                draft.feed(text)
+        return "".join(parts)
+
+
+async def _invoke_llm(llm, temperature: float, prompt: "str | list",
+                      dedup: bool = False, cache: bool = False,
+                      draft: "_DraftStream | None" = None, agent: str = "") -> str:
+    """Completion (single prompt or message list) → text, with optional coalescing / caching.
+
+    Coalesced followers and cache hits receive the final text only (no draft).
+    """
+    if not dedup and not cache:
+        _llm_stats["calls"] += 1
+        return await _llm_text(llm, prompt, draft, agent)
+
+    key = _llm_request_key(llm, temperature, prompt)
+    if cache:
+        entry = _llm_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _llm_cache.move_to_end(key)
+            _llm_stats["cache_hits"] += 1
+            return entry[1]
+    pending = _llm_inflight.get(key)
+    if pending is not None:
+        try:
+            text = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # 发起请求的专家被取消：自行请求
+        else:
+            _llm_stats["coalesced"] += 1
+            return text
+
+    future = asyncio.get_running_loop().create_future()
+    _llm_inflight[key] = future
+    try:
+        _llm_stats["calls"] += 1
+        text = await _llm_text(llm, prompt, draft, agent)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # 没有等待者时避免 "exception was never retrieved"
+        raise
+    finally:
+        if _llm_inflight.get(key) is future:
+            del _llm_inflight[key]
+
+    future.set_result(text)
+    if cache and text.strip():
+        _llm_cache[key] = (time.monotonic() + float(os.getenv("OASIS_LLM_CACHE_TTL", "3600")), text)
+        _llm_cache.move_to_end(key)
+        while len(_llm_cache) > int(os.getenv("OASIS_LLM_CACHE_SIZE", "512")):
+            _llm_cache.popitem(last=False)
+    return text
+
+
+# --- Streaming drafts ---
+# 流式输出按 OASIS_DRAFT_FLUSH_MS（默认 200ms）合并后写入论坛草稿，避免逐 token 发事件
+_DRAFT_FLUSH_INTERVAL = int(os.getenv("OASIS_DRAFT_FLUSH_MS", "200")) / 1000
+
+
+class _DraftStream:
+    """Mirrors streamed text of one reply into forum.drafts (batched).
+
+    close() drops a draft that was not finalized by forum.publish().
+    """
+
+    def __init__(self, forum: DiscussionForum, author: str):
+        self._forum = forum
+        self._author = author
+        self._pending: list[str] = []
+        self._last_flush = time.monotonic()
+
+    def feed(self, delta: str):
+        self._pending.append(delta)
+        if time.monotonic() - self._last_flush >= _DRAFT_FLUSH_INTERVAL:
+            self.flush()
+
+    def reset(self):
+        """Start a new reply segment (e.g. the agent answered again after tool calls)."""
+        self._pending.clear()
+        self._forum.draft_update(self._author, "", reset=True)
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        if self._pending:
+            self._forum.draft_update(self._author, "".join(self._pending))
+            self._pending.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self._forum.draft_discard(self._author)
+
+
+def _open_draft(forum: DiscussionForum, author: str) -> _DraftStream | None:
+    return _DraftStream(forum, author) if forum.stream_drafts else None
+
+
+async def _read_sse_chat(resp: httpx.Response, draft: _DraftStream, segmented: bool = False) -> str:
+    """Consume an OpenAI-style chat.completion.chunk SSE stream into `draft`.
+
+    segmented: the local bot API marks each post-tool LLM turn with a
+    {"meta": {"type": "tools_start"}} chunk; the non-stream reply is only the
+    last turn, so the draft restarts there.
+    """
+    parts: list[str] = []
+    async for line in resp.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        for choice in chunk.get("choices") or []:
+            delta = choice.get("delta") or {}
+            if segmented and (delta.get("meta") or {}).get("type") == "tools_start":
+                parts.clear()
+                draft.reset()
+            content = delta.get("content")
+            if content:
+                parts.append(content)
+                draft.feed(content)
+    draft.flush()
+    return "".join(parts)
+
+
 def _build_discuss_prompt(
     expert_name: str,
     persona: str,
     question: str,
     posts_text: str,
     split: bool = False,
+    tools: bool = True,
 ) -> str | tuple[str, str]:
     """Build the prompt that asks the expert to respond with JSON.
 
     Args:
         split: If True, return (system_prompt, user_prompt) tuple for session mode.
                If False, return a single combined string for direct LLM mode.
+        tools: Mention tool-calling ability (False for tool-less ExpertAgent memory mode).
     """
     if _DISCUSS_PROMPT_TPL and not split:
         return _DISCUSS_PROMPT_TPL.format(
@@ -357,7 +582,7 @@ def _build_discuss_prompt(
     sys_parts = [p for p in [
         identity,
         "在接下来的讨论中，你将收到论坛的新增内容，需要以 JSON 格式回复你的观点和投票。",
-        "你拥有工具调用能力，如需搜索资料、分析数据来支撑你的观点，可以使用可用的工具。",
+        "你拥有工具调用能力，如需搜索资料、分析数据来支撑你的观点，可以使用可用的工具。" if tools else "",
         "注意：后续轮次只会发送新增帖子，之前的帖子请参考你的对话记忆。",
     ] if p]
     system_prompt = "\n".join(sys_parts)
@@ -400,6 +625,18 @@ def _build_identity_prompt(expert_name: str, persona: str) -> str:
         return f"你是「{expert_name}」。{persona}\n\n"
 
 
+def _with_cache_hints(messages: list) -> list:
+    """Copy of `messages` with cache_control breakpoints on the system message
+    and on the last message before the new turn (the reusable prefix)."""
+    marked = list(messages)
+    for i in {0, len(marked) - 2}:
+        if 0 <= i < len(marked) - 1 and isinstance(marked[i].content, str):
+            marked[i] = marked[i].model_copy(update={"content": [{
+                "type": "text", "text": marked[i].content, "cache_control": {"type": "ephemeral"},
+            }]})
+    return marked
+
+
 def _format_posts(posts) -> str:
     """Format posts for display in the prompt."""
     lines = []
@@ -412,6 +649,11 @@ def _format_posts(posts) -> str:
     return "\n".join(lines)
 
 
+async def _render_posts(forum: DiscussionForum, viewer: str, posts) -> str:
+    """Posts for `viewer`'s prompt, compressed by the schedule's context policy if any."""
+    return await render_posts(forum, viewer, posts, _format_posts)
+
+
 def _parse_expert_response(raw: str):
     """Strip markdown fences / oasis reply tags and parse JSON.
 
@@ -490,13 +732,19 @@ class ExpertAgent:
 
     Each call is stateless: reads posts → single LLM call → publish + vote.
     name is "title#temp#N" to ensure uniqueness.
+
+    With memory=True the expert instead keeps a stable system message and an
+    append-only conversation: each round sends only the posts it has not seen
+    yet, and its previous replies stay in the history (prefix-cache friendly).
     """
 
     # Class-level counter for generating unique temp IDs (used when no explicit sid)
     _counter: int = 0
 
     def __init__(self, name: str, persona: str, temperature: float = 0.7, tag: str = "",
-                 temp_id: int | None = None):
+                 temp_id: int | None = None, llm_dedup: bool | None = None,
+                 llm_cache: bool | None = None, memory: bool | None = None,
+                 cache_hints: bool | None = None):
         if temp_id is not None:
             # Explicit temp id from YAML (e.g. "创意专家#temp#1" → temp_id=1)
             self.session_id = f"temp#{temp_id}"
@@ -507,7 +755,29 @@ class ExpertAgent:
         self.name = f"{name}#{self.session_id}"
         self.persona = persona
         self.tag = tag
+        self.temperature = temperature
         self.llm = _get_llm(temperature)
+        # None = follow OASIS_LLM_DEDUP / OASIS_LLM_CACHE
+        self.llm_dedup = llm_dedup_default() if llm_dedup is None else llm_dedup
+        if llm_cache is None:
+            mode = llm_cache_mode()
+            llm_cache = mode == "all" or (mode == "temp0" and temperature == 0)
+        self.llm_cache = llm_cache
+        # None = follow OASIS_EXPERT_MEMORY / OASIS_PROMPT_CACHE_HINTS
+        self.memory = expert_memory_default() if memory is None else memory
+        self.cache_hints = prompt_cache_hints_default() if cache_hints is None else cache_hints
+        self._history: list = []  # memory mode: [SystemMessage, Human, AI, Human, AI, ...]
+        self._seen_post_ids: set[int] = set()
+
+    async def _complete(self, prompt: "str | list", draft: _DraftStream | None = None) -> str:
+        if not isinstance(prompt, str) and self.cache_hints:
+            prompt = _with_cache_hints(prompt)
+        text = await _invoke_llm(self.llm, self.temperature, prompt,
+                                 dedup=self.llm_dedup, cache=self.llm_cache, draft=draft,
+                                 agent=self.name)
+        if draft is not None:
+            draft.flush()
+        return text
 
     async def participate(
         self,
@@ -524,6 +794,10 @@ class ExpertAgent:
             from_round=from_round if not discussion else None,
         )
 
+        if self.memory:
+            await self._participate_with_memory(forum, others, instruction, discussion)
+            return
+
         if not discussion:
             # ── Execute mode: just run the task, no discussion format ──
             task_prompt = _build_identity_prompt(self.title, self.persona)
@@ -531,37 +805,128 @@ class ExpertAgent:
             if instruction:
                 task_prompt += f"\n执行指令: {instruction}\n"
             if others:
-                task_prompt += f"\n前序 agent 的执行结果:\n{_format_posts(others)}\n"
+                task_prompt += f"\n前序 agent 的执行结果:\n{await _render_posts(forum, self.name, others)}\n"
             task_prompt += "\n请直接执行任务并返回结果。"
 
+            draft = _open_draft(forum, self.name)
             try:
-                resp = await self.llm.ainvoke([HumanMessage(content=task_prompt)])
-                text = extract_text(resp.content)
+                text = await self._complete(task_prompt, draft)
                 await forum.publish(author=self.name, content=text.strip()[:2000])
                 print(f"  [OASIS] ✅ {self.name} 执行完成")
             except Exception as e:
                 print(f"  [OASIS] ❌ {self.name} error: {e}")
+            finally:
+                if draft:
+                    draft.close()
             return
 
         # ── Discussion mode (original) ──
-        posts_text = _format_posts(others) if others else "(还没有其他人发言，你来开启讨论吧)"
+        posts_text = await _render_posts(forum, self.name, others) if others else "(还没有其他人发言，你来开启讨论吧)"
         prompt = _build_discuss_prompt(self.title, self.persona, forum.question, posts_text)
         if instruction:
             prompt += f"\n\n📋 本轮你的专项指令：{instruction}\n请在回复中重点关注和执行这个指令。"
 
+        draft = _open_draft(forum, self.name)
         try:
-            resp = await self.llm.ainvoke([HumanMessage(content=prompt)])
-            text = extract_text(resp.content)
+            text = await self._complete(prompt, draft)
             result = _parse_expert_response(text)
             await _apply_response(result, self.name, forum, others)
         except json.JSONDecodeError as e:
             print(f"  [OASIS] ⚠️ {self.name} JSON parse error: {e}")
             try:
-                await forum.publish(author=self.name, content=extract_text(resp.content).strip()[:300])
+                await forum.publish(author=self.name, content=text.strip()[:300])
+            except Exception:
+                pass
+        except Exception as e:
+            print(f"  [OASIS] ❌ {self.name} error: {e}")
+        finally:
+            if draft:
+                draft.close()
+
+    async def _memory_turn(self, forum: DiscussionForum, others: list, new_posts: list,
+                     instruction: str, discussion: bool) -> list:
+        """Messages to append for this round: [SystemMessage (first call only),] HumanMessage."""
+        instr_suffix = f"\n\n📋 本轮你的专项指令：{instruction}\n请在回复中重点关注和执行这个指令。" if instruction else ""
+        if not self._history:
+            if discussion:
+                posts_text = await _render_posts(forum, self.name, others) if others else "(还没有其他人发言，你来开启讨论吧)"
+                system_prompt, user_prompt = _build_discuss_prompt(
+                    self.title, self.persona, forum.question, posts_text, split=True, tools=False,
+                )
+                return [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt + instr_suffix)]
+            identity = _build_identity_prompt(self.title, self.persona).strip()
+            task_parts = [f"任务主题: {forum.question}"]
+            if instruction:
+                task_parts.append(f"\n执行指令: {instruction}")
+            if others:
+                task_parts.append(f"\n前序 agent 的执行结果:\n{await _render_posts(forum, self.name, others)}")
+            task_parts.append("\n请直接执行任务并返回结果。")
+            turn = [HumanMessage(content="\n".join(task_parts))]
+            return [SystemMessage(content=identity)] + turn if identity else turn
+
+        if not discussion:
+            ctx_parts = [f"【第 {forum.current_round} 轮】"]
+            if instruction:
+                ctx_parts.append(f"执行指令: {instruction}")
+            if new_posts:
+                ctx_parts.append(f"其他 agent 的新结果:\n{await _render_posts(forum, self.name, new_posts)}")
+            ctx_parts.append("请继续执行任务并返回结果。")
+            return [HumanMessage(content="\n".join(ctx_parts))]
+        if new_posts:
+            return [HumanMessage(content=(
+                f"【第 {forum.current_round} 轮讨论更新】\n"
+                f"以下是自你上次发言后的 {len(new_posts)} 条新帖子：\n\n"
+                f"{await _render_posts(forum, self.name, new_posts)}\n\n"
+                "请基于这些新观点以及你之前看到的讨论内容，以 JSON 格式回复：\n"
+                "{\n"
+                '  "reply_to": <某个帖子ID>,\n'
+                '  "content": "你的观点（200字以内）",\n'
+                '  "votes": [{"post_id": <ID>, "direction": "up或down"}]\n'
+                "}"
+            ) + instr_suffix)]
+        return [HumanMessage(content=(
+            f"【第 {forum.current_round} 轮讨论更新】\n"
+            "本轮没有新的帖子。如果你有新的想法或补充，可以继续发言；"
+            "如果没有，回复一个空 content 即可。\n"
+            "{\n"
+            '  "reply_to": null,\n'
+            '  "content": "",\n'
+            '  "votes": []\n'
+            "}"
+        ) + instr_suffix)]
+
+    async def _participate_with_memory(self, forum: DiscussionForum, others: list,
+                                       instruction: str, discussion: bool):
+        """One round in memory mode: history + delta → reply; history grows only on a reply."""
+        new_posts = [p for p in others if p.id not in self._seen_post_ids]
+        turn = await self._memory_turn(forum, others, new_posts, instruction, discussion)
+
+        draft = _open_draft(forum, self.name)
+        text = ""
+        try:
+            text = await self._complete(self._history + turn, draft)
+            if not discussion:
+                await forum.publish(author=self.name, content=text.strip()[:2000])
+                print(f"  [OASIS] ✅ {self.name} 执行完成")
+            else:
+                result = _parse_expert_response(text)
+                await _apply_response(result, self.name, forum, others)
+        except json.JSONDecodeError as e:
+            print(f"  [OASIS] ⚠️ {self.name} JSON parse error: {e}")
+            try:
+                await forum.publish(author=self.name, content=text.strip()[:300])
             except Exception:
                 pass
         except Exception as e:
             print(f"  [OASIS] ❌ {self.name} error: {e}")
+        finally:
+            if draft:
+                draft.close()
+
+        if text.strip():
+            # 失败/空回复时不记入历史，下一轮重新发送这些帖子
+            self._history += turn + [AIMessage(content=text)]
+            self._seen_post_ids.update(p.id for p in others)
 
 
 # ======================================================================
@@ -625,6 +990,30 @@ class SessionExpert:
         h.update(self._extra_headers)
         return h
 
+    async def _chat(self, body: dict, timeout: float | None, draft: _DraftStream | None) -> str | None:
+        """POST to the bot API and return the reply text (None on HTTP error, logged).
+
+        With a draft the request is streamed and the text mirrored into it.
+        """
+        client = get_client(self._bot_url)
+        timeout = httpx.Timeout(timeout=timeout)
+        async with governor.slot("session", self.name):
+            if draft is None:
+                resp = await client.post(self._bot_url, json=body, headers=self._auth_header(),
+                                         timeout=timeout)
+                if resp.status_code != 200:
+                    print(f"  [OASIS] ❌ {self.name} bot API error {resp.status_code}: {resp.text[:200]}")
+                    return None
+                return resp.json()["choices"][0]["message"]["content"]
+
+            async with client.stream("POST", self._bot_url, json={**body, "stream": True},
+                                     headers=self._auth_header(), timeout=timeout) as resp:
+                if resp.status_code != 200:
+                    await resp.aread()
+                    print(f"  [OASIS] ❌ {self.name} bot API error {resp.status_code}: {resp.text[:200]}")
+                    return None
+                return await _read_sse_chat(resp, draft, segmented=True)
+
     async def participate(
         self,
         forum: DiscussionForum,
@@ -663,7 +1052,7 @@ class SessionExpert:
                 if instruction:
                     task_parts.append(f"\n执行指令: {instruction}")
                 if others:
-                    task_parts.append(f"\n前序 agent 的执行结果:\n{_format_posts(others)}")
+                    task_parts.append(f"\n前序 agent 的执行结果:\n{await _render_posts(forum, self.name, others)}")
                 task_parts.append("\n请直接执行任务并返回结果。")
                 messages.append({"role": "user", "content": "\n".join(task_parts)})
                 self._initialized = True
@@ -673,7 +1062,7 @@ class SessionExpert:
                 if instruction:
                     ctx_parts.append(f"执行指令: {instruction}")
                 if new_posts:
-                    ctx_parts.append(f"其他 agent 的新结果:\n{_format_posts(new_posts)}")
+                    ctx_parts.append(f"其他 agent 的新结果:\n{await _render_posts(forum, self.name, new_posts)}")
                 ctx_parts.append("请继续执行任务并返回结果。")
                 messages.append({"role": "user", "content": "\n".join(ctx_parts)})
 
@@ -682,24 +1071,23 @@ class SessionExpert:
                 "messages": messages,
                 "stream": False,
                 "session_id": self.session_id,
+                "priority": "oasis",  # mainagent 排队时按 OASIS 子任务优先级调度
             }
             if self.enabled_tools is not None:
                 body["enabled_tools"] = self.enabled_tools
 
+            draft = _open_draft(forum, self.name)
             try:
-                async with httpx.AsyncClient(timeout=httpx.Timeout(timeout=None)) as client:
-                    resp = await client.post(
-                        self._bot_url, json=body, headers=self._auth_header(),
-                    )
-                if resp.status_code != 200:
-                    print(f"  [OASIS] ❌ {self.name} bot API error {resp.status_code}: {resp.text[:200]}")
+                raw_content = await self._chat(body, None, draft)
+                if raw_content is None:
                     return
-                data = resp.json()
-                raw_content = data["choices"][0]["message"]["content"]
                 await forum.publish(author=self.name, content=raw_content.strip()[:2000])
                 print(f"  [OASIS] ✅ {self.name} 执行完成")
             except Exception as e:
                 print(f"  [OASIS] ❌ {self.name} error: {e}")
+            finally:
+                if draft:
+                    draft.close()
             return
 
         # ── Discussion mode (original) ──
@@ -712,7 +1100,7 @@ class SessionExpert:
 
         messages = []
         if not self._initialized:
-            posts_text = _format_posts(others) if others else "(还没有其他人发言，你来开启讨论吧)"
+            posts_text = await _render_posts(forum, self.name, others) if others else "(还没有其他人发言，你来开启讨论吧)"
 
             if self.is_oasis:
                 # Oasis session → inject identity as system prompt
@@ -747,7 +1135,7 @@ class SessionExpert:
             self._initialized = True
         else:
             if new_posts:
-                new_text = _format_posts(new_posts)
+                new_text = await _render_posts(forum, self.name, new_posts)
                 prompt = (
                     f"【第 {forum.current_round} 轮讨论更新】\n"
                     f"以下是自你上次发言后的 {len(new_posts)} 条新帖子：\n\n"
@@ -777,24 +1165,16 @@ class SessionExpert:
             "messages": messages,
             "stream": False,
             "session_id": self.session_id,
+            "priority": "oasis",  # mainagent 排队时按 OASIS 子任务优先级调度
         }
         if self.enabled_tools is not None:
             body["enabled_tools"] = self.enabled_tools
 
+        draft = _open_draft(forum, self.name)
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(timeout=self.timeout)) as client:
-                resp = await client.post(
-                    self._bot_url,
-                    json=body,
-                    headers=self._auth_header(),
-                )
-
-            if resp.status_code != 200:
-                print(f"  [OASIS] ❌ {self.name} bot API error {resp.status_code}: {resp.text[:200]}")
+            raw_content = await self._chat(body, self.timeout, draft)
+            if raw_content is None:
                 return
-
-            data = resp.json()
-            raw_content = data["choices"][0]["message"]["content"]
             result = _parse_expert_response(raw_content)
             await _apply_response(result, self.name, forum, others)
 
@@ -806,6 +1186,9 @@ class SessionExpert:
                 pass
         except Exception as e:
             print(f"  [OASIS] ❌ {self.name} error: {e}")
+        finally:
+            if draft:
+                draft.close()
 
 
 # ======================================================================
@@ -843,10 +1226,13 @@ if _ACP_AVAILABLE:
         """ACP protocol callback handler — collects streaming text chunks."""
         def __init__(self):
             self.chunks: list[str] = []
+            self.on_chunk = None  # optional callback for streamed drafts
 
         async def session_update(self, session_id, update, **kwargs):
             if isinstance(update, AgentMessageChunk) and hasattr(update.content, 'text'):
                 self.chunks.append(update.content.text)
+                if self.on_chunk:
+                    self.on_chunk(update.content.text)
 
         def get_and_clear_text(self) -> str:
             text = "".join(self.chunks)
@@ -1084,19 +1470,25 @@ class ExternalExpert:
             # Clean up partial state
             await self._acp_cleanup_proc()
 
-    async def acp_send(self, message: str) -> str:
+    async def acp_send(self, message: str, draft: _DraftStream | None = None) -> str:
         """Send a message via the ACP persistent connection.
 
         Requires acp_start() to have been called successfully.
-        Returns the agent's response text.
+        Returns the agent's response text; chunks are mirrored into `draft`.
         """
         if not self._acp_started or not self._acp_conn:
             raise RuntimeError(f"ACP not started for {self.name}")
 
-        await self._acp_conn.prompt(
-            session_id=self._acp_session_id,
-            prompt=[text_block(message)],
-        )
+        self._acp_client.on_chunk = draft.feed if draft else None
+        try:
+            await self._acp_conn.prompt(
+                session_id=self._acp_session_id,
+                prompt=[text_block(message)],
+            )
+        finally:
+            self._acp_client.on_chunk = None
+        if draft:
+            draft.flush()
         return self._acp_client.get_and_clear_text()
 
     async def acp_stop(self):
@@ -1139,7 +1531,8 @@ class ExternalExpert:
             self._acp_session_id = None
             self._acp_client = None
 
-    async def _call_api(self, messages: list[dict], timeout_override: float | None = ...) -> str:
+    async def _call_api(self, messages: list[dict], timeout_override: float | None = ...,
+                        draft: _DraftStream | None = None) -> str:
         """Send messages to external API and return the assistant response text.
 
         For ACP agent-type externals (model="agent:<name>" with tag openclaw/codex/etc):
@@ -1152,6 +1545,7 @@ class ExternalExpert:
         Args:
             timeout_override: Explicit timeout value. None = no timeout;
                               ... (default sentinel) = use self.timeout.
+            draft: If set, request a streamed reply and mirror it into the draft.
         """
         effective_timeout = self.timeout if timeout_override is ... else timeout_override
 
@@ -1166,7 +1560,8 @@ class ExternalExpert:
                 cli_message = messages[-1].get("content", "") if messages else ""
 
             if self._acp_started:
-                reply = await self.acp_send(cli_message)
+                async with governor.slot(f"acp:{self._acp_tool_name}", self.name):
+                    reply = await self.acp_send(cli_message, draft)
                 print(f"  [OASIS] 🔌 ACP send success for {self.name} ({len(reply)} chars)")
                 return reply
             else:
@@ -1186,11 +1581,20 @@ class ExternalExpert:
         body = {
             "model": self.model,
             "messages": messages,
-            "stream": False,
+            "stream": draft is not None,
         }
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(timeout=effective_timeout)) as client:
-                resp = await client.post(self._api_url, json=body, headers=self._headers())
+            client = get_client(self._api_url)
+            timeout = httpx.Timeout(timeout=effective_timeout)
+            async with governor.slot(f"ext:{self._api_url}", self.name):
+                if draft is not None:
+                    async with client.stream("POST", self._api_url, json=body, headers=self._headers(),
+                                             timeout=timeout) as resp:
+                        if resp.status_code != 200:
+                            await resp.aread()
+                            raise RuntimeError(f"External API error {resp.status_code}: {resp.text[:300]}")
+                        return await _read_sse_chat(resp, draft)
+                resp = await client.post(self._api_url, json=body, headers=self._headers(), timeout=timeout)
             if resp.status_code != 200:
                 raise RuntimeError(f"External API error {resp.status_code}: {resp.text[:300]}")
             data = resp.json()
@@ -1308,7 +1712,7 @@ class ExternalExpert:
                 if instruction:
                     task_parts.append(f"\n执行指令: {instruction}")
                 if others:
-                    task_parts.append(f"\n前序 agent 的执行结果:\n{_format_posts(others)}")
+                    task_parts.append(f"\n前序 agent 的执行结果:\n{await _render_posts(forum, self.name, others)}")
                 task_parts.append("\n请直接执行任务并返回结果。")
                 messages.append({"role": "user", "content": "\n".join(task_parts)})
                 self._initialized = True
@@ -1317,12 +1721,13 @@ class ExternalExpert:
                 if instruction:
                     ctx_parts.append(f"执行指令: {instruction}")
                 if new_posts:
-                    ctx_parts.append(f"其他 agent 的新结果:\n{_format_posts(new_posts)}")
+                    ctx_parts.append(f"其他 agent 的新结果:\n{await _render_posts(forum, self.name, new_posts)}")
                 ctx_parts.append("请继续执行任务并返回结果。")
                 messages.append({"role": "user", "content": "\n".join(ctx_parts)})
 
+            draft = _open_draft(forum, self.name)
             try:
-                reply = await self._call_api_with_oasis_check(messages, timeout_override=None)
+                reply = await self._call_api_with_oasis_check(messages, timeout_override=None, draft=draft)
                 if reply is None:
                     print(f"  [OASIS] 📝 {self.name} (external) collecting oasis reply, skipping publish")
                 else:
@@ -1330,6 +1735,9 @@ class ExternalExpert:
                     print(f"  [OASIS] ✅ {self.name} (external) 执行完成")
             except Exception as e:
                 print(f"  [OASIS] ❌ {self.name} (external) error: {e}")
+            finally:
+                if draft:
+                    draft.close()
             return
 
         # ── Discussion mode ──
@@ -1338,7 +1746,7 @@ class ExternalExpert:
 
         messages: list[dict] = []
         if not self._initialized:
-            posts_text = _format_posts(others) if others else "(还没有其他人发言，你来开启讨论吧)"
+            posts_text = await _render_posts(forum, self.name, others) if others else "(还没有其他人发言，你来开启讨论吧)"
             system_prompt, user_prompt = _build_discuss_prompt(
                 self.title, self.persona, forum.question, posts_text, split=True,
             )
@@ -1349,7 +1757,7 @@ class ExternalExpert:
             self._initialized = True
         else:
             if new_posts:
-                new_text = _format_posts(new_posts)
+                new_text = await _render_posts(forum, self.name, new_posts)
                 prompt = (
                     f"【第 {forum.current_round} 轮讨论更新】\n"
                     f"以下是自你上次发言后的 {len(new_posts)} 条新帖子：\n\n"
@@ -1381,8 +1789,9 @@ class ExternalExpert:
                 prompt += f"\n\n📋 本轮你的专项指令：{instruction}\n请在回复中重点关注和执行这个指令。"
             messages.append({"role": "user", "content": prompt})
 
+        draft = _open_draft(forum, self.name)
         try:
-            reply = await self._call_api_with_oasis_check(messages)
+            reply = await self._call_api_with_oasis_check(messages, draft=draft)
             result = _parse_expert_response(reply)
             await _apply_response(result, self.name, forum, others)
         except json.JSONDecodeError as e:
@@ -1393,3 +1802,6 @@ class ExternalExpert:
                 pass
         except Exception as e:
             print(f"  [OASIS] ❌ {self.name} (external) error: {e}")
+        finally:
+            if draft:
+                draft.close()
@@ -1,11 +1,33 @@
 """
 OASIS Forum - Thread-safe discussion board with persistence
+
+Every change (post, vote, round, timeline event, status) is also published
+as a numbered event on the forum's in-process event bus, so SSE streams and
+waiters can await updates instead of polling.
+
+Persistence: {topic_id}.json is a snapshot, {topic_id}.journal is an
+append-only JSONL tail of bus events written since that snapshot (first
+line is a {"gen": N} header matching the snapshot's journal_gen). A new
+snapshot is taken every OASIS_JOURNAL_SNAPSHOT_EVERY records and on
+save(). All file I/O runs on a single background writer thread, in order.
+
+Drafts: when a topic streams expert output (stream_drafts), partial text is
+kept per author in `drafts` and published as "draft"/"draft_end" bus events.
+Drafts are transient: never journaled or snapshotted; publish() by the same
+author finalizes (removes) the draft.
 """
 
 import asyncio
+import bisect
+import heapq
+import itertools
 import json
 import os
+import queue
+import threading
 import time
+from collections import deque
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 
 # Persistence directory (relative to project root)
@@ -13,6 +35,109 @@ _this_dir = os.path.dirname(os.path.abspath(__file__))
 _project_root = os.path.dirname(_this_dir)
 DISCUSSIONS_DIR = os.path.join(_project_root, "data", "oasis_discussions")
 
+# Number of recent events kept per forum for Last-Event-ID resume
+_EVENT_BUFFER = 4096
+
+# Journal records between automatic snapshots
+_SNAPSHOT_EVERY = int(os.getenv("OASIS_JOURNAL_SNAPSHOT_EVERY", "200"))
+
+# Bus events that are not persisted (live-only)
+_TRANSIENT_EVENTS = ("draft", "draft_end")
+
+
+def stream_drafts_default() -> bool:
+    return os.getenv("OASIS_STREAM_DRAFTS", "0").lower() in ("1", "true", "yes")
+
+
+def _atomic_write(path: str, text: str):
+    """Write via temp file + fsync + rename, so readers never see a torn file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class _JournalWriter:
+    """Single background thread that performs all forum file I/O in submission order."""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, op: str, *args):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="oasis-journal", daemon=True)
+                    self._thread.start()
+        self._queue.put((op, args))
+
+    def flush(self):
+        """Block until every submitted operation has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def barrier(self):
+        """Block until the operations submitted so far have been written.
+
+        Unlike flush(), writes submitted after this call (other discussions keep
+        journaling) do not extend the wait.
+        """
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(("barrier", (done,)))
+        done.wait()
+
+    def _run(self):
+        while True:
+            op, args = self._queue.get()
+            try:
+                getattr(self, f"_do_{op}")(*args)
+            except Exception as e:
+                print(f"[OASIS] ⚠️ journal {op} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _do_snapshot(path: str, journal_path: str, data: dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _atomic_write(path, json.dumps(data, ensure_ascii=False))
+        # Start a fresh journal for the new generation. A crash between the two
+        # writes leaves an old-generation journal, which replay ignores.
+        _atomic_write(journal_path, json.dumps({"gen": data["journal_gen"]}) + "\n")
+
+    @staticmethod
+    def _do_append(journal_path: str, lines: str):
+        with open(journal_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    @staticmethod
+    def _do_write_json(path: str, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _atomic_write(path, json.dumps(data, ensure_ascii=False))
+
+    @staticmethod
+    def _do_barrier(done: threading.Event):
+        done.set()
+
+    @staticmethod
+    def _do_delete(*paths: str):
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+_writer = _JournalWriter()
+
+
+def flush_journal():
+    """Wait for all pending forum writes (call before shutdown)."""
+    _writer.flush()
+
 
 @dataclass
 class TimelineEvent:
@@ -51,7 +176,7 @@ class Post:
             "reply_to": self.reply_to, "upvotes": self.upvotes,
             "downvotes": self.downvotes, "timestamp": self.timestamp,
             "elapsed": round(self.elapsed, 2),
-            "voters": self.voters,
+            "voters": dict(self.voters),
             "round_num": self.round_num,
         }
 
@@ -63,6 +188,66 @@ class Post:
         return cls(**d2)
 
 
+class PostView(Sequence):
+    """Read-only view over the forum's append-only post list (no copy).
+
+    Covers posts[start:stop], optionally skipping one author's posts
+    (browse(exclude_self=True)). Because posts are only ever appended, the
+    view stays stable while the forum keeps growing.
+    """
+
+    __slots__ = ("_posts", "_start", "_stop", "_skip_author", "_skip_positions")
+
+    def __init__(self, posts: list["Post"], start: int, stop: int,
+                 skip_author: str | None = None, skip_positions: list[int] | None = None):
+        self._posts = posts
+        self._start = start
+        self._stop = stop
+        self._skip_author = skip_author
+        # sorted positions of skip_author's posts (shared index list, append-only)
+        self._skip_positions = skip_positions or []
+
+    def _skipped(self) -> int:
+        pos = self._skip_positions
+        return bisect.bisect_left(pos, self._stop) - bisect.bisect_left(pos, self._start)
+
+    def __len__(self) -> int:
+        return self._stop - self._start - (self._skipped() if self._skip_author else 0)
+
+    def __iter__(self):
+        it = itertools.islice(self._posts, self._start, self._stop)
+        if self._skip_author is None:
+            return it
+        return (p for p in it if p.author != self._skip_author)
+
+    def __reversed__(self):
+        for i in range(self._stop - 1, self._start - 1, -1):
+            p = self._posts[i]
+            if p.author != self._skip_author:
+                yield p
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if self._skip_author is None:
+            n = self._stop - self._start
+            if index < 0:
+                index += n
+            if not 0 <= index < n:
+                raise IndexError("post index out of range")
+            return self._posts[self._start + index]
+        # Walk from the nearer end (typical use is [-1] / [0])
+        source = reversed(self) if index < 0 else iter(self)
+        steps = -index - 1 if index < 0 else index
+        for i, p in enumerate(source):
+            if i == steps:
+                return p
+        raise IndexError("post index out of range")
+
+    def __repr__(self) -> str:
+        return f"PostView({len(self)} posts)"
+
+
 class DiscussionForum:
     """
     Thread-safe shared discussion board for a single topic.
@@ -74,16 +259,130 @@ class DiscussionForum:
         self.question = question
         self.user_id = user_id
         self.max_rounds = max_rounds
-        self.current_round = 0
+        # Event bus: monotonically increasing seq + ring buffer of recent events.
+        # _changed is replaced (after being set) on every emit, waking all waiters.
+        self._seq = 0
+        self._events: deque[dict] = deque(maxlen=_EVENT_BUFFER)
+        self._changed = asyncio.Event()
+        self._current_round = 0
+        # Post storage: append-only list + indexes (positions into self.posts).
+        # Always go through _add_post(); assigning self.posts requires _reindex().
         self.posts: list[Post] = []
+        self._by_id: dict[int, Post] = {}
+        self._by_author: dict[str, list[int]] = {}
+        self._round_starts: list[tuple[int, int]] = []   # (round_num, first position)
+        self._rounds_monotonic = True
+        self._score_heap: list[tuple[int, int]] = []      # (-net score, post id), lazily invalidated
         self.timeline: list[TimelineEvent] = []
-        self.conclusion: str | None = None
-        self.status = "pending"
-        self.discussion: bool = True    # True=讨论模式, False=执行模式
+        self._conclusion: str | None = None
+        self._status = "pending"
+        self._discussion: bool = True   # True=讨论模式, False=执行模式
         self.created_at = time.time()
         self._start_time: float = 0.0   # set when discussion actually starts
         self._lock = asyncio.Lock()
         self._counter = 0
+        # Journal generation of the last snapshot (None = not persisted yet)
+        self._journal_gen: int | None = None
+        self._journal_pending = 0
+        self._dirty = True   # changed since the last snapshot
+        # Streaming expert output: author -> {"author", "content", "round_num", "elapsed"}
+        self.stream_drafts = stream_drafts_default()
+        self.drafts: dict[str, dict] = {}
+        # Prompt context policy from the schedule (oasis.context, set by the engine; not persisted)
+        self.context_policy = None
+        # Called after every snapshot (TopicStore uses it to refresh the topic index)
+        self.on_save = None
+
+    # ── Observable state (setters publish events) ──
+
+    @property
+    def current_round(self) -> int:
+        return self._current_round
+
+    @current_round.setter
+    def current_round(self, value: int):
+        if value != self._current_round:
+            self._current_round = value
+            self._emit("round", {"round": value})
+
+    @property
+    def discussion(self) -> bool:
+        return self._discussion
+
+    @discussion.setter
+    def discussion(self, value: bool):
+        if value != self._discussion:
+            self._discussion = value
+            self._emit("mode", {"discussion": value})
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str):
+        if value != self._status:
+            self._status = value
+            self._emit("status", {"status": value})
+
+    @property
+    def conclusion(self) -> str | None:
+        return self._conclusion
+
+    @conclusion.setter
+    def conclusion(self, value: str | None):
+        self._conclusion = value
+        self._emit("conclusion", {"conclusion": value})
+
+    # ── Event bus ──
+
+    def _emit(self, etype: str, data: dict):
+        self._seq += 1
+        self._events.append({"seq": self._seq, "type": etype, "data": data})
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        if etype in _TRANSIENT_EVENTS:
+            return
+        self._dirty = True
+        if self._journal_gen is not None:
+            self._journal(etype, data)
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the latest event."""
+        return self._seq
+
+    def events_since(self, after: int) -> list[dict] | None:
+        """Events with seq > after, or None if they are no longer buffered
+        (or `after` is from a previous server run) — caller should resync."""
+        if after > self._seq:
+            return None
+        if after == self._seq:
+            return []
+        if not self._events or self._events[0]["seq"] > after + 1:
+            return None
+        start = after + 1 - self._events[0]["seq"]
+        return list(itertools.islice(self._events, start, None))
+
+    async def wait_for_events(self, after: int, timeout: float | None = None) -> bool:
+        """Wait until an event newer than `after` exists. Returns False on timeout."""
+        if self._seq != after:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def wait_until_finished(self, timeout: float) -> bool:
+        """Wait until status leaves pending/discussing. Returns False on timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.status in ("pending", "discussing"):
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not await self.wait_for_events(self._seq, remaining):
+                return False
+        return True
 
     def start_clock(self):
         """Mark the discussion start time (T=0 for all elapsed calculations)."""
@@ -100,6 +399,7 @@ class DiscussionForum:
         """Append a timestamped event to the timeline."""
         ev = TimelineEvent(elapsed=self.elapsed(), event=event, agent=agent, detail=detail)
         self.timeline.append(ev)
+        self._emit("timeline", ev.to_dict())
         print(f"  [OASIS] ⏱ T+{ev.elapsed:.1f}s  {event}"
               + (f"  [{agent}]" if agent else "")
               + (f"  {detail}" if detail else ""))
@@ -121,6 +421,20 @@ class DiscussionForum:
             "created_at": self.created_at,
         }
 
+    def summary(self) -> dict:
+        """Small metadata record for the topic index (no posts/timeline)."""
+        return {
+            "topic_id": self.topic_id,
+            "question": self.question,
+            "user_id": self.user_id,
+            "status": self.status,
+            "post_count": len(self.posts),
+            "current_round": self.current_round,
+            "max_rounds": self.max_rounds,
+            "discussion": self.discussion,
+            "created_at": self.created_at,
+        }
+
     @classmethod
     def from_dict(cls, d: dict) -> "DiscussionForum":
         forum = cls(
@@ -135,6 +449,7 @@ class DiscussionForum:
         forum.discussion = d.get("discussion", True)
         forum.created_at = d.get("created_at", 0)
         forum.posts = [Post.from_dict(p) for p in d.get("posts", [])]
+        forum._reindex()
         forum.timeline = [TimelineEvent.from_dict(e) for e in d.get("timeline", [])]
         forum._counter = max((p.id for p in forum.posts), default=0)
         return forum
@@ -146,11 +461,93 @@ class DiscussionForum:
         os.makedirs(user_dir, exist_ok=True)
         return os.path.join(user_dir, f"{self.topic_id}.json")
 
+    def _journal_path(self) -> str:
+        return os.path.join(DISCUSSIONS_DIR, self.user_id, f"{self.topic_id}.journal")
+
     def save(self):
-        """Persist current state to disk."""
-        path = self._storage_path()
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        """Snapshot current state to disk (written off-loop, atomically).
+
+        Also starts a new journal generation; later changes are appended
+        to the journal until the next snapshot.
+        """
+        self._journal_gen = (self._journal_gen or 0) + 1
+        self._journal_pending = 0
+        self._dirty = False
+        data = self.to_dict()
+        data["journal_gen"] = self._journal_gen
+        _writer.submit("snapshot", self._storage_path(), self._journal_path(), data)
+        if self.on_save:
+            self.on_save(self)
+
+    def save_if_dirty(self):
+        """Snapshot only if something changed since the last snapshot/load."""
+        if self._dirty:
+            self.save()
+
+    def delete_storage(self):
+        """Remove snapshot and journal (after any pending writes), stop journaling."""
+        self._journal_gen = None
+        _writer.submit("delete", self._storage_path(), self._journal_path())
+
+    def _journal(self, etype: str, data: dict):
+        line = json.dumps({"t": etype, "d": data}, ensure_ascii=False) + "\n"
+        _writer.submit("append", self._journal_path(), line)
+        self._journal_pending += 1
+        if self._journal_pending >= _SNAPSHOT_EVERY:
+            self.save()
+
+    def _replay(self, etype: str, d: dict):
+        """Apply one journal record (inverse of the events emitted above)."""
+        if etype == "post":
+            self._add_post(Post(
+                id=d["id"], author=d["author"], content=d["content"],
+                reply_to=d.get("reply_to"), timestamp=d.get("timestamp", 0.0),
+                elapsed=d.get("elapsed", 0.0), round_num=d.get("round_num", 0),
+            ))
+            self._counter = max(self._counter, d["id"])
+        elif etype == "vote":
+            post = self._find(d["post_id"])
+            if post:
+                post.voters[d["voter"]] = d["direction"]
+                post.upvotes = d["upvotes"]
+                post.downvotes = d["downvotes"]
+                self._rescore(post)
+        elif etype == "timeline":
+            self.timeline.append(TimelineEvent.from_dict(d))
+        elif etype == "round":
+            self._current_round = d["round"]
+        elif etype == "status":
+            self._status = d["status"]
+        elif etype == "conclusion":
+            self._conclusion = d["conclusion"]
+        elif etype == "mode":
+            self._discussion = d["discussion"]
+
+    @classmethod
+    def load(cls, snapshot_path: str) -> "DiscussionForum":
+        """Load a forum from its snapshot plus the matching journal tail."""
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        forum = cls.from_dict(data)
+        gen = data.get("journal_gen")
+        journal_path = snapshot_path[:-len(".json")] + ".journal"
+        if gen is not None and os.path.exists(journal_path):
+            with open(journal_path, "r", encoding="utf-8") as f:
+                header = f.readline()
+                try:
+                    same_gen = json.loads(header).get("gen") == gen
+                except ValueError:
+                    same_gen = False
+                if same_gen:
+                    for line in f:
+                        try:
+                            rec = json.loads(line)
+                        except ValueError:
+                            break  # torn last line after a crash
+                        forum._replay(rec["t"], rec["d"])
+        forum._journal_gen = gen
+        forum._dirty = False
+        return forum
 
     @classmethod
     def load_all(cls) -> dict[str, "DiscussionForum"]:
@@ -166,9 +563,7 @@ class DiscussionForum:
                 if not fname.endswith(".json"):
                     continue
                 try:
-                    with open(os.path.join(user_dir, fname), "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    forum = cls.from_dict(data)
+                    forum = cls.load(os.path.join(user_dir, fname))
                     result[forum.topic_id] = forum
                 except Exception as e:
                     print(f"[OASIS] ⚠️ Failed to load {fname}: {e}")
@@ -186,9 +581,37 @@ class DiscussionForum:
                 elapsed=self.elapsed(),
                 round_num=self.current_round,
             )
-            self.posts.append(post)
+            self._add_post(post)
+            self._emit("post", {
+                "id": post.id, "author": post.author, "content": post.content,
+                "reply_to": post.reply_to, "round_num": post.round_num,
+                "elapsed": round(post.elapsed, 2), "timestamp": post.timestamp,
+            })
+            if self.drafts.pop(author, None) is not None:
+                self._emit("draft_end", {"author": author, "post_id": post.id})
             return post
 
+    # ── Drafts (streamed partial output, not persisted) ──
+
+    def draft_update(self, author: str, delta: str, reset: bool = False):
+        """Append streamed text to `author`'s draft (reset=True starts it over)."""
+        draft = self.drafts.get(author)
+        if draft is None:
+            draft = self.drafts[author] = {
+                "author": author, "content": "",
+                "round_num": self.current_round, "elapsed": round(self.elapsed(), 2),
+            }
+        if reset:
+            draft["content"] = ""
+        draft["content"] += delta
+        self._emit("draft", {"author": author, "delta": delta, "reset": reset,
+                             "length": len(draft["content"])})
+
+    def draft_discard(self, author: str):
+        """Drop `author`'s draft without publishing (error / empty reply)."""
+        if self.drafts.pop(author, None) is not None:
+            self._emit("draft_end", {"author": author, "post_id": None})
+
     async def vote(self, voter: str, post_id: int, direction: str):
         """Vote on a post. Each voter can only vote once per post, cannot vote on own posts."""
         async with self._lock:
@@ -199,6 +622,11 @@ class DiscussionForum:
                     post.upvotes += 1
                 else:
                     post.downvotes += 1
+                self._rescore(post)
+                self._emit("vote", {
+                    "post_id": post.id, "voter": voter, "direction": direction,
+                    "upvotes": post.upvotes, "downvotes": post.downvotes,
+                })
 
     async def browse(
         self,
@@ -206,9 +634,13 @@ class DiscussionForum:
         exclude_self: bool = False,
         visible_authors: set[str] | None = None,
         from_round: int | None = None,
-    ) -> list[Post]:
+    ) -> Sequence[Post]:
         """Browse posts with optional visibility filtering.
 
+        Returns a read-only sequence in publish order. Unfiltered and
+        exclude_self/from_round browses are O(log n) views over the post list;
+        visible_authors merges only those authors' index lists.
+
         Args:
             viewer: Current viewer's name.
             exclude_self: If True, exclude the viewer's own posts.
@@ -216,29 +648,99 @@ class DiscussionForum:
             from_round: If set, only include posts from this round onward (execute mode non-DAG).
         """
         async with self._lock:
-            result = list(self.posts)
-            if exclude_self and viewer:
-                result = [p for p in result if p.author != viewer]
+            stop = len(self.posts)
+            skip = viewer if exclude_self and viewer else None
+
+            if from_round is not None and not self._rounds_monotonic:
+                # Rounds went backwards at some point: fall back to a filtered scan
+                return [
+                    p for p in self.posts
+                    if p.round_num >= from_round and p.author != skip
+                    and (visible_authors is None or p.author in visible_authors)
+                ]
+            start = self._round_start_pos(from_round) if from_round is not None else 0
+
             if visible_authors is not None:
-                result = [p for p in result if p.author in visible_authors]
-            if from_round is not None:
-                result = [p for p in result if p.round_num >= from_round]
-            return result
+                lists = [self._by_author[a] for a in visible_authors if a in self._by_author and a != skip]
+                positions = heapq.merge(*lists) if len(lists) > 1 else (lists[0] if lists else [])
+                return [self.posts[i] for i in positions if start <= i < stop]
+
+            return PostView(self.posts, start, stop, skip, self._by_author.get(skip) if skip else None)
+
+    def posts_by(self, author: str) -> list[Post]:
+        """All posts written by `author`, oldest first."""
+        return [self.posts[i] for i in self._by_author.get(author, ())]
+
+    async def last_post_by(self, authors: set[str]) -> Post | None:
+        """Most recent post written by any of `authors`."""
+        async with self._lock:
+            last = max((self._by_author[a][-1] for a in authors if a in self._by_author), default=None)
+            return self.posts[last] if last is not None else None
 
     async def get_top_posts(self, n: int = 3) -> list[Post]:
-        """Get the top N posts ranked by net upvotes."""
+        """Get the top N posts ranked by net upvotes (ties: earlier post first)."""
         async with self._lock:
-            return sorted(
-                self.posts,
-                key=lambda p: p.upvotes - p.downvotes,
-                reverse=True,
-            )[:n]
+            heap = self._score_heap
+            if len(heap) > 4 * len(self.posts) + 64:
+                self._rebuild_score_heap()
+                heap = self._score_heap
+            top: list[Post] = []
+            popped: list[tuple[int, int]] = []
+            seen: set[int] = set()
+            while heap and len(top) < n:
+                entry = heapq.heappop(heap)
+                neg_score, pid = entry
+                post = self._by_id.get(pid)
+                if post is None or pid in seen or post.upvotes - post.downvotes != -neg_score:
+                    continue  # stale or duplicate entry: drop it for good
+                seen.add(pid)
+                popped.append(entry)
+                top.append(post)
+            for entry in popped:
+                heapq.heappush(heap, entry)
+            return top
 
     async def get_post_count(self) -> int:
         """Get total number of posts."""
         async with self._lock:
             return len(self.posts)
 
+    # ── Post indexes (caller must hold lock, or be loading) ──
+
+    def _add_post(self, post: Post):
+        pos = len(self.posts)
+        self.posts.append(post)
+        self._by_id[post.id] = post
+        self._by_author.setdefault(post.author, []).append(pos)
+        if not self._round_starts or post.round_num > self._round_starts[-1][0]:
+            self._round_starts.append((post.round_num, pos))
+        elif post.round_num < self._round_starts[-1][0]:
+            self._rounds_monotonic = False
+        heapq.heappush(self._score_heap, (-(post.upvotes - post.downvotes), post.id))
+
+    def _reindex(self):
+        posts, self.posts = self.posts, []
+        self._by_id = {}
+        self._by_author = {}
+        self._round_starts = []
+        self._rounds_monotonic = True
+        self._score_heap = []
+        for post in posts:
+            self._add_post(post)
+
+    def _rescore(self, post: Post):
+        # Old entries for this post become stale and are skipped lazily
+        heapq.heappush(self._score_heap, (-(post.upvotes - post.downvotes), post.id))
+
+    def _rebuild_score_heap(self):
+        self._score_heap = [(-(p.upvotes - p.downvotes), p.id) for p in self.posts]
+        heapq.heapify(self._score_heap)
+
+    def _round_start_pos(self, from_round: int) -> int:
+        """Position of the first post with round_num >= from_round (rounds monotonic)."""
+        i = bisect.bisect_left(self._round_starts, (from_round, -1))
+        return self._round_starts[i][1] if i < len(self._round_starts) else len(self.posts)
+
     def _find(self, post_id: int) -> Post | None:
         """Find a post by ID (caller must hold lock)."""
-        return next((p for p in self.posts if p.id == post_id), None)
+        return self._by_id.get(post_id)
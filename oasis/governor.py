@@ -0,0 +1,227 @@
+"""
+OASIS Forum - Backend governor: max-in-flight + token-bucket rate limits per
+expert backend, with fair queuing across users and topics.
+
+Every outbound expert call goes through `governor.slot(backend, agent)`:
+
+  llm            ExpertAgent direct LLM calls
+  session        SessionExpert → local agent /v1/chat/completions
+  ext:<api_url>  ExternalExpert HTTP calls (one gate per endpoint)
+  acp:<tool>     ExternalExpert ACP calls (one gate per CLI tool)
+
+Limits come from DEFAULT_LIMITS, overridden by OASIS_BACKEND_LIMITS (JSON),
+keyed by the exact backend name or by its kind ("ext", "acp"):
+
+  OASIS_BACKEND_LIMITS={"llm": {"max_inflight": 8, "rate": 2, "burst": 4},
+                        "ext:https://api.deepseek.com/v1/chat/completions": {"max_inflight": 2}}
+
+  max_inflight  concurrent calls
+  rate          calls started per second (token bucket, 0 = unlimited)
+  burst         bucket size (default max(1, rate))
+
+Waiters are served round-robin over users, then over each user's topics,
+so one large topic cannot starve the others. The topic comes from the
+engine running in the current task (bind_forum). Waits of at least
+OASIS_QUEUE_LOG_MS (default 200ms) are recorded in the topic timeline as
+"queue_wait" events; totals are available from /governor_stats.
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+DEFAULT_LIMITS = {
+    "llm": {"max_inflight": 16, "rate": 0},
+    "session": {"max_inflight": 8, "rate": 0},
+    "ext": {"max_inflight": 4, "rate": 0},
+    "acp": {"max_inflight": 4, "rate": 0},
+}
+
+# Forum of the discussion running in the current task (set by DiscussionEngine.run)
+_current_forum: contextvars.ContextVar = contextvars.ContextVar("oasis_forum", default=None)
+
+
+def bind_forum(forum):
+    """Attribute expert calls made from the current task (and its children) to `forum`."""
+    _current_forum.set(forum)
+
+
+class BackendGate:
+    """Max-in-flight slots (fair FIFO per user/topic) + token bucket for one backend."""
+
+    def __init__(self, name: str, max_inflight: int, rate: float = 0.0, burst: float | None = None):
+        self.name = name
+        self.max_inflight = max(1, int(max_inflight))
+        self.rate = max(0.0, float(rate))
+        self.burst = max(1.0, float(burst if burst is not None else self.rate))
+        self.in_flight = 0
+        self.queued = 0
+        # user → topic → waiters; both levels rotate round-robin
+        self._queues: OrderedDict[str, OrderedDict[str, deque]] = OrderedDict()
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._token_lock = asyncio.Lock()
+        self.granted = 0
+        self.throttled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    # ── Slots ──
+
+    async def acquire(self, user: str, topic: str) -> float:
+        """Wait for a slot (and a token); returns the seconds waited."""
+        started = time.monotonic()
+        if self.in_flight < self.max_inflight and not self.queued:
+            self.in_flight += 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(user, OrderedDict()).setdefault(topic, deque()).append(fut)
+            self.queued += 1
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self.release()  # granted just before the cancel
+                else:
+                    self._remove(user, topic, fut)
+                raise
+        try:
+            await self._take_token()
+        except BaseException:
+            self.release()
+            raise
+        waited = time.monotonic() - started
+        self.granted += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return waited
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.in_flight < self.max_inflight and self.queued:
+            user, topics = next(iter(self._queues.items()))
+            topic, waiters = next(iter(topics.items()))
+            fut = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                topics.move_to_end(topic)
+            else:
+                del topics[topic]
+            if topics:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            if fut.done():
+                continue  # cancelled, its task has not cleaned up yet
+            self.in_flight += 1
+            fut.set_result(None)
+
+    def _remove(self, user: str, topic: str, fut: asyncio.Future):
+        topics = self._queues.get(user)
+        waiters = topics.get(topic) if topics else None
+        if waiters is None or fut not in waiters:
+            return
+        waiters.remove(fut)
+        self.queued -= 1
+        if not waiters:
+            del topics[topic]
+            if not topics:
+                del self._queues[user]
+
+    # ── Token bucket ──
+
+    async def _take_token(self):
+        if self.rate <= 0:
+            return
+        async with self._token_lock:
+            throttled = False
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+                self._refilled = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                if not throttled:
+                    self.throttled += 1
+                    throttled = True
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def stats(self) -> dict:
+        return {
+            "max_inflight": self.max_inflight,
+            "rate": self.rate,
+            "burst": self.burst,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queued_by_user": {
+                user: sum(len(w) for w in topics.values()) for user, topics in self._queues.items()
+            },
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "avg_wait_ms": round(self.wait_total / self.granted * 1000, 1) if self.granted else None,
+            "max_wait_ms": round(self.wait_max * 1000, 1),
+        }
+
+
+class ExpertGovernor:
+    """Registry of BackendGates (single event loop, shared by all topics)."""
+
+    def __init__(self, limits: dict | None = None):
+        if limits is None:
+            try:
+                limits = json.loads(os.getenv("OASIS_BACKEND_LIMITS", "") or "{}")
+            except ValueError:
+                print("[OASIS] ⚠️ OASIS_BACKEND_LIMITS 不是合法 JSON，已忽略")
+                limits = {}
+        self._limits = limits if isinstance(limits, dict) else {}
+        self._log_wait = int(os.getenv("OASIS_QUEUE_LOG_MS", "200")) / 1000
+        self._gates: dict[str, BackendGate] = {}
+
+    def _config(self, backend: str) -> dict:
+        kind = backend.split(":", 1)[0]
+        cfg = dict(DEFAULT_LIMITS.get(kind, DEFAULT_LIMITS["ext"]))
+        cfg.update(self._limits.get(kind) or {})
+        cfg.update(self._limits.get(backend) or {})
+        return cfg
+
+    def gate(self, backend: str) -> BackendGate:
+        g = self._gates.get(backend)
+        if g is None:
+            cfg = self._config(backend)
+            g = self._gates[backend] = BackendGate(
+                backend, cfg.get("max_inflight", 4), cfg.get("rate", 0), cfg.get("burst"),
+            )
+        return g
+
+    @asynccontextmanager
+    async def slot(self, backend: str, agent: str = ""):
+        """Hold one call slot on `backend` for the duration of the block."""
+        forum = _current_forum.get()
+        user = forum.user_id if forum is not None else "-"
+        topic = forum.topic_id if forum is not None else "-"
+        g = self.gate(backend)
+        depth = g.queued
+        waited = await g.acquire(user, topic)
+        if forum is not None and waited >= self._log_wait:
+            forum.log_event(
+                "queue_wait", agent=agent,
+                detail=f"{backend}: waited {waited:.1f}s, queue depth {depth}",
+            )
+        try:
+            yield
+        finally:
+            g.release()
+
+    def stats(self) -> dict:
+        return {name: g.stats() for name, g in sorted(self._gates.items())}
+
+
+governor = ExpertGovernor()
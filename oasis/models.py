@@ -42,6 +42,15 @@ class CreateTopicRequest(BaseModel):
     callback_url: Optional[str] = None
     callback_session_id: Optional[str] = None
     team: Optional[str] = None  # Team name for scoped agent storage
+    # Stateless ExpertAgent LLM calls (None = OASIS_LLM_DEDUP / OASIS_LLM_CACHE):
+    # llm_dedup: share one completion among identical in-flight prompts
+    # llm_cache: replay cached completions for unchanged prompts (YAML iteration)
+    llm_dedup: Optional[bool] = None
+    llm_cache: Optional[bool] = None
+    # ExpertAgent keeps a stable system message + per-round deltas (None = OASIS_EXPERT_MEMORY)
+    expert_memory: Optional[bool] = None
+    # Stream expert output into live drafts (None = OASIS_STREAM_DRAFTS)
+    stream_drafts: Optional[bool] = None
 
 
 class PostInfo(BaseModel):
@@ -56,6 +65,14 @@ class PostInfo(BaseModel):
     elapsed: float = 0.0
 
 
+class DraftInfo(BaseModel):
+    """In-progress (streamed) output of an expert, not yet published."""
+    author: str
+    content: str
+    round_num: int = 0
+    elapsed: float = 0.0
+
+
 class TimelineEventInfo(BaseModel):
     """A single timeline event."""
     elapsed: float
@@ -76,6 +93,7 @@ class TopicDetail(BaseModel):
     timeline: list[TimelineEventInfo] = []
     discussion: bool = True
     conclusion: Optional[str] = None
+    drafts: list[DraftInfo] = []
 
 
 class TopicSummary(BaseModel):
@@ -42,6 +42,18 @@ YAML format (new unified graph):
       then: final                 # condition true → go to final
       else: review                # condition false → loop back to review
 
+Executor (optional, top-level):
+  executor: superstep   # default: Pregel super-steps as described above
+  executor: dataflow    # each node starts as soon as its fixed-edge in_sources
+                        # are complete (no per-step barrier); same conditional /
+                        # selector edge semantics
+  max_concurrency: 4    # dataflow only: max nodes running at once (0 = unlimited)
+
+Context policy (optional, top-level; see oasis/context.py):
+  context:
+    max_tokens: 3000      # forum section budget per expert call
+    top_k: 8              # + recent / latest_per_author / reply_neighbours / summaries
+
 Backward compatibility:
   - version: 1 YAML (no edges/conditional_edges) is auto-converted:
     - Steps without 'id' get auto-generated IDs (_step_0, _step_1, ...)
@@ -66,6 +78,8 @@ import os
 
 import yaml
 
+from oasis.context import ContextPolicy, parse_context_policy
+
 # Placeholder mask used in YAML to indicate "use key from environment"
 _API_KEY_MASK = "****"
 
@@ -76,6 +90,9 @@ END = "__end__"
 # Safety limits
 MAX_SUPER_STEPS = 200  # max Pregel iterations before forced stop
 
+# Graph executors (YAML "executor")
+EXECUTORS = ("superstep", "dataflow")
+
 
 class StepType(str, Enum):
     """Types of schedule steps (graph nodes)."""
@@ -148,6 +165,9 @@ class Schedule:
     repeat: bool = False      # True = wrap entire graph in a repeat loop
     max_repeat: int = 1       # how many times to repeat (only if repeat=True)
     discussion: bool = False  # True = forum discussion mode; False = execute mode
+    executor: str = "superstep"  # "superstep" (Pregel barrier) or "dataflow"
+    max_concurrency: int = 0     # dataflow: max concurrently running nodes (0 = unlimited)
+    context: Optional[ContextPolicy] = None  # prompt context policy (None = full forum)
 
     # Derived: populated after parsing
     node_map: dict[str, ScheduleStep] = field(default_factory=dict)
@@ -336,6 +356,13 @@ def parse_schedule(yaml_content: str) -> Schedule:
     repeat = bool(data.get("repeat", False))
     discussion = bool(data.get("discussion", False))
     version = int(data.get("version", 1))
+    executor = str(data.get("executor", "superstep")).strip().lower()
+    if executor not in EXECUTORS:
+        raise ValueError(f"'executor' must be one of {', '.join(EXECUTORS)} (got '{executor}')")
+    max_concurrency = int(data.get("max_concurrency", 0) or 0)
+    if max_concurrency < 0:
+        raise ValueError("'max_concurrency' must be >= 0")
+    context = parse_context_policy(data.get("context"))
 
     # Parse all nodes
     nodes: list[ScheduleStep] = []
@@ -448,6 +475,9 @@ def parse_schedule(yaml_content: str) -> Schedule:
         repeat=repeat,
         max_repeat=max_repeat,
         discussion=discussion,
+        executor=executor,
+        max_concurrency=max_concurrency,
+        context=context,
     )
 
     # Validate and build indexes
@@ -19,7 +19,7 @@ import uuid
 import time
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 import httpx
@@ -74,23 +74,27 @@ from oasis.models import (
     TopicSummary,
     PostInfo,
     TimelineEventInfo,
+    DraftInfo,
     DiscussionStatus,
 )
-from oasis.forum import DiscussionForum
+from oasis.forum import DiscussionForum, flush_journal
+from oasis.topic_store import TopicStore
 from oasis.engine import DiscussionEngine
 
 # Ensure src/ is importable for helper reuse
 _src_path = os.path.join(_project_root, "src")
 if _src_path not in sys.path:
     sys.path.insert(0, _src_path)
+from llm_factory import aclose_model_pool
+from http_pool import aclose_http_pool, get_client
 try:
     from mcp_oasis import _yaml_to_layout_data
 except Exception:
     _yaml_to_layout_data = None
 
 
-# --- In-memory storage ---
-discussions: dict[str, DiscussionForum] = {}
+# --- Storage (topic index on disk, forums loaded lazily) ---
+discussions = TopicStore()
 engines: dict[str, DiscussionEngine] = {}
 tasks: dict[str, asyncio.Task] = {}
 
@@ -102,8 +106,8 @@ _openclaw_bundled_skills: list = []
 
 # --- Helpers ---
 
-def _get_forum_or_404(topic_id: str) -> DiscussionForum:
-    forum = discussions.get(topic_id)
+async def _get_forum_or_404(topic_id: str) -> DiscussionForum:
+    forum = await discussions.get(topic_id)
     if not forum:
         raise HTTPException(404, "Topic not found")
     return forum
@@ -184,15 +188,24 @@ async def lifespan(app: FastAPI):
     _preload_openclaw_skills()
     
     # Load historical discussions
-    loaded = DiscussionForum.load_all()
-    discussions.update(loaded)
-    print(f"[OASIS] 🏛️ Forum server started (loaded {len(loaded)} historical discussions)")
+    interrupted = await asyncio.to_thread(discussions.open)
+    for forum in interrupted:
+        # The index said pending/discussing; journal replay may show the discussion
+        # actually concluded before the crash — keep that result, only mark the rest.
+        if forum.status in ("pending", "discussing"):
+            forum.status = "error"
+            forum.conclusion = "服务重启，讨论被中断"
+        forum.save()  # persists the replayed state and refreshes the index entry
+    print(f"[OASIS] 🏛️ Forum server started ({len(discussions)} historical discussions indexed)")
     yield
-    for tid, forum in discussions.items():
+    for forum in discussions.loaded():
         if forum.status == "discussing":
             forum.status = "error"
             forum.conclusion = "服务关闭，讨论被终止"
-        forum.save()
+        forum.save_if_dirty()
+    await asyncio.to_thread(flush_journal)
+    await aclose_model_pool()
+    await aclose_http_pool()
     print("[OASIS] 🏛️ Forum server stopped (all discussions saved)")
 
 
@@ -208,7 +221,7 @@ app = FastAPI(
 # ------------------------------------------------------------------
 async def _run_discussion(topic_id: str, engine: DiscussionEngine):
     """Run a discussion engine in the background, then fire callback if configured."""
-    forum = discussions.get(topic_id)
+    forum = discussions.peek(topic_id) or engine.forum
     try:
         await engine.run()
     except Exception as e:
@@ -237,12 +250,12 @@ async def _run_discussion(topic_id: str, engine: DiscussionEngine):
             f"📋 结论:\n{conclusion}"
         )
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                await client.post(
-                    cb_url,
-                    json={"user_id": user_id, "text": text, "session_id": cb_session},
-                    headers={"X-Internal-Token": internal_token},
-                )
+            await get_client(cb_url).post(
+                cb_url,
+                json={"user_id": user_id, "text": text, "session_id": cb_session},
+                headers={"X-Internal-Token": internal_token},
+                timeout=10.0,
+            )
             print(f"[OASIS] 📨 Callback sent for {topic_id} → {cb_session}")
         except Exception as cb_err:
             print(f"[OASIS] ⚠️ Callback failed for {topic_id}: {cb_err}")
@@ -263,7 +276,7 @@ async def create_topic(req: CreateTopicRequest):
         user_id=req.user_id,
         max_rounds=req.max_rounds,
     )
-    discussions[topic_id] = forum
+    discussions.add(forum)
     forum.save()
 
     try:
@@ -277,6 +290,10 @@ async def create_topic(req: CreateTopicRequest):
             early_stop=req.early_stop,
             discussion=req.discussion,
             team=req.team or "",
+            llm_dedup=req.llm_dedup,
+            llm_cache=req.llm_cache,
+            stream_drafts=req.stream_drafts,
+            expert_memory=req.expert_memory,
         )
     except Exception as e:
         forum.status = "error"
@@ -301,7 +318,7 @@ async def create_topic(req: CreateTopicRequest):
 @app.delete("/topics/{topic_id}")
 async def cancel_topic(topic_id: str, user_id: str = Query(...)):
     """Force-cancel a running discussion."""
-    forum = _get_forum_or_404(topic_id)
+    forum = await _get_forum_or_404(topic_id)
     _check_owner(forum, user_id)
 
     if forum.status != "discussing":
@@ -322,7 +339,7 @@ async def cancel_topic(topic_id: str, user_id: str = Query(...)):
 @app.post("/topics/{topic_id}/purge")
 async def purge_topic(topic_id: str, user_id: str = Query(...)):
     """Permanently delete a discussion record."""
-    forum = _get_forum_or_404(topic_id)
+    forum = await _get_forum_or_404(topic_id)
     _check_owner(forum, user_id)
 
     if forum.status in ("pending", "discussing"):
@@ -333,11 +350,7 @@ async def purge_topic(topic_id: str, user_id: str = Query(...)):
         if task and not task.done():
             task.cancel()
 
-    storage_path = forum._storage_path()
-    if os.path.exists(storage_path):
-        os.remove(storage_path)
-
-    discussions.pop(topic_id, None)
+    discussions.delete(topic_id)
     engines.pop(topic_id, None)
     tasks.pop(topic_id, None)
 
@@ -347,33 +360,22 @@ async def purge_topic(topic_id: str, user_id: str = Query(...)):
 @app.delete("/topics")
 async def purge_all_topics(user_id: str = Query(...)):
     """Delete all topics for a specific user."""
-    global discussions, engines, tasks
-
-    to_delete = [
-        tid for tid, forum in discussions.items()
-        if forum.user_id == user_id
-    ]
-
     deleted_count = 0
-    for tid in to_delete:
-        forum = discussions.get(tid)
-        if forum:
-            if forum.status in ("pending", "discussing"):
-                engine = engines.get(tid)
-                if engine:
-                    engine.cancel()
-                task = tasks.get(tid)
-                if task and not task.done():
-                    task.cancel()
-
-            storage_path = forum._storage_path()
-            if os.path.exists(storage_path):
-                os.remove(storage_path)
-
-            discussions.pop(tid, None)
-            engines.pop(tid, None)
-            tasks.pop(tid, None)
-            deleted_count += 1
+    for tid in discussions.topic_ids_for_user(user_id):
+        # Only in-memory forums can still be running
+        forum = discussions.peek(tid)
+        if forum and forum.status in ("pending", "discussing"):
+            engine = engines.get(tid)
+            if engine:
+                engine.cancel()
+            task = tasks.get(tid)
+            if task and not task.done():
+                task.cancel()
+
+        discussions.delete(tid)
+        engines.pop(tid, None)
+        tasks.pop(tid, None)
+        deleted_count += 1
 
     return {"deleted_count": deleted_count, "message": f"Deleted {deleted_count} topics"}
 
@@ -381,7 +383,7 @@ async def purge_all_topics(user_id: str = Query(...)):
 @app.get("/topics/{topic_id}", response_model=TopicDetail)
 async def get_topic(topic_id: str, user_id: str = Query(...)):
     """Get full discussion detail."""
-    forum = _get_forum_or_404(topic_id)
+    forum = await _get_forum_or_404(topic_id)
     _check_owner(forum, user_id)
 
     posts = await forum.browse()
@@ -416,57 +418,142 @@ async def get_topic(topic_id: str, user_id: str = Query(...)):
         ],
         discussion=forum.discussion,
         conclusion=forum.conclusion,
+        drafts=[DraftInfo(**d) for d in forum.drafts.values()],
     )
 
 
+def _render_post(p: dict) -> str:
+    prefix = f"↳回复#{p['reply_to']}" if p.get("reply_to") else "📌"
+    return f"{prefix} [{p['author']}] (👍{p.get('upvotes', 0)}): {p['content']}"
+
+
+def _render_timeline(ev: dict) -> str | None:
+    """Execute mode: timeline events are streamed as plain messages."""
+    event = ev.get("event")
+    if event == "start":
+        return "🚀 执行开始"
+    if event == "round":
+        return f"📢 {ev.get('detail', '')}"
+    if event == "agent_call":
+        return f"⏳ {ev.get('agent', '')} 开始执行..."
+    if event == "agent_done":
+        return f"✅ {ev.get('agent', '')} 执行完成"
+    if event == "conclude":
+        return "🏁 执行完成"
+    return None
+
+
+def _render_event(forum: DiscussionForum, ev: dict) -> str | None:
+    """Render one forum bus event as SSE text (None = not shown)."""
+    etype, data = ev["type"], ev["data"]
+    if forum.discussion:
+        if etype == "round" and data["round"] > 0:
+            return f"📢 === 第 {data['round']} 轮讨论 ==="
+        if etype == "post":
+            return _render_post(data)
+    elif etype == "timeline":
+        return _render_timeline(data)
+    return None
+
+
+# SSE comment sent when no events arrive for this long (keeps proxies from timing out)
+_SSE_KEEPALIVE = 15.0
+
+
+def _render_draft(ev: dict) -> str:
+    """Draft bus event as a named SSE frame with a JSON payload (opt-in: drafts=true)."""
+    return f"event: {ev['type']}\ndata: {json.dumps(ev['data'], ensure_ascii=False)}"
+
+
 @app.get("/topics/{topic_id}/stream")
-async def stream_topic(topic_id: str, user_id: str = Query(...)):
-    """SSE stream for real-time discussion updates."""
-    forum = _get_forum_or_404(topic_id)
+async def stream_topic(
+    topic_id: str,
+    user_id: str = Query(...),
+    last_event_id: int | None = Query(None),
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+    drafts: bool = Query(False),
+):
+    """SSE stream for real-time discussion updates.
+
+    Driven by the forum event bus (no polling). Each message carries
+    `id: <seq>`; reconnecting clients send `Last-Event-ID` (or the
+    `last_event_id` query param) to resume without duplicates. When the
+    requested events are no longer buffered, the stream resyncs from the
+    current forum state.
+
+    drafts=true additionally sends streamed expert output as named events:
+    `event: draft` ({author, delta, reset, length}) and `event: draft_end`
+    ({author, post_id}); the final post follows as a normal message.
+    """
+    forum = await _get_forum_or_404(topic_id)
     _check_owner(forum, user_id)
 
+    if last_event_id is None and last_event_id_header:
+        try:
+            last_event_id = int(last_event_id_header)
+        except ValueError:
+            last_event_id = None
+
+    def _snapshot() -> list[str]:
+        """Current state rendered as SSE frames (fresh client or resync)."""
+        lines = []
+        if forum.discussion:
+            if forum.current_round > 0:
+                lines.append(f"📢 === 第 {forum.current_round} 轮讨论 ===")
+            lines.extend(_render_post(p.to_dict()) for p in forum.posts)
+        else:
+            lines.extend(
+                text for text in (_render_timeline(e.to_dict()) for e in forum.timeline) if text
+            )
+        frames = [f"data: {text}" for text in lines]
+        if drafts:
+            frames.extend(
+                _render_draft({"type": "draft", "data": {
+                    "author": d["author"], "delta": d["content"], "reset": True,
+                    "length": len(d["content"]),
+                }})
+                for d in list(forum.drafts.values())
+            )
+        return frames
+
+    def _render(ev: dict) -> str | None:
+        """One bus event as an SSE frame (without the id line), None = not shown."""
+        if ev["type"] in ("draft", "draft_end"):
+            return _render_draft(ev) if drafts else None
+        text = _render_event(forum, ev)
+        return f"data: {text}" if text else None
+
     async def event_generator():
-        last_count = 0
-        last_round = 0
-        last_timeline_idx = 0      # 已发送的 timeline 事件索引
+        after = last_event_id
+        pending = forum.events_since(after) if after is not None else None
+        if pending is None:
+            # Fresh client, or resume point lost: send the current state
+            after = forum.seq
+            for frame in _snapshot():
+                yield f"id: {after}\n{frame}\n\n"
+        else:
+            for ev in pending:
+                after = ev["seq"]
+                frame = _render(ev)
+                if frame:
+                    yield f"id: {after}\n{frame}\n\n"
 
         while forum.status in ("pending", "discussing"):
-            if forum.discussion:
-                # ── 讨论模式：原有逻辑，按帖子轮询 ──
-                posts = await forum.browse()
-
-                if forum.current_round > last_round:
-                    last_round = forum.current_round
-                    yield f"data: 📢 === 第 {last_round} 轮讨论 ===\n\n"
-
-                if len(posts) > last_count:
-                    for p in posts[last_count:]:
-                        prefix = f"↳回复#{p.reply_to}" if p.reply_to else "📌"
-                        yield (
-                            f"data: {prefix} [{p.author}] "
-                            f"(👍{p.upvotes}): {p.content}\n\n"
-                        )
-                    last_count = len(posts)
-            else:
-                # ── 执行模式：timeline 事件当普通消息发送 ──
-                tl = forum.timeline
-
-                while last_timeline_idx < len(tl):
-                    ev = tl[last_timeline_idx]
-                    last_timeline_idx += 1
-
-                    if ev.event == "start":
-                        yield f"data: 🚀 执行开始\n\n"
-                    elif ev.event == "round":
-                        yield f"data: 📢 {ev.detail}\n\n"
-                    elif ev.event == "agent_call":
-                        yield f"data: ⏳ {ev.agent} 开始执行...\n\n"
-                    elif ev.event == "agent_done":
-                        yield f"data: ✅ {ev.agent} 执行完成\n\n"
-                    elif ev.event == "conclude":
-                        yield f"data: 🏁 执行完成\n\n"
-
-            await asyncio.sleep(1)
+            if not await forum.wait_for_events(after, timeout=_SSE_KEEPALIVE):
+                yield ": keepalive\n\n"
+                continue
+            events = forum.events_since(after)
+            if events is None:
+                # Fell behind the event buffer: resync from state
+                after = forum.seq
+                for frame in _snapshot():
+                    yield f"id: {after}\n{frame}\n\n"
+                continue
+            for ev in events:
+                after = ev["seq"]
+                frame = _render(ev)
+                if frame:
+                    yield f"id: {after}\n{frame}\n\n"
 
         if forum.discussion:
             if forum.conclusion:
@@ -490,19 +577,17 @@ async def stream_topic(topic_id: str, user_id: str = Query(...)):
 async def list_topics(user_id: str = Query(...)):
     """List discussion topics for a specific user."""
     items = []
-    for f in discussions.values():
-        if f.user_id != user_id:
-            continue
+    for f in discussions.list_user(user_id):
         items.append(
             TopicSummary(
-                topic_id=f.topic_id,
-                question=f.question,
-                user_id=f.user_id,
-                status=DiscussionStatus(f.status),
-                post_count=len(f.posts),
-                current_round=f.current_round,
-                max_rounds=f.max_rounds,
-                created_at=f.created_at,
+                topic_id=f["topic_id"],
+                question=f["question"],
+                user_id=f["user_id"],
+                status=DiscussionStatus(f["status"]),
+                post_count=f["post_count"],
+                current_round=f["current_round"],
+                max_rounds=f["max_rounds"],
+                created_at=f["created_at"],
             )
         )
     items.sort(key=lambda x: x.created_at, reverse=True)
@@ -512,13 +597,10 @@ async def list_topics(user_id: str = Query(...)):
 @app.get("/topics/{topic_id}/conclusion")
 async def get_conclusion(topic_id: str, user_id: str = Query(...), timeout: int = 300):
     """Get the final conclusion (blocks until discussion finishes)."""
-    forum = _get_forum_or_404(topic_id)
+    forum = await _get_forum_or_404(topic_id)
     _check_owner(forum, user_id)
 
-    elapsed = 0
-    while forum.status not in ("concluded", "error") and elapsed < timeout:
-        await asyncio.sleep(1)
-        elapsed += 1
+    await forum.wait_until_finished(timeout)
 
     if forum.status == "error":
         raise HTTPException(500, f"Discussion failed: {forum.conclusion}")
@@ -544,6 +626,27 @@ async def get_conclusion(topic_id: str, user_id: str = Query(...), timeout: int
     }
 
 
+@app.get("/llm_cache_stats")
+async def llm_cache_stats():
+    """ExpertAgent LLM request coalescing / response cache counters."""
+    from oasis.experts import get_llm_cache_stats
+    return get_llm_cache_stats()
+
+
+@app.get("/http_pool_stats")
+async def http_pool_stats():
+    """Shared keep-alive HTTP clients (session / external experts, callbacks)."""
+    from http_pool import get_http_pool_stats
+    return get_http_pool_stats()
+
+
+@app.get("/governor_stats")
+async def governor_stats():
+    """Per-backend expert call gates: in-flight, queued, throttled, wait times."""
+    from oasis.governor import governor
+    return governor.stats()
+
+
 # ------------------------------------------------------------------
 # Expert persona CRUD
 # ------------------------------------------------------------------
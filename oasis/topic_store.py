@@ -0,0 +1,222 @@
+"""
+OASIS Forum - Topic store: on-disk topic index + lazily loaded forums
+
+The server used to parse every historical discussion at startup and keep all
+of them in memory. TopicStore instead keeps:
+
+  - an index of every topic (DiscussionForum.summary(): topic_id, user_id,
+    status, question, created_at, post_count, ...) persisted as
+    data/oasis_discussions/_index.json, refreshed on every forum snapshot
+  - full forums loaded on first access (snapshot + journal replay, off-loop)
+    and kept in an LRU; only finished forums are evicted
+    (OASIS_FORUM_CACHE_SIZE, default 64)
+
+The first start without an index builds it once from the existing files.
+"""
+
+import asyncio
+import json
+import os
+from collections import OrderedDict
+
+from oasis.forum import DISCUSSIONS_DIR, DiscussionForum, _writer
+
+_INDEX_VERSION = 1
+_ACTIVE_STATUSES = ("pending", "discussing")
+
+
+class TopicStore:
+    """Topic index + LRU of loaded DiscussionForum objects (single event loop)."""
+
+    def __init__(self, base_dir: str = DISCUSSIONS_DIR, max_loaded: int | None = None):
+        self._base_dir = base_dir
+        self._index_path = os.path.join(base_dir, "_index.json")
+        self._max_loaded = max_loaded or int(os.getenv("OASIS_FORUM_CACHE_SIZE", "64"))
+        self._index: dict[str, dict] = {}
+        self._loaded: OrderedDict[str, DiscussionForum] = OrderedDict()
+        self._loading: dict[str, asyncio.Future] = {}
+
+    # ── Paths ──
+
+    def _snapshot_path(self, entry: dict) -> str:
+        return os.path.join(self._base_dir, entry["user_id"], f"{entry['topic_id']}.json")
+
+    def _journal_path(self, entry: dict) -> str:
+        return os.path.join(self._base_dir, entry["user_id"], f"{entry['topic_id']}.journal")
+
+    # ── Startup ──
+
+    def open(self) -> list[DiscussionForum]:
+        """Read (or build) the index. Blocking — run via asyncio.to_thread.
+
+        Returns forums whose index status is still pending/discussing (the
+        previous process stopped mid-run); they are loaded so the caller can
+        mark them as failed.
+        """
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == _INDEX_VERSION:
+                self._index = data.get("topics", {})
+        except (OSError, ValueError):
+            self._index = {}
+
+        # Reconcile with the files on disk: listing directories is cheap, only
+        # snapshots missing from the index are parsed (first start / crash).
+        on_disk: dict[str, str] = {}
+        if os.path.isdir(self._base_dir):
+            for user_dir_name in os.listdir(self._base_dir):
+                user_dir = os.path.join(self._base_dir, user_dir_name)
+                if not os.path.isdir(user_dir):
+                    continue
+                for fname in os.listdir(user_dir):
+                    if fname.endswith(".json"):
+                        on_disk[fname[:-len(".json")]] = os.path.join(user_dir, fname)
+
+        changed = False
+        for topic_id in [t for t in self._index if t not in on_disk]:
+            del self._index[topic_id]
+            changed = True
+        for topic_id, path in on_disk.items():
+            if topic_id in self._index:
+                continue
+            try:
+                forum = DiscussionForum.load(path)
+            except Exception as e:
+                print(f"[OASIS] ⚠️ Failed to load {os.path.basename(path)}: {e}")
+                continue
+            self._index[forum.topic_id] = forum.summary()
+            changed = True
+        if changed:
+            self._write_index()
+
+        interrupted = []
+        for topic_id, entry in self._index.items():
+            if entry.get("status") in _ACTIVE_STATUSES:
+                try:
+                    interrupted.append(self._attach(DiscussionForum.load(self._snapshot_path(entry))))
+                except Exception as e:
+                    print(f"[OASIS] ⚠️ Failed to load {topic_id}: {e}")
+        return interrupted
+
+    # ── Index maintenance ──
+
+    def _write_index(self):
+        _writer.submit("write_json", self._index_path,
+                       {"version": _INDEX_VERSION, "topics": dict(self._index)})
+
+    def _on_forum_save(self, forum: DiscussionForum):
+        if forum.topic_id in self._index or forum.topic_id in self._loaded:
+            self._index[forum.topic_id] = forum.summary()
+            self._write_index()
+
+    def _attach(self, forum: DiscussionForum) -> DiscussionForum:
+        forum.on_save = self._on_forum_save
+        self._loaded[forum.topic_id] = forum
+        self._loaded.move_to_end(forum.topic_id)
+        return forum
+
+    def _evict(self):
+        """Drop least-recently-used finished forums beyond the cache size."""
+        excess = len(self._loaded) - self._max_loaded
+        if excess <= 0:
+            return
+        for topic_id in list(self._loaded):
+            if excess <= 0:
+                break
+            forum = self._loaded[topic_id]
+            if forum.status in _ACTIVE_STATUSES:
+                continue
+            forum.save_if_dirty()
+            forum.on_save = None
+            del self._loaded[topic_id]
+            excess -= 1
+
+    # ── Access ──
+
+    def __contains__(self, topic_id: str) -> bool:
+        return topic_id in self._index or topic_id in self._loaded
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, forum: DiscussionForum):
+        """Register a newly created forum (call before its first save())."""
+        self._attach(forum)
+        self._index[forum.topic_id] = forum.summary()
+        self._evict()
+
+    def peek(self, topic_id: str) -> DiscussionForum | None:
+        """Return the forum only if it is already in memory."""
+        return self._loaded.get(topic_id)
+
+    def loaded(self) -> list[DiscussionForum]:
+        return list(self._loaded.values())
+
+    def _load_blocking(self, entry: dict) -> DiscussionForum:
+        _writer.barrier()  # queued snapshot/journal writes of an evicted copy land first
+        return DiscussionForum.load(self._snapshot_path(entry))
+
+    async def get(self, topic_id: str) -> DiscussionForum | None:
+        """Return the forum, loading it from disk on first access."""
+        forum = self._loaded.get(topic_id)
+        if forum is not None:
+            self._loaded.move_to_end(topic_id)
+            return forum
+        entry = self._index.get(topic_id)
+        if entry is None:
+            return None
+
+        pending = self._loading.get(topic_id)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The loading call was cancelled before finishing; load again.
+                return await self.get(topic_id)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[topic_id] = future
+        try:
+            try:
+                forum = await asyncio.to_thread(self._load_blocking, entry)
+            except Exception as e:
+                print(f"[OASIS] ⚠️ Failed to load topic {topic_id}: {e}")
+                forum = None
+            if forum is not None and topic_id in self._index:
+                self._attach(forum)
+                self._evict()
+            future.set_result(forum)
+        finally:
+            del self._loading[topic_id]
+            if not future.done():
+                future.cancel()  # never leave waiters hanging; they retry
+        return forum
+
+    def delete(self, topic_id: str) -> bool:
+        """Remove a topic from memory, the index and disk."""
+        entry = self._index.pop(topic_id, None)
+        forum = self._loaded.pop(topic_id, None)
+        if forum is not None:
+            forum.on_save = None
+            forum.delete_storage()
+        elif entry is not None:
+            _writer.submit("delete", self._snapshot_path(entry), self._journal_path(entry))
+        if entry is None and forum is None:
+            return False
+        self._write_index()
+        return True
+
+    def topic_ids_for_user(self, user_id: str) -> list[str]:
+        return [tid for tid, e in self._index.items() if e.get("user_id") == user_id]
+
+    def list_user(self, user_id: str) -> list[dict]:
+        """Index records for a user; loaded forums report live values."""
+        items = []
+        for topic_id, entry in self._index.items():
+            if entry.get("user_id") != user_id:
+                continue
+            forum = self._loaded.get(topic_id)
+            items.append(forum.summary() if forum is not None else entry)
+        return items
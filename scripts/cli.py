@@ -1702,6 +1702,40 @@ def cmd_teams(args):
         print(f"❌ 未知操作: {act}", file=sys.stderr)
 
 
+# ── db-compact: checkpoint 数据库压缩 ──────────────────────────────────
+def cmd_db_compact(args):
+    """压缩 agent_memory.db（默认 dry-run，仅统计）"""
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+    import checkpoint_compactor
+
+    db = args.db or os.path.join(PROJECT_ROOT, "data", "agent_memory.db")
+    if not os.path.exists(db):
+        print(f"❌ 数据库不存在: {db}", file=sys.stderr); return
+    keep = args.keep or int(os.getenv("CHECKPOINT_KEEP_LAST", str(checkpoint_compactor.DEFAULT_KEEP_LAST)))
+    report = checkpoint_compactor.compact(
+        db, keep, dry_run=not args.apply,
+        vacuum_pages=args.vacuum_pages or 0, full_vacuum=args.full_vacuum,
+    )
+    if args.raw:
+        _pp(report)
+        return
+    mb = lambda n: f"{n / 1024 / 1024:.1f} MB"
+    title = "🧹 压缩完成" if args.apply else "🔍 Dry-run（未修改数据库，加 --apply 执行）"
+    print(f"{title}\n")
+    print(f"  数据库:         {db}")
+    print(f"  保留最新:       {report['keep_last']} 个 checkpoint / 会话")
+    print(f"  扫描会话:       {report['threads_scanned']}")
+    print(f"  删除 checkpoint: {report['checkpoints_deleted']}")
+    print(f"  删除 writes:    {report['writes_deleted']}")
+    print(f"  预计释放:       {mb(report['bytes_freed_estimate'])}")
+    print(f"  文件大小:       {mb(report['size_before'])} → {mb(report['size_after'])}"
+          f"  (回收 {mb(report['bytes_reclaimed'])})")
+    print(f"  空闲页:         {mb(report['freelist_bytes'])}  auto_vacuum={report['auto_vacuum']}")
+    if args.apply and report["auto_vacuum"] != "incremental" and not args.full_vacuum:
+        print("\n💡 数据库未开启增量 VACUUM，空闲页不会归还给文件系统；"
+              "可在停服后执行一次 --apply --full-vacuum")
+
+
 # ── status: 服务状态 ─────────────────────────────────────────────────
 def cmd_status(args):
     """检查各服务状态"""
@@ -1904,6 +1938,15 @@ def build_parser():
                    choices=["status", "start", "stop"],
                    help="操作 (默认: status)")
 
+    # db-compact
+    c = sub.add_parser("db-compact", help="压缩 checkpoint 数据库（默认 dry-run）")
+    c.add_argument("--apply", action="store_true", help="实际执行（默认仅统计）")
+    c.add_argument("--keep", type=int, help="每个会话保留的最新 checkpoint 数 (默认: CHECKPOINT_KEEP_LAST 或 10)")
+    c.add_argument("--vacuum-pages", type=int, help="incremental_vacuum 页数上限 (默认: 全部)")
+    c.add_argument("--full-vacuum", action="store_true", help="一次性完整 VACUUM 并开启增量模式（会锁库，建议停服执行）")
+    c.add_argument("--db", help="数据库路径 (默认: data/agent_memory.db)")
+    c.add_argument("--raw", action="store_true", help="输出原始 JSON 报告")
+
     # status
     sub.add_parser("status", help="检查各服务状态")
 
@@ -1947,6 +1990,7 @@ def main():
         "experts": cmd_experts,
         "workflows": cmd_workflows,
         "tunnel": cmd_tunnel,
+        "db-compact": cmd_db_compact,
         "status": cmd_status,
     }
 
@@ -0,0 +1,283 @@
+"""
+Admission control: graph 运行的全局 / 每用户并发上限 + 按优先级加权公平排队
+
+/v1/chat/completions 与系统触发以前一到达就开始运行 graph，只有同一会话之间靠
+get_thread_lock 串行；一个重度用户或带 20 个 session 专家的 OASIS 讨论就能占满上游
+LLM 配额。现在每次 graph 运行都要先拿到一个运行槽位（admission.slot）：
+
+  - 全局并发上限     ADMISSION_MAX_CONCURRENT（默认 16）
+  - 每用户并发上限   ADMISSION_MAX_PER_USER（默认 4）
+  - 优先级类别与权重 ADMISSION_WEIGHTS（JSON，默认如下），权重越大分到的槽位越多：
+      interactive  网页 / API 的交互请求        8
+      bot          Telegram / QQ 等机器人渠道    4
+      oasis        OASIS 子 agent 会话           2
+      system       定时任务、群聊等系统触发      1
+  - 排队上限         ADMISSION_MAX_QUEUE（默认 64，system 类不受限）：
+      超出时直接返回 503 + Retry-After，而不是排到超时
+
+类别之间按 stride 调度（加权公平），同一类别内按用户轮转，用户内先到先得。
+
+嵌套调用：send_internal_message(wait=True) 会在持有槽位的运行中同步等待另一个会话的
+运行结束。若子运行也要排队，同一用户的几个会话互相等待就能占满每用户上限，子运行只能
+排到超时。因此带 parent（发起调用的 thread_id，仍持有槽位）的子运行直接借用父运行的
+槽位，不再计入全局 / 每用户并发，也不受排队上限限制；A→B→C… 的链式调用同样逐级借用。
+
+统计见 /admission_stats。单事件循环使用（mainagent 进程）。
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Callable
+
+# 优先级从高到低
+PRIORITIES = ("interactive", "bot", "oasis", "system")
+DEFAULT_WEIGHTS = {"interactive": 8, "bot": 4, "oasis": 2, "system": 1}
+
+# 排队时每隔多久检查一次位置变化（供流式响应推送排队进度）
+_POSITION_POLL = 2.0
+
+
+def classify(session_id: str, source: str = "user", requested: str | None = None) -> str:
+    """推断一次运行的优先级类别；requested 只能降低优先级，不能提升。"""
+    if source == "system":
+        cls = "system"
+    elif session_id.startswith("oasis_") or "#oasis#" in session_id:
+        cls = "oasis"
+    elif session_id in _bot_sessions():
+        cls = "bot"
+    else:
+        cls = "interactive"
+    if requested in PRIORITIES and PRIORITIES.index(requested) > PRIORITIES.index(cls):
+        cls = requested
+    return cls
+
+
+def _bot_sessions() -> set[str]:
+    return {s.strip() for s in os.getenv("ADMISSION_BOT_SESSIONS", "TG,QQ").split(",") if s.strip()}
+
+
+class AdmissionFull(Exception):
+    """排队已满（调用方应返回 503）。"""
+
+    def __init__(self, cls: str, queued: int, retry_after: int):
+        super().__init__(f"{cls} 队列已满（{queued} 个请求排队中）")
+        self.cls = cls
+        self.queued = queued
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("seq", "user", "cls", "future", "enqueued")
+
+    def __init__(self, seq: int, user: str, cls: str):
+        self.seq = seq
+        self.user = user
+        self.cls = cls
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+
+
+class AdmissionScheduler:
+    """全局 / 每用户运行槽位 + 类别间加权公平、类别内用户轮转的排队。"""
+
+    def __init__(self, max_concurrent: int | None = None, max_per_user: int | None = None,
+                 weights: dict | None = None, max_queue: int | None = None):
+        self.max_concurrent = max(1, max_concurrent or int(os.getenv("ADMISSION_MAX_CONCURRENT", "16")))
+        self.max_per_user = max(1, max_per_user or int(os.getenv("ADMISSION_MAX_PER_USER", "4")))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+        if weights is None:
+            try:
+                weights = json.loads(os.getenv("ADMISSION_WEIGHTS", "") or "{}")
+            except ValueError:
+                print("[Admission] ⚠️ ADMISSION_WEIGHTS 不是合法 JSON，已忽略")
+                weights = {}
+        self.weights = {c: max(float((weights or {}).get(c, DEFAULT_WEIGHTS[c])), 0.01) for c in PRIORITIES}
+        self.running = 0
+        self._running_by_user: dict[str, int] = {}
+        # class → user → waiters（用户轮转）
+        self._queues: dict[str, OrderedDict[str, deque[_Waiter]]] = {c: OrderedDict() for c in PRIORITIES}
+        self._queued: dict[str, int] = {c: 0 for c in PRIORITIES}
+        # stride 调度：每个类别的 pass 值，取最小者；被选中后前进 1/weight
+        self._pass: dict[str, float] = {c: 0.0 for c in PRIORITIES}
+        self._vtime = 0.0
+        self._seq = itertools.count()
+        self._waiting: dict[int, _Waiter] = {}
+        # 持有槽位的 thread_id → 是否为借用的槽位（同一 thread 由会话锁保证同时只有一次运行）
+        self._holders: dict[str, bool] = {}
+        self.borrowed = {c: 0 for c in PRIORITIES}
+        self.admitted = {c: 0 for c in PRIORITIES}
+        self.rejected = {c: 0 for c in PRIORITIES}
+        self.wait_total = {c: 0.0 for c in PRIORITIES}
+        self.wait_max = {c: 0.0 for c in PRIORITIES}
+
+    # ── Queue state ──
+
+    def queued(self) -> int:
+        return sum(self._queued.values())
+
+    def position(self, seq: int) -> int:
+        """排在该请求之前（更早入队且仍在等待）的请求数 + 1（近似位置）。"""
+        return sum(1 for s in self._waiting if s < seq) + 1
+
+    def holds(self, thread_id: str | None) -> bool:
+        """thread_id 的运行当前是否持有（或借用）槽位。"""
+        return thread_id is not None and thread_id in self._holders
+
+    def check(self, cls: str):
+        """入队前检查排队上限，超出抛 AdmissionFull（system 类不受限）。"""
+        if cls == "system" or self.max_queue <= 0:
+            return
+        if not self._would_wait(None) or self.queued() < self.max_queue:
+            return
+        self.rejected[cls] += 1
+        raise AdmissionFull(cls, self.queued(), retry_after=max(1, self.queued() // self.max_concurrent))
+
+    def _would_wait(self, user: str | None) -> bool:
+        if self.queued() or self.running >= self.max_concurrent:
+            return True
+        return user is not None and self._running_by_user.get(user, 0) >= self.max_per_user
+
+    # ── Slots ──
+
+    async def acquire(self, user: str, cls: str, on_wait: Callable[[int], None] | None = None,
+                      thread_id: str | None = None, parent: str | None = None) -> float:
+        """等待一个运行槽位，返回等待秒数。on_wait(position) 在入队及位置变化时调用。
+
+        thread_id 登记本次运行的持有者；parent 为仍持有槽位的发起方 thread_id 时直接借用其槽位。
+        """
+        if self.holds(parent):
+            if thread_id is not None:
+                self._holders[thread_id] = True
+            self.admitted[cls] += 1
+            self.borrowed[cls] += 1
+            return 0.0
+        started = time.monotonic()
+        if not self._would_wait(user):
+            self._grant(user)
+        else:
+            waiter = _Waiter(next(self._seq), user, cls)
+            if not self._queues[cls]:
+                # 类别从空闲变为有请求：不允许用空闲期积攒的额度插队
+                self._pass[cls] = max(self._pass[cls], self._vtime)
+            self._queues[cls].setdefault(user, deque()).append(waiter)
+            self._queued[cls] += 1
+            self._waiting[waiter.seq] = waiter
+            self._dispatch()  # 排在前面的可能都被每用户上限挡住，空闲槽位可直接给本请求
+            last_pos = None
+            try:
+                while not waiter.future.done():
+                    pos = self.position(waiter.seq)
+                    if on_wait is not None and pos != last_pos:
+                        on_wait(pos)
+                        last_pos = pos
+                    try:
+                        await asyncio.wait_for(asyncio.shield(waiter.future), _POSITION_POLL)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self.release(user)  # 取消前刚被放行
+                else:
+                    waiter.future.cancel()
+                    self._remove(waiter)
+                raise
+        if thread_id is not None:
+            self._holders[thread_id] = False
+        waited = time.monotonic() - started
+        self.admitted[cls] += 1
+        self.wait_total[cls] += waited
+        self.wait_max[cls] = max(self.wait_max[cls], waited)
+        return waited
+
+    def release(self, user: str, thread_id: str | None = None):
+        if thread_id is not None and self._holders.pop(thread_id, False):
+            return  # 借用的槽位，父运行仍占着
+        self.running -= 1
+        left = self._running_by_user.get(user, 1) - 1
+        if left > 0:
+            self._running_by_user[user] = left
+        else:
+            self._running_by_user.pop(user, None)
+        self._dispatch()
+
+    def _grant(self, user: str):
+        self.running += 1
+        self._running_by_user[user] = self._running_by_user.get(user, 0) + 1
+
+    def _dispatch(self):
+        while self.running < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._grant(waiter.user)
+            waiter.future.set_result(None)
+
+    def _next_waiter(self) -> "_Waiter | None":
+        """pass 值最小且有可运行请求的类别 → 该类别内轮转到的第一个未超限用户。"""
+        for cls in sorted((c for c in PRIORITIES if self._queued[c]), key=lambda c: (self._pass[c], PRIORITIES.index(c))):
+            users = self._queues[cls]
+            for user in list(users):
+                if self._running_by_user.get(user, 0) >= self.max_per_user:
+                    continue
+                waiters = users[user]
+                waiter = waiters.popleft()
+                self._queued[cls] -= 1
+                self._waiting.pop(waiter.seq, None)
+                if waiters:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                self._vtime = self._pass[cls]
+                self._pass[cls] += 1.0 / self.weights[cls]
+                return waiter
+        return None
+
+    def _remove(self, waiter: _Waiter):
+        self._waiting.pop(waiter.seq, None)
+        users = self._queues[waiter.cls]
+        waiters = users.get(waiter.user)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self._queued[waiter.cls] -= 1
+        if not waiters:
+            del users[waiter.user]
+        # 该用户的请求离开后，其他被每用户上限挡住的请求可能可以运行
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user: str, cls: str, on_wait: Callable[[int], None] | None = None,
+                   thread_id: str | None = None, parent: str | None = None):
+        """在代码块执行期间占用一个运行槽位。"""
+        waited = await self.acquire(user, cls, on_wait, thread_id, parent)
+        if waited >= 1:
+            print(f"[Admission] 🚦 {user} ({cls}) 排队 {waited:.1f}s 后开始运行")
+        try:
+            yield waited
+        finally:
+            self.release(user, thread_id)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "running_by_user": dict(self._running_by_user),
+            "queued": dict(self._queued),
+            "weights": self.weights,
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+            "borrowed": dict(self.borrowed),
+            "holders": len(self._holders),
+            "avg_wait_ms": {
+                c: round(self.wait_total[c] / self.admitted[c] * 1000, 1) if self.admitted[c] else None
+                for c in PRIORITIES
+            },
+            "max_wait_ms": {c: round(self.wait_max[c] * 1000, 1) for c in PRIORITIES},
+        }
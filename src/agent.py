@@ -1,8 +1,10 @@
 import os
 import json
 import copy
+import time
 import asyncio
-import sys
+import hashlib
+from collections import OrderedDict
 from typing import Annotated, TypedDict, Optional
 
 # LangGraph related
@@ -15,8 +17,14 @@ from langchain_openai import ChatOpenAI
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_mcp_adapters.client import MultiServerMCPClient
-from langgraph.prebuilt import ToolNode
+
+import context_budget
+import mcp_host
+from thread_registry import ThreadRegistry
+from tool_cache import ToolResultCache
+from tool_scheduler import ToolScheduler
 
 
 # --- Tools that need automatic username injection ---
@@ -64,6 +72,10 @@ class AgentState(TypedDict):
     # 外部调用方传入的 tools 定义（OpenAI function calling 格式）
     # 当 LLM 选择调用这些工具时，中断图执行并以 tool_calls 格式返回给调用方
     external_tools: Optional[list[dict]]
+    # 会话级上下文 token 预算（None 使用默认值，0 关闭），随 checkpoint 持久化
+    context_budget: Optional[int]
+    # 早期对话的滚动摘要 {"upto", "upto_id", "text", "tokens", "spans"}，随 checkpoint 持久化
+    context_summary: Optional[dict]
 
 
 class UserAwareToolNode:
@@ -71,10 +83,35 @@ class UserAwareToolNode:
     Custom tool node:
     1. Reads thread_id from RunnableConfig, auto-injects as username for file/command tools
     2. Intercepts calls to disabled tools at runtime, returns error ToolMessage
+    3. Runs the allowed calls of one batch concurrently via ToolScheduler
+       (per-user limits, per-tool timeouts, results in tool_calls order)
+    4. Serves idempotent tools from ToolResultCache (TTL + single-flight)
     """
     def __init__(self, tools, get_mcp_tools_fn):
-        self.tool_node = ToolNode(tools)
+        self._tools_by_name = {t.name: t for t in tools}
         self._get_mcp_tools = get_mcp_tools_fn
+        self._scheduler = ToolScheduler()
+        self._cache = ToolResultCache()
+
+    async def _invoke_tool(self, tc: dict, config: RunnableConfig) -> ToolMessage:
+        """Execute one tool call; errors become error ToolMessages (same as ToolNode)."""
+        tool = self._tools_by_name.get(tc["name"])
+        if tool is None:
+            return ToolMessage(
+                content=f"Error: {tc['name']} is not a valid tool, try one of [{', '.join(self._tools_by_name)}].",
+                name=tc["name"],
+                tool_call_id=tc["id"],
+                status="error",
+            )
+        try:
+            return await tool.ainvoke({**tc, "type": "tool_call"}, config)
+        except Exception as e:
+            return ToolMessage(
+                content=f"Error: {e!r}\n Please fix your mistakes.",
+                name=tc["name"],
+                tool_call_id=tc["id"],
+                status="error",
+            )
 
     async def __call__(self, state, config: RunnableConfig):
         # Get user_id directly from state (injected by mainagent) instead of
@@ -111,25 +148,36 @@ class UserAwareToolNode:
                 allowed_calls.append(tc)
                 print(f">>> [tools] ✅ 调用工具: {tc['name']}")
 
-        result_messages = []
+        results: dict[str, ToolMessage] = {}
 
         # For blocked tools, return error ToolMessages directly
         for tc in blocked_calls:
-            result_messages.append(
-                ToolMessage(
-                    content=f"❌ 工具 '{tc['name']}' 当前已被禁用。这通常是为了保护您的系统安全或优化当前会话资源。如果您确实需要此功能，请在管理面板中将其开启。同时，您可以告诉我您的最终目标，我会尝试用其他已启用的工具为您寻找替代方案。",
-                    tool_call_id=tc["id"],
-                )
+            results[tc["id"]] = ToolMessage(
+                content=f"❌ 工具 '{tc['name']}' 当前已被禁用。这通常是为了保护您的系统安全或优化当前会话资源。如果您确实需要此功能，请在管理面板中将其开启。同时，您可以告诉我您的最终目标，我会尝试用其他已启用的工具为您寻找替代方案。",
+                tool_call_id=tc["id"],
             )
 
-        # For allowed tools, execute normally via ToolNode
+        # For allowed tools, execute concurrently via the scheduler
         if allowed_calls:
-            modified_message.tool_calls = allowed_calls
-            modified_state = {**state, "messages": state["messages"][:-1] + [modified_message]}
-            tool_result = await self.tool_node.ainvoke(modified_state, config)
-            result_messages.extend(tool_result.get("messages", []))
+            batch_start = time.perf_counter()
+            outcomes = await self._scheduler.run_batch(
+                allowed_calls, user_id,
+                lambda tc: self._cache.call(tc, lambda c: self._invoke_tool(c, config)),
+            )
+            for msg, timing in outcomes:
+                results[timing["tool_call_id"]] = msg
+                print(f">>> [tools] ⏲️ {timing['name']}: {timing['status']} "
+                      f"run={timing['run_ms']}ms queue={timing['queue_ms']}ms")
+                try:
+                    await adispatch_custom_event("tool_timing", timing, config=config)
+                except Exception:
+                    pass  # 计时事件仅用于观测，失败不影响结果
+            if len(allowed_calls) > 1:
+                print(f">>> [tools] ⏲️ 本批 {len(allowed_calls)} 个工具并发完成, "
+                      f"总耗时 {(time.perf_counter() - batch_start) * 1000:.0f}ms")
 
-        return {"messages": result_messages}
+        # Keep results in the original tool_calls order
+        return {"messages": [results[tc["id"]] for tc in modified_message.tool_calls if tc["id"] in results]}
 
 
 class MiniTimeAgent:
@@ -151,26 +199,35 @@ class MiniTimeAgent:
         self._mcp_tools: list = []
         self._agent_app = None
         self._mcp_client: Optional[MultiServerMCPClient] = None
+        self._mcp_worker: Optional[mcp_host.WorkerProcess] = None
+        self._mcp_inprocess: Optional[mcp_host.InProcessToolHost] = None
+        self._tool_governor = mcp_host.ToolGovernor()
+        self._tool_node: Optional[UserAwareToolNode] = None
         self._memory = None
         self._memory_ctx = None
 
         # Per-user state
         self._active_tasks: dict[str, asyncio.Task] = {}
         self._task_lock = asyncio.Lock()
-        self._user_last_tool_state: dict[str, frozenset[str]] = {}
-
-        # Per-thread lock: 防止 system_trigger 和用户对话并发操作同一 checkpoint
-        self._thread_locks: dict[str, asyncio.Lock] = {}
-        self._thread_locks_guard = asyncio.Lock()
-        # 记录当前持有锁的来源: thread_id → "user" | "system"
-        self._thread_busy_source: dict[str, str] = {}
 
-        # 系统触发产生的新消息计数（thread_id → count），前端可轮询
-        self._pending_system_messages: dict[str, int] = {}
+        # Per-thread lock（防止 system_trigger 和用户对话并发操作同一 checkpoint）、
+        # 锁来源（"user" | "system"）、系统触发产生的新消息计数，以及每用户上一次的
+        # 工具启用状态；空闲条目自动回收，按用户索引
+        self._threads = ThreadRegistry()
 
         # 启动时一次性加载 prompt 模板
         self._prompts = self._load_prompts()
 
+        # _call_model 的缓存：工具绑定 / 外部工具 schema / system prompt / 用户文件
+        self._all_tool_names: tuple[str, ...] = ()
+        self._all_tool_list_str = ""
+        self._bound_llm_cache: OrderedDict[tuple, object] = OrderedDict()
+        self._external_tools_cache: OrderedDict[str, tuple[list[dict], frozenset[str]]] = OrderedDict()
+        self._base_prompt_cache: dict[tuple[str, bool], tuple[tuple, str]] = {}
+        self._user_file_cache: dict[str, tuple[int, str]] = {}
+        # _prepare_history 的增量缓存：thread → 已封存前缀的处理结果
+        self._history_cache: OrderedDict[str, dict] = OrderedDict()
+
     # ------------------------------------------------------------------
     # Prompt loader (启动时读取一次)
     # ------------------------------------------------------------------
@@ -183,6 +240,7 @@ class MiniTimeAgent:
             "base_system_subagent": "base_system_subagent.txt",
             "system_trigger": "system_trigger.txt",
             "tool_status": "tool_status.txt",
+            "context_summary": "context_summary.txt",
         }
         loaded = {}
         for key, filename in prompt_files.items():
@@ -202,22 +260,54 @@ class MiniTimeAgent:
 
         return loaded
 
-    def _get_user_profile(self, user_id: str) -> str:
-        """从 data/user_files/{user_id}/user_profile.txt 读取用户画像。"""
-        user_files_dir = self._prompts.get("_user_files_dir", "")
-        fpath = os.path.join(user_files_dir, user_id, "user_profile.txt")
+    @staticmethod
+    def _file_mtime(path: str) -> int:
+        """返回文件 mtime（纳秒），不存在时返回 -1。"""
         try:
-            with open(fpath, "r", encoding="utf-8") as f:
-                return f.read().strip()
-        except FileNotFoundError:
-            return ""
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return -1
+
+    def _read_cached_user_file(self, path: str, loader) -> str:
+        """按 mtime 缓存用户文件的解析结果，文件未变化时不再读盘。"""
+        mtime = self._file_mtime(path)
+        cached = self._user_file_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        value = loader()
+        self._user_file_cache[path] = (mtime, value)
+        return value
+
+    def _user_file_paths(self, user_id: str) -> tuple[str, str]:
+        user_files_dir = self._prompts.get("_user_files_dir", "")
+        return (
+            os.path.join(user_files_dir, user_id, "user_profile.txt"),
+            os.path.join(user_files_dir, user_id, "skills_manifest.json"),
+        )
+
+    def _get_user_profile(self, user_id: str) -> str:
+        """从 data/user_files/{user_id}/user_profile.txt 读取用户画像（按 mtime 缓存）。"""
+        fpath = self._user_file_paths(user_id)[0]
+
+        def _load() -> str:
+            try:
+                with open(fpath, "r", encoding="utf-8") as f:
+                    return f.read().strip()
+            except FileNotFoundError:
+                return ""
+
+        return self._read_cached_user_file(fpath, _load)
 
     def _get_user_skills(self, user_id: str) -> str:
         """
         从 data/user_files/{user_id}/skills_manifest.json 读取用户的 skill list，
-        并返回格式化的 skill 信息字符串。
+        并返回格式化的 skill 信息字符串（按 mtime 缓存）。
         即使没有 skill，也会返回位置信息。
         """
+        manifest_path = self._user_file_paths(user_id)[1]
+        return self._read_cached_user_file(manifest_path, lambda: self._format_user_skills(user_id))
+
+    def _format_user_skills(self, user_id: str) -> str:
         user_files_dir = self._prompts.get("_user_files_dir", "")
         manifest_path = os.path.join(user_files_dir, user_id, "skills_manifest.json")
         skills_dir = os.path.join(user_files_dir, user_id, "skills")
@@ -277,61 +367,36 @@ class MiniTimeAgent:
         self._memory_ctx = AsyncSqliteSaver.from_conn_string(self._db_path)
         self._memory = await self._memory_ctx.__aenter__()
 
-        # 2. Start MCP servers
-        python_command = sys.executable
-        self._mcp_client = MultiServerMCPClient({
-            "scheduler_service": {
-                "command": python_command,
-                "args": [os.path.join(self._src_dir, "mcp_scheduler.py")],
-                "transport": "stdio",
-            },
-            "search_service": {
-                "command": python_command,
-                "args": [os.path.join(self._src_dir, "mcp_search.py")],
-                "transport": "stdio",
-            },
-            "file_service": {
-                "command": python_command,
-                "args": [os.path.join(self._src_dir, "mcp_filemanager.py")],
-                "transport": "stdio",
-            },
-            "commander_service": {
-                "command": python_command,
-                "args": [os.path.join(self._src_dir, "mcp_commander.py")],
-                "transport": "stdio",
-            },
-            "oasis_service": {
-                "command": python_command,
-                "args": [os.path.join(self._src_dir, "mcp_oasis.py")],
-                "transport": "stdio",
-            },
-            "session_service": {
-                "command": python_command,
-                "args": [os.path.join(self._src_dir, "mcp_session.py")],
-                "transport": "stdio",
-            },
-            "telegram_service": {
-                "command": python_command,
-                "args": [os.path.join(self._src_dir, "mcp_telegram.py")],
-                "transport": "stdio",
-            },
-            "llmapi_service": {
-                "command": python_command,
-                "args": [os.path.join(self._src_dir, "mcp_llmapi.py")],
-                "transport": "stdio",
-            },
-        })
-
-        # 3. Fetch tool definitions (new API: no context manager needed)
-        self._mcp_tools = await self._mcp_client.get_tools()
+        # 2. Start MCP tools（MCP_TOOL_MODE: stdio / worker / inprocess）
+        mode = mcp_host.tool_mode()
+        if mode == "inprocess":
+            self._mcp_inprocess = mcp_host.InProcessToolHost(self._src_dir)
+            raw_tools = await self._mcp_inprocess.load_tools()
+        else:
+            if mode == "worker":
+                self._mcp_worker = mcp_host.WorkerProcess(self._src_dir, mcp_host.worker_port())
+                await self._mcp_worker.start()
+                connections = mcp_host.worker_connections(self._mcp_worker.port)
+            else:
+                connections = mcp_host.stdio_connections(self._src_dir)
+            self._mcp_client = MultiServerMCPClient(connections)
+            # 3. Fetch tool definitions (new API: no context manager needed)
+            raw_tools = await self._mcp_client.get_tools()
+
+        # 每个工具加并发上限与延迟统计
+        self._mcp_tools = [self._tool_governor.wrap(t) for t in raw_tools]
+        print(f"[mcp] 🧰 已加载 {len(self._mcp_tools)} 个工具 (mode={mode})")
 
         # 4. Build LangGraph workflow
         # 收集所有内部 MCP 工具名称，用于条件路由
         self._internal_tool_names = frozenset(t.name for t in self._mcp_tools)
+        self._all_tool_names = tuple(sorted(self._internal_tool_names))
+        self._all_tool_list_str = ", ".join(self._all_tool_names)
 
         workflow = StateGraph(AgentState)
         workflow.add_node("chatbot", self._call_model)
-        workflow.add_node("tools", UserAwareToolNode(self._mcp_tools, lambda: self._mcp_tools))
+        self._tool_node = UserAwareToolNode(self._mcp_tools, lambda: self._mcp_tools)
+        workflow.add_node("tools", self._tool_node)
         workflow.add_edge(START, "chatbot")
         workflow.add_conditional_edges("chatbot", self._should_continue)
         workflow.add_edge("tools", "chatbot")
@@ -341,6 +406,10 @@ class MiniTimeAgent:
 
     async def shutdown(self):
         """Clean up MCP client and checkpoint DB."""
+        if self._mcp_worker:
+            await self._mcp_worker.stop()
+        if self._mcp_inprocess:
+            self._mcp_inprocess.close()
         if self._memory_ctx:
             try:
                 await self._memory_ctx.__aexit__(None, None, None)
@@ -351,12 +420,119 @@ class MiniTimeAgent:
     # Model factory
     # ------------------------------------------------------------------
     # 模型名 -> 厂商 映射已移至 src/llm_factory.py（全局共享）
+    # create_chat_model() 返回池化实例：每轮调用复用同一 client 与 keep-alive 连接
 
     @staticmethod
     def _get_model() -> BaseChatModel:
         from llm_factory import create_chat_model
         return create_chat_model()
 
+    # ------------------------------------------------------------------
+    # Memoized tool binding & system prompt
+    # ------------------------------------------------------------------
+    _BOUND_LLM_CACHE_SIZE = 256
+
+    def _get_external_tools(self, external_tools_defs: list[dict]) -> tuple[str, list[dict], frozenset[str]]:
+        """将外部工具定义（OpenAI function format）转为可绑定格式，按 schema hash 缓存。"""
+        if not external_tools_defs:
+            return "", [], frozenset()
+        schema_hash = hashlib.sha1(
+            json.dumps(external_tools_defs, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+        cached = self._external_tools_cache.get(schema_hash)
+        if cached is not None:
+            self._external_tools_cache.move_to_end(schema_hash)
+            return schema_hash, cached[0], cached[1]
+
+        bind_defs: list[dict] = []
+        names: set[str] = set()
+        for ext_tool in external_tools_defs:
+            # 支持 OpenAI 标准格式: {"type":"function","function":{...}} 或简化格式 {"name":...,"parameters":...}
+            if ext_tool.get("type") == "function":
+                func_def = ext_tool.get("function", {})
+            else:
+                func_def = ext_tool
+            if func_def.get("name"):
+                names.add(func_def["name"])
+                # 以 OpenAI function 格式传入 bind_tools（LangChain 支持 dict 格式）
+                bind_defs.append({
+                    "type": "function",
+                    "function": {
+                        "name": func_def["name"],
+                        "description": func_def.get("description", ""),
+                        "parameters": func_def.get("parameters", {"type": "object", "properties": {}}),
+                    },
+                })
+        self._external_tools_cache[schema_hash] = (bind_defs, frozenset(names))
+        if len(self._external_tools_cache) > self._BOUND_LLM_CACHE_SIZE:
+            self._external_tools_cache.popitem(last=False)
+        return schema_hash, bind_defs, frozenset(names)
+
+    def _get_bound_llm(self, enabled_names, external_tools_defs: list[dict]):
+        """
+        返回已绑定工具的 LLM 与外部工具名集合。
+        缓存 key = (模型实例, 启用工具 frozenset, 外部工具 schema hash)；
+        模型实例来自 llm_factory 的实例池，配置变更后实例变化，缓存自然失效。
+        """
+        base_model = self._get_model()
+        schema_hash, external_defs, external_tool_names = self._get_external_tools(external_tools_defs)
+        enabled_key = frozenset(enabled_names) if enabled_names is not None else None
+        key = (id(base_model), enabled_key, schema_hash)
+
+        cached = self._bound_llm_cache.get(key)
+        if cached is not None and cached[0] is base_model:
+            self._bound_llm_cache.move_to_end(key)
+            return cached[1], set(external_tool_names)
+
+        # Dynamic tool binding based on enabled_tools + external_tools
+        if enabled_key is not None:
+            bind_tools_list: list = [t for t in self._mcp_tools if t.name in enabled_key]
+        else:
+            bind_tools_list = list(self._mcp_tools)
+        bind_tools_list.extend(external_defs)
+        llm = base_model.bind_tools(bind_tools_list) if bind_tools_list else base_model
+
+        self._bound_llm_cache[key] = (base_model, llm)
+        if len(self._bound_llm_cache) > self._BOUND_LLM_CACHE_SIZE:
+            self._bound_llm_cache.popitem(last=False)
+        return llm, set(external_tool_names)
+
+    def _get_base_prompt(self, user_id: str, is_subagent: bool) -> str:
+        """组装 system prompt；主会话按用户画像/技能清单的 mtime 判断是否需要重建。"""
+        if is_subagent:
+            # Subagent 模式：精简 prompt，无用户画像/技能，只列工具
+            cache_key = ("", True)
+            stamp: tuple = (self._all_tool_list_str,)
+        else:
+            cache_key = (user_id, False)
+            profile_path, manifest_path = self._user_file_paths(user_id)
+            stamp = (self._all_tool_list_str, self._file_mtime(profile_path), self._file_mtime(manifest_path))
+
+        cached = self._base_prompt_cache.get(cache_key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        if is_subagent:
+            base_prompt = (
+                self._prompts["base_system_subagent"] + "\n\n"
+                f"【可用工具列表】\n{self._all_tool_list_str}\n"
+            )
+        else:
+            base_prompt = (
+                self._prompts["base_system"] + "\n\n"
+                f"【默认可用工具列表】\n{self._all_tool_list_str}\n"
+                "以上工具默认全部启用。如果后续有工具状态变更，系统会另行通知。\n"
+            )
+            # 仅主 agent 会话注入用户画像和技能列表
+            user_profile = self._get_user_profile(user_id)
+            if user_profile:
+                base_prompt += f"\n{user_profile}\n"
+            # 注入用户技能列表（总是显示位置信息）
+            base_prompt += self._get_user_skills(user_id) + "\n"
+
+        self._base_prompt_cache[cache_key] = (stamp, base_prompt)
+        return base_prompt
+
     # ------------------------------------------------------------------
     # Conditional edge: route internal tools vs external tools vs end
     # ------------------------------------------------------------------
@@ -384,75 +560,31 @@ class MiniTimeAgent:
     async def _call_model(self, state: AgentState):
         """LangGraph node: invoke LLM with dynamic tool binding & tool-state notification."""
 
-        # Dynamic tool binding based on enabled_tools + external_tools
-        all_tools = self._mcp_tools
         enabled_names = state.get("enabled_tools")
-        if enabled_names is not None:
-            filtered_tools = [t for t in all_tools if t.name in enabled_names]
-        else:
-            filtered_tools = all_tools
-
-        # 将外部工具定义（OpenAI function format）转为 LangChain 可绑定的格式
         external_tools_defs = state.get("external_tools") or []
-        bind_tools_list: list = list(filtered_tools)
-        external_tool_names: set[str] = set()
-        for ext_tool in external_tools_defs:
-            # 支持 OpenAI 标准格式: {"type":"function","function":{...}} 或简化格式 {"name":...,"parameters":...}
-            if ext_tool.get("type") == "function":
-                func_def = ext_tool.get("function", {})
-            else:
-                func_def = ext_tool
-            if func_def.get("name"):
-                external_tool_names.add(func_def["name"])
-                # 以 OpenAI function 格式传入 bind_tools（LangChain 支持 dict 格式）
-                bind_tools_list.append({
-                    "type": "function",
-                    "function": {
-                        "name": func_def["name"],
-                        "description": func_def.get("description", ""),
-                        "parameters": func_def.get("parameters", {"type": "object", "properties": {}}),
-                    },
-                })
-
-        base_model = self._get_model()
-        llm = base_model.bind_tools(bind_tools_list) if bind_tools_list else base_model
+        llm, external_tool_names = self._get_bound_llm(enabled_names, external_tools_defs)
 
         # --- KV-Cache-friendly tool state management ---
-        all_names = sorted(t.name for t in all_tools)
-        all_tool_list_str = ", ".join(all_names)
+        all_names = self._all_tool_names
 
         # 判断是否为 subagent 会话（session_id 以 "oasis_" 开头）
         session_id = state.get("session_id", "")
         is_subagent = session_id.startswith("oasis_") if session_id else False
 
-        if is_subagent:
-            # Subagent 模式：精简 prompt，无用户画像/技能，只列工具
-            base_prompt = (
-                self._prompts["base_system_subagent"] + "\n\n"
-                f"【可用工具列表】\n{all_tool_list_str}\n"
-            )
-        else:
-            base_prompt = (
-                self._prompts["base_system"] + "\n\n"
-                f"【默认可用工具列表】\n{all_tool_list_str}\n"
-                "以上工具默认全部启用。如果后续有工具状态变更，系统会另行通知。\n"
-            )
-
         # Detect tool state change
         current_enabled = frozenset(enabled_names) if enabled_names is not None else frozenset(all_names)
         user_id = state.get("user_id", "__global__")
 
-        # 仅主 agent 会话注入用户画像和技能列表
-        if not is_subagent:
-            # 注入用户专属画像
-            user_profile = self._get_user_profile(user_id)
-            if user_profile:
-                base_prompt += f"\n{user_profile}\n"
+        base_prompt = self._get_base_prompt(user_id, is_subagent)
 
-            # 注入用户技能列表（总是显示位置信息）
-            base_prompt += self._get_user_skills(user_id) + "\n"
+        # 上下文预算：早期对话替换为滚动摘要，只发送最近的原文窗口
+        history_messages, context_summary, summary_changed = await self._apply_context_budget(
+            state, is_subagent,
+        )
+        if context_summary and context_summary.get("text"):
+            base_prompt += f"\n【早期对话摘要】\n{context_summary['text']}\n"
 
-        last_state = self._user_last_tool_state.get(user_id)
+        last_state = self._threads.last_tool_state(user_id)
 
         tool_status_prompt = ""
         if last_state is not None and current_enabled != last_state:
@@ -474,19 +606,17 @@ class MiniTimeAgent:
                 )
 
         # Update cache
-        self._user_last_tool_state[user_id] = current_enabled
-
-        history_messages = list(state["messages"])
+        self._threads.set_tool_state(user_id, current_enabled)
 
         # 每次进入前清理：移除末尾不完整的 tool_calls（有 AIMessage 带 tool_calls 但缺少 ToolMessage 回复）
         # 但保留外部工具的未回复 tool_calls（它们正等待调用方回传结果）
-        history_messages = self._sanitize_messages(history_messages, external_tool_names)
-
-        # 清理历史消息中的多模态内容（file/image/audio parts），只保留文本
+        # 同时清理历史消息中的多模态内容（file/image/audio parts），只保留文本
         # 避免旧的二进制附件在后续轮次反复发送给 LLM 导致上游 API 报错
         # 注意：保留最后一条 HumanMessage 的多模态内容（当前轮用户输入）
-        if len(history_messages) > 1:
-            history_messages = self._strip_multimodal_parts(history_messages[:-1]) + [history_messages[-1]]
+        # 已处理过的前缀按 thread 缓存，每轮只处理新增消息
+        history_messages = self._prepare_history(
+            f"{user_id}#{session_id}", history_messages, external_tool_names,
+        )
 
         # 如果是系统触发，且最后一条不是 ToolMessage（非工具回调轮），给它加上系统触发说明
         is_system = state.get("trigger_source") == "system"
@@ -575,50 +705,118 @@ class MiniTimeAgent:
                             tool_call_id=_tc_id,
                         )
                         # 保留原始 AIMessage（带 tool_calls），后跟错误 ToolMessage
-                        return {"messages": [response, error_tool_msg]}
-
-        return {"messages": [response]}
+                        result = {"messages": [response, error_tool_msg]}
+                        if summary_changed:
+                            result["context_summary"] = context_summary
+                        return result
+
+        result = {"messages": [response]}
+        if summary_changed:
+            result["context_summary"] = context_summary
+        return result
 
     # ------------------------------------------------------------------
-    # Public interface: tools info
+    # Context budget: 滚动摘要 + 最近窗口
     # ------------------------------------------------------------------
-    @staticmethod
-    def _sanitize_messages(messages: list, external_tool_names: set[str] | None = None) -> list:
-        """
-        清理消息列表，确保每条带 tool_calls 的 AI 消息后面都有对应的 ToolMessage。
-
-        两轮扫描：
-        1. 末尾截断：从后往前移除悬空的 tool_calls AIMessage（保留外部工具等待回传）
-        2. 全序列扫描：中间的悬空 tool_calls AIMessage → 去掉 tool_calls 只保留 content
+    _SUMMARY_MAX_CHARS = 1500
 
-        同时检查 invalid_tool_calls（如截断的 arguments），因为序列化时也会变成 tool_calls 发给 API。
+    async def _apply_context_budget(self, state: AgentState, is_subagent: bool) -> tuple[list, Optional[dict], bool]:
         """
-        import logging
-        _log = logging.getLogger("agent.sanitize")
+        返回 (要发送的历史消息, 当前摘要, 摘要是否有更新)。
 
-        if not external_tool_names:
-            external_tool_names = set()
+        已摘要的前缀 messages[:upto] 不再发送；剩余部分超出预算时，把较早的
+        若干轮并入滚动摘要（每段只摘要一次），保留最近约 budget*ratio 的原文。
+        """
+        messages = list(state["messages"])
+        budget = state.get("context_budget")
+        if budget is None:
+            budget = context_budget.default_budget(is_subagent)
+
+        summary = state.get("context_summary") or None
+        if summary:
+            upto = summary.get("upto", 0)
+            # 历史被改写（如删除消息）导致摘要边界对不上时，丢弃摘要
+            if not (0 < upto <= len(messages) and messages[upto - 1].id == summary.get("upto_id")):
+                summary = None
+
+        if budget <= 0:
+            # 关闭预算：发送完整历史
+            return messages, None, bool(state.get("context_summary"))
+
+        covered = summary["upto"] if summary else 0
+        summary_tokens = summary.get("tokens", 0) if summary else 0
+        window_tokens = sum(context_budget.estimate_tokens(m) for m in messages[covered:])
+        if summary_tokens + window_tokens <= budget:
+            return messages[covered:], summary, False
+
+        keep_tokens = int(budget * context_budget.keep_recent_ratio())
+        cut = context_budget.choose_cut(messages, covered, keep_tokens)
+        if cut <= covered:
+            return messages[covered:], summary, False
+
+        span_text = context_budget.render_span(messages[covered:cut])
+        prompt = self._prompts.get("context_summary") or (
+            "请把以下对话压缩为摘要（合并已有摘要），保留目标、决定、关键事实和未完成事项，"
+            "不超过 {max_chars} 字。\n已有摘要：\n{previous_summary}\n\n新对话：\n{conversation}"
+        )
+        try:
+            # 摘要调用发生在 graph 节点内部，默认会继承 astream_events 的回调，
+            # 其 token 会混进流式回复；这里断开回调并打标签（mainagent 侧再按标签过滤）
+            response = await self._get_model().ainvoke([HumanMessage(content=prompt.format(
+                previous_summary=summary["text"] if summary else "（无）",
+                conversation=span_text,
+                max_chars=self._SUMMARY_MAX_CHARS,
+            ))], config={"callbacks": [], "tags": [context_budget.SUMMARY_TAG]})
+        except Exception as e:
+            # 摘要失败时不丢弃任何原文，下一轮再试
+            print(f">>> [context] ⚠️ 滚动摘要失败，本轮发送完整窗口: {e}")
+            return messages[covered:], summary, False
+
+        text = response.content if isinstance(response.content, str) else context_budget.content_text(response.content)
+        text = text.strip()[: self._SUMMARY_MAX_CHARS * 2]
+        new_summary = {
+            "upto": cut,
+            "upto_id": messages[cut - 1].id,
+            "text": text,
+            "tokens": context_budget.estimate_text_tokens(text),
+            "spans": (summary.get("spans", 0) if summary else 0) + 1,
+        }
+        print(f">>> [context] 📝 已摘要消息 [{covered}:{cut})，"
+              f"保留最近 {len(messages) - cut} 条原文（预算 {budget} tokens）")
+        return messages[cut:], new_summary, True
 
-        def _get_all_tc(msg):
-            """获取 AIMessage 上所有 tool_calls + invalid_tool_calls"""
-            tc_list = list(getattr(msg, "tool_calls", None) or [])
-            for itc in (getattr(msg, "invalid_tool_calls", None) or []):
-                tc_list.append({"id": itc.get("id", ""), "name": itc.get("name", ""), **itc})
-            return tc_list
+    # ------------------------------------------------------------------
+    # Public interface: tools info
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _get_all_tc(msg) -> list[dict]:
+        """获取 AIMessage 上所有 tool_calls + invalid_tool_calls"""
+        tc_list = list(getattr(msg, "tool_calls", None) or [])
+        for itc in (getattr(msg, "invalid_tool_calls", None) or []):
+            tc_list.append({"id": itc.get("id", ""), "name": itc.get("name", ""), **itc})
+        return tc_list
 
-        # 收集所有已存在的 tool_call_id 回复
-        answered_ids = set()
+    @staticmethod
+    def _collect_answered_ids(messages: list, answered_ids: set[str]) -> set[str]:
+        """收集所有已存在的 tool_call_id 回复（原地更新并返回 answered_ids）。"""
         for msg in messages:
             if isinstance(msg, ToolMessage) and hasattr(msg, "tool_call_id"):
                 answered_ids.add(msg.tool_call_id)
+        return answered_ids
+
+    @classmethod
+    def _truncate_dangling_tail(cls, messages: list, answered_ids: set[str],
+                                external_tool_names: set[str]) -> list:
+        """第一轮：从末尾截断悬空的 tool_calls（保留外部工具等待回传）。"""
+        import logging
+        _log = logging.getLogger("agent.sanitize")
 
-        # --- 第一轮：从末尾截断悬空的 tool_calls ---
         clean = list(messages)
         while clean:
             last = clean[-1]
             if not isinstance(last, AIMessage):
                 break
-            all_tc = _get_all_tc(last)
+            all_tc = cls._get_all_tc(last)
             if not all_tc:
                 break
             pending_ids = {tc["id"] for tc in all_tc if tc.get("id")}
@@ -631,12 +829,22 @@ class MiniTimeAgent:
             _log.warning("sanitize: 截断末尾悬空 AIMessage, tool_calls=%s",
                          [tc.get("name") for tc in all_tc])
             clean.pop()
+        return clean
+
+    @classmethod
+    def _strip_dangling_tool_calls(cls, messages: list, answered_ids: set[str],
+                                   dangling_ids: set[str] | None = None) -> list:
+        """第二轮：中间的悬空 tool_calls AIMessage → 去掉 tool_calls 只保留 content。
+
+        dangling_ids 非 None 时，记录被剥离的 tool_call_id（供增量缓存做失效判断）。
+        """
+        import logging
+        _log = logging.getLogger("agent.sanitize")
 
-        # --- 第二轮：全序列扫描，修复中间的悬空 tool_calls ---
         result = []
-        for msg in clean:
+        for msg in messages:
             if isinstance(msg, AIMessage):
-                all_tc = _get_all_tc(msg)
+                all_tc = cls._get_all_tc(msg)
                 if all_tc:
                     pending_ids = {tc["id"] for tc in all_tc if tc.get("id")}
                     if not pending_ids.issubset(answered_ids):
@@ -646,12 +854,102 @@ class MiniTimeAgent:
                             [tc.get("name") for tc in all_tc],
                             str(msg.content)[:100],
                         )
+                        if dangling_ids is not None:
+                            dangling_ids.update(pending_ids - answered_ids)
                         result.append(AIMessage(content=msg.content or "（工具调用异常，已清理）"))
                         continue
             result.append(msg)
-
         return result
 
+    @classmethod
+    def _sanitize_messages(cls, messages: list, external_tool_names: set[str] | None = None) -> list:
+        """
+        清理消息列表，确保每条带 tool_calls 的 AI 消息后面都有对应的 ToolMessage。
+
+        两轮扫描：
+        1. 末尾截断：从后往前移除悬空的 tool_calls AIMessage（保留外部工具等待回传）
+        2. 全序列扫描：中间的悬空 tool_calls AIMessage → 去掉 tool_calls 只保留 content
+
+        同时检查 invalid_tool_calls（如截断的 arguments），因为序列化时也会变成 tool_calls 发给 API。
+        """
+        answered_ids = cls._collect_answered_ids(messages, set())
+        clean = cls._truncate_dangling_tail(messages, answered_ids, external_tool_names or set())
+        return cls._strip_dangling_tool_calls(clean, answered_ids)
+
+    # ------------------------------------------------------------------
+    # Incremental history preparation (sanitize + strip multimodal)
+    # ------------------------------------------------------------------
+    _HISTORY_CACHE_SIZE = 256
+
+    def _prepare_history(self, thread_key: str, messages: list,
+                         external_tool_names: set[str] | None = None) -> list:
+        """
+        增量版的 _sanitize_messages + _strip_multimodal_parts（最后一条消息保留多模态）。
+
+        最后一条 HumanMessage 之前的前缀视为已封存：其后只会追加新消息，
+        不会再有 ToolMessage 回复更早的 tool_calls。封存前缀的处理结果按 thread
+        缓存（watermark = 前缀长度 + 边界消息 id），每轮只处理 watermark 之后的消息。
+        结果与全量处理一致；缓存前缀中被剥离的 tool_call 之后若又出现回复，则回退全量处理。
+        """
+        external_tool_names = external_tool_names or set()
+        seal = 0
+        for i in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[i], HumanMessage):
+                seal = i
+                break
+
+        cache = self._history_cache.get(thread_key)
+        start = 0
+        if (
+            cache is not None
+            and messages
+            and 0 < cache["upto"] <= seal
+            and messages[0].id == cache["first_id"]
+            and messages[cache["upto"] - 1].id == cache["last_id"]
+        ):
+            start = cache["upto"]
+
+        if start and not self._collect_answered_ids(messages[start:], set()).isdisjoint(cache["dangling"]):
+            # 已缓存前缀中被剥离的 tool_calls 后来又得到回复 → 全量重算
+            start = 0
+        if start:
+            prefix_out = cache["out"]
+            dangling = cache["dangling"]
+            # 历史只追加不修改，已见过的回复 id 可直接并入缓存集合（避免每轮复制）
+            answered_ids = self._collect_answered_ids(messages[start:], cache["answered"])
+        else:
+            prefix_out = []
+            dangling = set()
+            answered_ids = self._collect_answered_ids(messages, set())
+
+        # 新封存的一段：[start, seal)，不可能位于末尾，只需第二轮 + 多模态清理
+        sealed = messages[start:seal]
+        sealed_out = self._strip_multimodal_parts(
+            self._strip_dangling_tool_calls(sealed, answered_ids, dangling)
+        )
+        # 当前轮：[seal, end)，完整两轮清理，最后一条保留多模态内容
+        tail = self._truncate_dangling_tail(messages[seal:], answered_ids, external_tool_names)
+        tail = self._strip_dangling_tool_calls(tail, answered_ids)
+        if len(tail) > 1:
+            tail = self._strip_multimodal_parts(tail[:-1]) + [tail[-1]]
+
+        if seal == 0:
+            return tail
+        # 原地追加，避免每轮复制整个前缀
+        prefix_out.extend(sealed_out)
+        self._history_cache[thread_key] = {
+            "upto": seal,
+            "first_id": messages[0].id,
+            "last_id": messages[seal - 1].id,
+            "out": prefix_out,
+            "answered": answered_ids,
+            "dangling": dangling,
+        }
+        self._history_cache.move_to_end(thread_key)
+        if len(self._history_cache) > self._HISTORY_CACHE_SIZE:
+            self._history_cache.popitem(last=False)
+        return prefix_out + tail
+
     @staticmethod
     def _strip_multimodal_parts(messages: list) -> list:
         """
@@ -711,6 +1009,15 @@ class MiniTimeAgent:
         """Return serializable tool metadata list."""
         return [{"name": t.name, "description": t.description or ""} for t in self._mcp_tools]
 
+    def get_tool_stats(self) -> dict:
+        """每个工具的并发上限、当前并发、排队/执行耗时直方图。"""
+        return {
+            "mode": mcp_host.tool_mode(),
+            "scheduler": self._tool_node._scheduler.stats() if self._tool_node else None,
+            "cache": self._tool_node._cache.stats() if self._tool_node else None,
+            "tools": self._tool_governor.stats(),
+        }
+
     # ------------------------------------------------------------------
     # Public interface: task management
     # ------------------------------------------------------------------
@@ -734,63 +1041,67 @@ class MiniTimeAgent:
         """Register an active streaming task for a user."""
         self._active_tasks[user_id] = task
 
-    def unregister_task(self, user_id: str):
-        """Remove a finished task from the registry."""
+    def unregister_task(self, user_id: str, task: asyncio.Task | None = None):
+        """Remove a finished task from the registry (only if it is still `task`, when given)."""
+        if task is not None and self._active_tasks.get(user_id) is not task:
+            return
         self._active_tasks.pop(user_id, None)
 
     # ------------------------------------------------------------------
     # Thread lock: 防止同一 thread 的并发 checkpoint 操作
     # ------------------------------------------------------------------
     async def get_thread_lock(self, thread_id: str) -> asyncio.Lock:
-        """获取指定 thread 的锁（懒创建）。"""
-        async with self._thread_locks_guard:
-            if thread_id not in self._thread_locks:
-                self._thread_locks[thread_id] = asyncio.Lock()
-            return self._thread_locks[thread_id]
+        """获取指定 thread 的锁（懒创建；调用方持有引用期间不会被回收）。"""
+        return self._threads.lock(thread_id)
 
     def add_pending_system_message(self, thread_id: str):
         """标记该 thread 有新的系统触发消息。"""
-        self._pending_system_messages[thread_id] = \
-            self._pending_system_messages.get(thread_id, 0) + 1
+        self._threads.add_pending(thread_id)
 
     def consume_pending_system_messages(self, thread_id: str) -> int:
         """消费并返回待处理的系统消息计数，归零。"""
-        count = self._pending_system_messages.pop(thread_id, 0)
-        return count
+        return self._threads.consume_pending(thread_id)
 
     def has_pending_system_messages(self, thread_id: str) -> bool:
         """检查是否有未读的系统触发消息。"""
-        return self._pending_system_messages.get(thread_id, 0) > 0
+        return self._threads.pending(thread_id) > 0
 
     def is_thread_busy(self, thread_id: str) -> bool:
         """检查该 thread 的锁是否被占用（有操作进行中）。"""
-        lock = self._thread_locks.get(thread_id)
-        return lock is not None and lock.locked()
+        return self._threads.is_busy(thread_id)
 
     def set_thread_busy_source(self, thread_id: str, source: str):
         """设置当前持有锁的来源（"user" 或 "system"）。"""
-        self._thread_busy_source[thread_id] = source
+        self._threads.set_busy_source(thread_id, source)
 
     def clear_thread_busy_source(self, thread_id: str):
         """清除锁来源记录。"""
-        self._thread_busy_source.pop(thread_id, None)
+        self._threads.clear_busy_source(thread_id)
 
     def get_thread_busy_source(self, thread_id: str) -> str:
         """返回锁来源: "user"、"system"、或 "" (未占用)。"""
         if not self.is_thread_busy(thread_id):
             return ""
-        return self._thread_busy_source.get(thread_id, "unknown")
+        return self._threads.busy_source(thread_id) or "unknown"
 
     def get_all_thread_status(self, prefix: str) -> dict[str, dict]:
-        """返回指定前缀下所有已知 thread 的状态。"""
+        """返回指定用户（prefix = "user_id#"）已登记 thread 的状态，只遍历该用户的会话。"""
         result = {}
-        for thread_id, lock in self._thread_locks.items():
+        for thread_id in self._threads.user_threads(prefix.partition("#")[0]):
             if not thread_id.startswith(prefix):
                 continue
-            busy = lock.locked()
+            busy = self._threads.is_busy(thread_id)
             result[thread_id] = {
                 "busy": busy,
-                "source": self._thread_busy_source.get(thread_id, "") if busy else "",
-                "pending_system": self._pending_system_messages.get(thread_id, 0),
+                "source": self._threads.busy_source(thread_id) if busy else "",
+                "pending_system": self._threads.pending(thread_id),
             }
         return result
+
+    def get_busy_threads(self) -> set[str]:
+        """返回所有正在运行的 thread_id。"""
+        return self._threads.busy_threads()
+
+    def get_thread_registry_stats(self) -> dict:
+        """会话锁 / 状态登记表的条目数与回收数。"""
+        return self._threads.stats()
@@ -0,0 +1,255 @@
+"""
+Checkpoint compactor: agent_memory.db 的保留策略 / 压缩 / VACUUM
+
+AsyncSqliteSaver 会为每个 thread 的每个 super-step 保留一份完整 checkpoint
+以及对应的 writes，且从不清理。SqliteSaver 的 checkpoint 内联了全部
+channel_values，因此只保留每个 (thread_id, checkpoint_ns) 最新的 N 个即可
+恢复会话状态：
+
+  1. 每个 thread 只保留最新 keep_last 个 checkpoint（checkpoint_id 为
+     uuid6，按字典序即时间序），checkpoint_pins 表中登记的不删
+  2. 删除没有对应 checkpoint 的孤儿 writes
+  3. PRAGMA incremental_vacuum 归还空闲页，报告回收字节数
+
+逐个 thread 提交事务（BEGIN IMMEDIATE），避免长时间持有写锁阻塞正在运行的 agent；
+同一 thread 的读取与删除在同一事务内，服务运行中执行时不会把读取之后新写入的
+checkpoint 的 writes 误判为孤儿。
+仅依赖标准库 sqlite3，mainagent 通过 asyncio.to_thread 在后台周期执行，
+scripts/cli.py 的 db-compact 子命令可直接调用（支持 --dry-run）。
+"""
+
+import os
+import sqlite3
+import time
+
+DEFAULT_KEEP_LAST = 10
+
+_PINS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint_pins (
+    thread_id     TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    note          TEXT NOT NULL DEFAULT '',
+    created_at    REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+)
+"""
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute(_PINS_SCHEMA)
+    conn.commit()
+    return conn
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def _file_size(db_path: str) -> int:
+    total = 0
+    for suffix in ("", "-wal"):
+        try:
+            total += os.path.getsize(db_path + suffix)
+        except OSError:
+            pass
+    return total
+
+
+def pin_checkpoint(db_path: str, thread_id: str, checkpoint_id: str,
+                   checkpoint_ns: str = "", note: str = "") -> None:
+    """登记一个不参与压缩的 checkpoint。"""
+    conn = _connect(db_path)
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO checkpoint_pins "
+            "(thread_id, checkpoint_ns, checkpoint_id, note, created_at) VALUES (?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, checkpoint_id, note, time.time()),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def unpin_checkpoint(db_path: str, thread_id: str, checkpoint_id: str, checkpoint_ns: str = "") -> None:
+    conn = _connect(db_path)
+    try:
+        conn.execute(
+            "DELETE FROM checkpoint_pins WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _compact_thread(conn: sqlite3.Connection, thread_id: str, keep_last: int,
+                    dry_run: bool, has_writes: bool) -> tuple[int, int, int]:
+    """压缩单个 thread，返回 (删除的 checkpoint 数, 删除的 writes 数, 估算释放字节)。"""
+    # 先拿写锁再读：读取到删除之间 agent 不能插入新的 checkpoint / writes
+    conn.execute("BEGIN" if dry_run else "BEGIN IMMEDIATE")
+    try:
+        return _compact_thread_locked(conn, thread_id, keep_last, dry_run, has_writes)
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+
+def _compact_thread_locked(conn: sqlite3.Connection, thread_id: str, keep_last: int,
+                           dry_run: bool, has_writes: bool) -> tuple[int, int, int]:
+    pinned = {
+        (ns, cid) for ns, cid in conn.execute(
+            "SELECT checkpoint_ns, checkpoint_id FROM checkpoint_pins WHERE thread_id = ?",
+            (thread_id,),
+        )
+    }
+    rows = conn.execute(
+        "SELECT checkpoint_ns, checkpoint_id, "
+        "       IFNULL(LENGTH(checkpoint), 0) + IFNULL(LENGTH(metadata), 0) "
+        "FROM checkpoints WHERE thread_id = ? ORDER BY checkpoint_ns, checkpoint_id DESC",
+        (thread_id,),
+    ).fetchall()
+
+    victims: list[tuple[str, str]] = []
+    freed = 0
+    seen: dict[str, int] = {}
+    for ns, cid, size in rows:
+        rank = seen.get(ns, 0)
+        seen[ns] = rank + 1
+        if rank < keep_last or (ns, cid) in pinned:
+            continue
+        victims.append((ns, cid))
+        freed += size
+
+    # 被删除 checkpoint 的 writes + 本来就没有 checkpoint 的孤儿 writes；
+    # 比已读到的最新 checkpoint 更新的 writes 不算孤儿（防御性，事务内本不应出现）
+    keep = set((ns, cid) for ns, cid, _ in rows) - set(victims)
+    newest: dict[str, str] = {}
+    for ns, cid, _ in rows:
+        newest.setdefault(ns, cid)
+    writes_deleted = 0
+    write_groups = conn.execute(
+        "SELECT checkpoint_ns, checkpoint_id, COUNT(*), SUM(IFNULL(LENGTH(value), 0)) FROM writes "
+        "WHERE thread_id = ? GROUP BY checkpoint_ns, checkpoint_id",
+        (thread_id,),
+    ).fetchall() if has_writes else []
+    for ns, cid, count, size in write_groups:
+        if (ns, cid) in keep or (ns in newest and cid > newest[ns]):
+            continue
+        writes_deleted += count
+        freed += size or 0
+        if not dry_run:
+            conn.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, ns, cid),
+            )
+
+    if not dry_run and victims:
+        conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            [(thread_id, ns, cid) for ns, cid in victims],
+        )
+    if not dry_run:
+        conn.commit()
+    return len(victims), writes_deleted, freed
+
+
+def compact(db_path: str, keep_last: int = DEFAULT_KEEP_LAST, *, dry_run: bool = False,
+            skip_threads: set[str] | frozenset[str] = frozenset(),
+            vacuum_pages: int = 0, full_vacuum: bool = False) -> dict:
+    """
+    压缩 checkpoint 数据库并返回报告。
+
+    Args:
+        keep_last:     每个 (thread_id, checkpoint_ns) 保留的最新 checkpoint 数（>=1）
+        dry_run:       只统计将被删除的行数/字节，不修改数据库
+        skip_threads:  跳过的 thread（例如正在运行的会话）
+        vacuum_pages:  incremental_vacuum 归还的页数上限，0 表示全部空闲页
+        full_vacuum:   数据库尚未开启 auto_vacuum=INCREMENTAL 时，执行一次性
+                       VACUUM 切换模式（会锁库，建议停服后通过 CLI 执行）
+    """
+    keep_last = max(1, int(keep_last))
+    started = time.time()
+    report = {
+        "dry_run": dry_run,
+        "keep_last": keep_last,
+        "threads_scanned": 0,
+        "threads_skipped": 0,
+        "checkpoints_deleted": 0,
+        "writes_deleted": 0,
+        "bytes_freed_estimate": 0,
+        "bytes_reclaimed": 0,
+        "size_before": _file_size(db_path),
+        "size_after": 0,
+        "freelist_bytes": 0,
+        "auto_vacuum": "",
+        "elapsed": 0.0,
+    }
+    if not os.path.exists(db_path):
+        report["size_after"] = 0
+        return report
+
+    conn = _connect(db_path)
+    try:
+        if not _has_table(conn, "checkpoints"):
+            report["size_after"] = report["size_before"]
+            return report
+        has_writes = _has_table(conn, "writes")
+
+        sql = "SELECT thread_id FROM checkpoints"
+        if has_writes:
+            sql += " UNION SELECT thread_id FROM writes"
+        thread_ids = [r[0] for r in conn.execute(sql).fetchall()]
+
+        for thread_id in thread_ids:
+            if thread_id in skip_threads:
+                report["threads_skipped"] += 1
+                continue
+            report["threads_scanned"] += 1
+            ckpts, writes, freed = _compact_thread(conn, thread_id, keep_last, dry_run, has_writes)
+            report["checkpoints_deleted"] += ckpts
+            report["writes_deleted"] += writes
+            report["bytes_freed_estimate"] += freed
+
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if not dry_run:
+            if mode != 2 and full_vacuum:
+                # 切换 auto_vacuum 模式必须做一次完整 VACUUM
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            elif mode == 2:
+                # incremental_vacuum 每 step 只归还一页，用 executescript 一次跑完
+                pages = f"({int(vacuum_pages)})" if vacuum_pages > 0 else ""
+                conn.executescript(f"PRAGMA incremental_vacuum{pages};")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        report["auto_vacuum"] = {0: "none", 1: "full", 2: "incremental"}.get(mode, str(mode))
+        report["freelist_bytes"] = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+    finally:
+        conn.close()
+
+    report["size_after"] = _file_size(db_path)
+    report["bytes_reclaimed"] = max(0, report["size_before"] - report["size_after"])
+    report["elapsed"] = round(time.time() - started, 3)
+    return report
+
+
+def format_report(report: dict) -> str:
+    """把 compact() 的报告格式化为一行日志。"""
+    def _mb(n: int) -> str:
+        return f"{n / 1024 / 1024:.1f}MB"
+
+    prefix = "[dry-run] " if report.get("dry_run") else ""
+    return (
+        f"{prefix}threads={report['threads_scanned']} (skipped {report['threads_skipped']}), "
+        f"checkpoints -{report['checkpoints_deleted']}, writes -{report['writes_deleted']}, "
+        f"freed≈{_mb(report['bytes_freed_estimate'])}, reclaimed={_mb(report['bytes_reclaimed'])}, "
+        f"size {_mb(report['size_before'])} → {_mb(report['size_after'])}, "
+        f"freelist={_mb(report['freelist_bytes'])}, auto_vacuum={report['auto_vacuum']}, "
+        f"{report['elapsed']}s"
+    )
@@ -0,0 +1,172 @@
+"""
+Context budget: 长会话的 token 预算与滚动摘要
+
+_call_model 每轮都会把完整 state["messages"] 发给 LLM，长期会话和 OASIS
+子 agent 会话的 prompt 会无限增长。这里提供：
+
+  - estimate_tokens():   按消息估算 token（按 message.id 缓存）
+  - choose_cut():        在预算内保留最近若干轮原文，返回切分点
+                         （切分点总是落在 HumanMessage 上，不会拆开 tool_calls / ToolMessage）
+  - render_span():       把要被摘要的消息段渲染为纯文本，交给 LLM 做滚动摘要
+
+滚动摘要本身（{"upto", "upto_id", "text", "tokens", "spans"}）由 agent 写回
+checkpoint 的 context_summary 字段，每段消息只摘要一次。
+
+token 数为估算值（CJK 字符按 1 token，其余按 4 字符 1 token），
+不依赖 tokenizer，足以用于预算控制。
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+# 每条消息的固定开销（role / 分隔符）
+_MESSAGE_OVERHEAD = 4
+# 多模态 part 的估算值
+_IMAGE_TOKENS = 765
+_FILE_TOKENS = 1000
+
+# 渲染摘要输入时每条消息的最大字符数
+_SPAN_MSG_CHARS = 2000
+_SPAN_TOOL_CHARS = 500
+
+# 滚动摘要 LLM 调用的 run tag；流式输出时带此 tag 的事件不转发给客户端
+SUMMARY_TAG = "context_summary"
+
+_TOKEN_CACHE_SIZE = 50000
+_token_cache: OrderedDict[str, int] = OrderedDict()
+
+
+def default_budget(is_subagent: bool) -> int:
+    """读取默认预算（0 表示不启用）。主会话与 oasis_ 子 agent 会话分别配置。"""
+    key = "CONTEXT_TOKEN_BUDGET_SUBAGENT" if is_subagent else "CONTEXT_TOKEN_BUDGET"
+    default = "24000" if is_subagent else "60000"
+    try:
+        return int(os.getenv(key, default))
+    except ValueError:
+        return int(default)
+
+
+def keep_recent_ratio() -> float:
+    """超出预算时，原文保留部分占预算的比例。"""
+    try:
+        ratio = float(os.getenv("CONTEXT_KEEP_RECENT_RATIO", "0.5"))
+    except ValueError:
+        ratio = 0.5
+    return min(max(ratio, 0.1), 0.9)
+
+
+def estimate_text_tokens(text: str) -> int:
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _content_tokens(content) -> int:
+    if isinstance(content, str):
+        return estimate_text_tokens(content)
+    if isinstance(content, list):
+        total = 0
+        for part in content:
+            if isinstance(part, str):
+                total += estimate_text_tokens(part)
+            elif isinstance(part, dict):
+                ptype = part.get("type", "")
+                if ptype == "text":
+                    total += estimate_text_tokens(part.get("text", ""))
+                elif ptype == "image_url":
+                    total += _IMAGE_TOKENS
+                else:
+                    total += _FILE_TOKENS
+        return total
+    return estimate_text_tokens(str(content))
+
+
+def estimate_tokens(msg) -> int:
+    """估算单条消息的 token 数；有 message.id 时缓存结果。"""
+    msg_id = getattr(msg, "id", None)
+    if msg_id:
+        cached = _token_cache.get(msg_id)
+        if cached is not None:
+            return cached
+
+    total = _MESSAGE_OVERHEAD + _content_tokens(getattr(msg, "content", ""))
+    for tc in getattr(msg, "tool_calls", None) or []:
+        total += estimate_text_tokens(tc.get("name", ""))
+        total += estimate_text_tokens(json.dumps(tc.get("args", {}), ensure_ascii=False, default=str))
+
+    if msg_id:
+        _token_cache[msg_id] = total
+        if len(_token_cache) > _TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return total
+
+
+def choose_cut(messages: list, start: int, keep_tokens: int) -> int:
+    """
+    在 messages[start:] 中选择切分点 cut，使 messages[cut:] 尽量不超过 keep_tokens。
+
+    cut 只会落在 HumanMessage 上（一轮对话的开头），且至少保留最后一条
+    HumanMessage 开始的当前轮。没有可切分的位置时返回 start。
+    """
+    human_positions = [
+        i for i in range(start + 1, len(messages)) if isinstance(messages[i], HumanMessage)
+    ]
+    if not human_positions:
+        return start
+
+    # 从后往前累加，找到预算内最早的一轮开头
+    suffix = 0
+    cut = human_positions[-1]
+    j = len(messages)
+    for pos in reversed(human_positions):
+        suffix += sum(estimate_tokens(m) for m in messages[pos:j])
+        j = pos
+        if suffix > keep_tokens and pos != human_positions[-1]:
+            break
+        cut = pos
+    return cut
+
+
+def content_text(content) -> str:
+    """提取 content（str 或多模态 list）中的文本。"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for p in content:
+            if isinstance(p, str):
+                parts.append(p)
+            elif isinstance(p, dict):
+                if p.get("type") == "text":
+                    parts.append(p.get("text", ""))
+                elif p.get("type") == "image_url":
+                    parts.append("[图片]")
+                else:
+                    parts.append("[附件]")
+        return " ".join(parts)
+    return str(content)
+
+
+def render_span(messages: list) -> str:
+    """把一段消息渲染为摘要输入文本（长内容截断）。"""
+    lines = []
+    for m in messages:
+        if isinstance(m, SystemMessage):
+            continue
+        text = content_text(m.content).strip()
+        if isinstance(m, HumanMessage):
+            lines.append(f"用户: {text[:_SPAN_MSG_CHARS]}")
+        elif isinstance(m, AIMessage):
+            if text:
+                lines.append(f"助手: {text[:_SPAN_MSG_CHARS]}")
+            for tc in m.tool_calls or []:
+                args = json.dumps(tc.get("args", {}), ensure_ascii=False, default=str)
+                lines.append(f"助手调用工具: {tc.get('name', '')}({args[:_SPAN_TOOL_CHARS]})")
+        elif isinstance(m, ToolMessage):
+            name = getattr(m, "name", "") or "tool"
+            lines.append(f"工具结果[{name}]: {text[:_SPAN_TOOL_CHARS]}")
+    return "\n".join(lines)
@@ -1212,6 +1212,211 @@ def proxy_post_group_message(group_id):
         return jsonify({"error": str(e)}), 500
 
 
+# ── 群聊消息推送（SSE）──
+# 首选浏览器直连 mainagent /groups/{id}/stream：/proxy_groups/<id>/stream_token 签发
+# 短期 HMAC token 并给出直连地址，Flask 不为空闲的看群页面占用线程。直连地址取
+# GROUP_STREAM_PUBLIC_URL（反向代理 / 暴露的 mainagent 端口）；未配置时只有通过
+# localhost 访问前端才能直连（mainagent 默认只监听 127.0.0.1）。
+#
+# 直连不可用时退回下面的中继：每个有人在看的群只维持一条到 mainagent 的上游连接
+# （后台线程），收到的消息放进内存缓冲并唤醒本群所有浏览器连接；浏览器连接在
+# Condition 上等待。每条浏览器连接最长保持 _GROUP_VIEWER_SECONDS 秒后结束，
+# EventSource 会带 Last-Event-ID 自动重连；最后一个浏览器离开后上游连接随之关闭。
+# 中继模式下每个看群页面仍占一个 Flask 线程。
+
+from urllib.parse import urlsplit as _urlsplit
+
+from group_bus import sign_stream_token as _sign_stream_token
+
+_GROUP_STREAM_PUBLIC_URL = os.getenv("GROUP_STREAM_PUBLIC_URL", "").strip().rstrip("/")
+
+
+def _group_stream_base() -> str:
+    """浏览器可直连的 mainagent 地址；无法直连时返回空串（使用中继）。"""
+    if _GROUP_STREAM_PUBLIC_URL:
+        return _GROUP_STREAM_PUBLIC_URL
+    host = _urlsplit(request.host_url).hostname or ""
+    if host in ("localhost", "127.0.0.1") and request.scheme == "http":
+        return f"http://{host}:{PORT_AGENT}"
+    return ""
+
+
+@app.route("/proxy_groups/<group_id>/stream_token")
+def proxy_group_stream_token(group_id):
+    """签发直连群聊推送的短期 token；url 为空表示需使用 /proxy_groups/<id>/stream 中继"""
+    uid, _ = _group_auth_headers()
+    if not uid:
+        return jsonify({"error": "未登录"}), 401
+    base = _group_stream_base()
+    if not base or not INTERNAL_TOKEN:
+        return jsonify({"url": ""})
+    token = _sign_stream_token(INTERNAL_TOKEN, uid, group_id)
+    return jsonify({"url": f"{base}/groups/{group_id}/stream", "token": token})
+
+
+import threading as _threading
+import time as _time
+from collections import deque as _deque
+
+_GROUP_VIEWER_SECONDS = 120
+_GROUP_RELAY_BUFFER = 256
+
+
+class _GroupRelay:
+    """一个群的上游 SSE 连接 + 消息缓冲，供多个浏览器连接共享。"""
+
+    def __init__(self, group_id: str, headers: dict, after_id: int):
+        self.group_id = group_id
+        self.headers = headers
+        self.base = after_id          # id > base 的消息都会进入缓冲区
+        self.last_id = after_id
+        self.evicted = 0              # 被挤出缓冲区的最大 id
+        self.messages = _deque(maxlen=_GROUP_RELAY_BUFFER)
+        self.deleted = False
+        self.viewers = 0
+        self.cond = _threading.Condition()
+        self.thread = _threading.Thread(target=self._run, daemon=True, name=f"group-relay-{group_id}")
+
+    def covers(self, cursor: int) -> bool:
+        return cursor >= self.base and cursor >= self.evicted
+
+    def _push(self, msg: dict):
+        with self.cond:
+            if msg["id"] <= self.last_id:
+                return
+            if len(self.messages) == self.messages.maxlen:
+                self.evicted = self.messages[0]["id"]
+            self.messages.append(msg)
+            self.last_id = msg["id"]
+            self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            self._relay()
+            with _group_relays_lock:
+                if self.viewers > 0 and not self.deleted:
+                    continue  # 退出前又有浏览器加入
+                if _group_relays.get(self.group_id) is self:
+                    del _group_relays[self.group_id]
+            break
+        with self.cond:
+            self.cond.notify_all()
+
+    def _relay(self):
+        backoff = 1
+        while self.viewers > 0 and not self.deleted:
+            try:
+                with requests.get(
+                    f"http://127.0.0.1:{PORT_AGENT}/groups/{self.group_id}/stream",
+                    params={"after_id": self.last_id}, headers=self.headers,
+                    stream=True, timeout=(5, 60),
+                ) as r:
+                    if r.status_code == 404:
+                        self.deleted = True
+                        break
+                    r.raise_for_status()
+                    backoff = 1
+                    event, data = "message", ""
+                    for line in r.iter_lines(decode_unicode=True):
+                        if self.viewers <= 0:
+                            break
+                        if line.startswith("event:"):
+                            event = line[6:].strip()
+                        elif line.startswith("data:"):
+                            data += line[5:].strip()
+                        elif not line:
+                            if event == "deleted":
+                                self.deleted = True
+                                break
+                            if data:
+                                self._push(json.loads(data))
+                            event, data = "message", ""
+            except Exception as e:
+                print(f"[GroupStream] ⚠️ 群 {self.group_id} 上游连接断开: {e}")
+                _time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+_group_relays: dict[str, _GroupRelay] = {}
+_group_relays_lock = _threading.Lock()
+
+
+def _join_group_relay(group_id: str, headers: dict, after_id: int) -> _GroupRelay:
+    with _group_relays_lock:
+        relay = _group_relays.get(group_id)
+        if relay is None or relay.deleted:
+            relay = _group_relays[group_id] = _GroupRelay(group_id, headers, after_id)
+            relay.viewers += 1
+            relay.thread.start()
+        else:
+            relay.viewers += 1
+        return relay
+
+
+def _group_sse(msg: dict) -> str:
+    return f"id: {msg['id']}\nevent: message\ndata: {json.dumps(msg, ensure_ascii=False)}\n\n"
+
+
+@app.route("/proxy_groups/<group_id>/stream")
+def proxy_group_stream(group_id):
+    """代理群聊消息推送（SSE，支持 after_id / Last-Event-ID 续传）"""
+    uid, headers = _group_auth_headers()
+    if not uid:
+        return jsonify({"error": "未登录"}), 401
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    after_id = request.args.get("after_id", 0, type=int)
+    if last_event_id.isdigit():
+        after_id = max(after_id, int(last_event_id))
+
+    def generate():
+        relay = _join_group_relay(group_id, headers, after_id)
+        cursor = after_id
+        deadline = _time.monotonic() + _GROUP_VIEWER_SECONDS
+        try:
+            yield "retry: 1000\n\n"
+            while _time.monotonic() < deadline:
+                if not relay.covers(cursor):
+                    # 上游缓冲覆盖不到的部分（打开页面前 / 被挤出的消息）按页补读
+                    r = requests.get(
+                        f"http://127.0.0.1:{PORT_AGENT}/groups/{group_id}/messages",
+                        params={"after_id": cursor}, headers=headers, timeout=10,
+                    )
+                    page = r.json().get("messages", []) if r.status_code == 200 else []
+                    for msg in page:
+                        if msg["id"] > cursor:
+                            cursor = msg["id"]
+                            yield _group_sse(msg)
+                    if not page:
+                        cursor = max(cursor, relay.base, relay.evicted)
+                    continue
+                with relay.cond:
+                    pending = [m for m in relay.messages if m["id"] > cursor]
+                    if not pending and not relay.deleted:
+                        relay.cond.wait(timeout=15)
+                        pending = [m for m in relay.messages if m["id"] > cursor]
+                for msg in pending:
+                    cursor = msg["id"]
+                    yield _group_sse(msg)
+                if relay.deleted:
+                    yield "event: deleted\ndata: {}\n\n"
+                    return
+                if not pending:
+                    yield ": ping\n\n"
+        finally:
+            with _group_relays_lock:
+                relay.viewers -= 1
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @app.route("/proxy_groups/<group_id>/mute", methods=["POST"])
 def proxy_mute_group(group_id):
     """代理静音群聊"""
@@ -1303,19 +1508,28 @@ def proxy_oasis_topic_detail(topic_id):
 def proxy_oasis_topic_stream(topic_id):
     """Proxy: SSE stream for real-time OASIS discussion updates."""
     user_id = session.get("user_id", "")
+    # 断线重连时浏览器会带上 Last-Event-ID，转发给 OASIS 以便续传
+    headers = {}
+    if request.headers.get("Last-Event-ID"):
+        headers["Last-Event-ID"] = request.headers["Last-Event-ID"]
     try:
         r = requests.get(
             f"{OASIS_BASE_URL}/topics/{topic_id}/stream",
-            params={"user_id": user_id},
+            params={
+                "user_id": user_id,
+                "last_event_id": request.args.get("last_event_id"),
+                "drafts": request.args.get("drafts"),
+            },
+            headers=headers,
             stream=True, timeout=300,
         )
         if r.status_code != 200:
             return jsonify({"error": f"OASIS returned {r.status_code}"}), r.status_code
 
         def generate():
+            # 原样转发（含空行），保持 id:/event:/data: 多行帧的边界
             for line in r.iter_lines(decode_unicode=True):
-                if line:
-                    yield line + "\n\n"
+                yield line + "\n"
 
         return Response(
             generate(),
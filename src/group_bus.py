@@ -0,0 +1,182 @@
+"""
+Group bus: 群聊消息的进程内推送（替代 after_id 轮询）
+
+post_group_message 提交消息后调用 publish()，订阅者（/groups/{group_id}/stream）
+立即收到，不再每次轮询都打开 group_chat.db：
+
+  - 每个有订阅者的群一个 feed：最近 GROUP_STREAM_BUFFER 条消息的环形缓冲
+    + asyncio.Event（每次 publish 后替换，唤醒所有等待者）
+  - 订阅时给出 after_id（或 SSE 的 Last-Event-ID）续传：缓冲区覆盖不到的部分
+    由调用方提供的 load_backlog(after_id) 从数据库补齐，之后只走内存
+  - 没有订阅者的群不保留 feed（publish 为空操作）；删除群时 close() 通知订阅者结束
+  - 订阅者按单调游标（已推送的最大 id）过滤，因此同一群的 publish 必须按 id 升序：
+    写入方在 post_lock(group_id) 内完成 INSERT → commit → publish（群消息并发投递给
+    多个 agent 后，它们的回复会同时写入）
+
+浏览器直连 /groups/{group_id}/stream 时不带 INTERNAL_TOKEN，而是带前端签发的
+短期 stream token（sign_stream_token / verify_stream_token，HMAC-SHA256，
+以 INTERNAL_TOKEN 为密钥，绑定 user_id + group_id + 过期时间）。
+
+GroupBus 单事件循环使用（mainagent 进程）；token 函数只依赖标准库，front 也会导入。
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+import weakref
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable
+
+
+class _GroupFeed:
+    __slots__ = ("messages", "changed", "subscribers", "closed", "complete_after", "evicted")
+
+    def __init__(self, buffer: int):
+        self.messages: deque[dict] = deque(maxlen=buffer)
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.closed = False
+        # 该群 id > complete_after 的消息都经过了本 feed（None = 还不知道，需读库）
+        self.complete_after: int | None = None
+        # 被挤出环形缓冲的最大 id（消息 id 全表自增，群内不连续，不能靠 id 差判断缺口）
+        self.evicted = 0
+
+    def covers(self, cursor: int) -> bool:
+        return self.complete_after is not None and cursor >= self.complete_after and cursor >= self.evicted
+
+    def wake(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class GroupBus:
+    """按群分发新消息给流式订阅者。"""
+
+    def __init__(self, buffer: int | None = None):
+        self.buffer = buffer or int(os.getenv("GROUP_STREAM_BUFFER", "256"))
+        self._feeds: dict[str, _GroupFeed] = {}
+        # 群 → 写入锁；没人持有 / 等待时自动回收
+        self._post_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.published = 0
+        self.backlog_loads = 0
+
+    def post_lock(self, group_id: str) -> asyncio.Lock:
+        """该群的写入锁：持锁完成 INSERT、commit 与 publish，保证 publish 顺序与 id 顺序一致。"""
+        lock = self._post_locks.get(group_id)
+        if lock is None:
+            lock = self._post_locks[group_id] = asyncio.Lock()
+        return lock
+
+    def publish(self, group_id: str, message: dict):
+        """消息已提交：推送给该群的订阅者（message 需含自增 id）。"""
+        feed = self._feeds.get(group_id)
+        if feed is None:
+            return
+        if len(feed.messages) == feed.messages.maxlen:
+            feed.evicted = feed.messages[0]["id"]
+        feed.messages.append(message)
+        self.published += 1
+        feed.wake()
+
+    def close(self, group_id: str):
+        """群已删除：通知订阅者结束。"""
+        feed = self._feeds.pop(group_id, None)
+        if feed is not None:
+            feed.closed = True
+            feed.wake()
+
+    async def subscribe(
+        self,
+        group_id: str,
+        after_id: int,
+        load_backlog: Callable[[int], Awaitable[list[dict]]],
+        heartbeat: float = 15.0,
+    ) -> AsyncIterator[tuple[str, dict | None]]:
+        """依次产出 ("message", msg) / ("ping", None) / ("deleted", None)。
+
+        load_backlog(after_id) 按 id 升序返回 after_id 之后的一页消息（空列表表示没有更多）。
+        """
+        feed = self._feeds.get(group_id)
+        if feed is None:
+            feed = self._feeds[group_id] = _GroupFeed(self.buffer)
+        feed.subscribers += 1
+        cursor = after_id
+        try:
+            while True:
+                if not feed.covers(cursor):
+                    # 先订阅再读库：读库期间提交的消息同时进入缓冲区，按 id 去重
+                    self.backlog_loads += 1
+                    while True:
+                        page = await load_backlog(cursor)
+                        if not page:
+                            break
+                        for msg in page:
+                            if msg["id"] > cursor:
+                                cursor = msg["id"]
+                                yield "message", msg
+                    if feed.complete_after is None:
+                        feed.complete_after = cursor  # 此后提交的消息都会 publish 到本 feed
+
+                for msg in list(feed.messages):
+                    if msg["id"] > cursor:
+                        cursor = msg["id"]
+                        yield "message", msg
+                if not feed.covers(cursor):
+                    continue  # 消费期间有未读消息被挤出缓冲区
+                if feed.closed:
+                    yield "deleted", None
+                    return
+                changed = feed.changed
+                try:
+                    await asyncio.wait_for(changed.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield "ping", None
+        finally:
+            feed.subscribers -= 1
+            if feed.subscribers <= 0 and self._feeds.get(group_id) is feed:
+                del self._feeds[group_id]
+
+    def stats(self) -> dict:
+        return {
+            "groups": len(self._feeds),
+            "subscribers": sum(f.subscribers for f in self._feeds.values()),
+            "buffer": self.buffer,
+            "published": self.published,
+            "backlog_loads": self.backlog_loads,
+        }
+
+
+# ── Stream token ──
+
+def sign_stream_token(secret: str, user_id: str, group_id: str, ttl: int | None = None) -> str:
+    """签发浏览器直连群聊推送用的短期 token（ttl 秒，默认 GROUP_STREAM_TOKEN_TTL=300）。"""
+    if not secret:
+        raise ValueError("INTERNAL_TOKEN 未配置，无法签发 stream token")
+    if ttl is None:
+        ttl = int(os.getenv("GROUP_STREAM_TOKEN_TTL", "300"))
+    payload = json.dumps({"u": user_id, "g": group_id, "e": int(time.time()) + ttl},
+                         separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    body = base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+    sig = hmac.new(secret.encode("utf-8"), body.encode("ascii"), hashlib.sha256).hexdigest()
+    return f"{body}.{sig}"
+
+
+def verify_stream_token(secret: str, token: str, group_id: str) -> str | None:
+    """校验 token 签名、群与有效期，通过时返回 user_id，否则返回 None。"""
+    if not secret or not token or "." not in token:
+        return None
+    body, _, sig = token.partition(".")
+    expected = hmac.new(secret.encode("utf-8"), body.encode("ascii", "ignore"), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(sig, expected):
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+    except ValueError:
+        return None
+    if claims.get("g") != group_id or claims.get("e", 0) < time.time():
+        return None
+    return claims.get("u") or None
@@ -0,0 +1,171 @@
+"""
+HTTP client pool: 进程内共享的 httpx.AsyncClient（按 base URL 复用 keep-alive 连接）
+
+专家调用、OASIS 回调、群聊广播、定时任务触发和 MCP 工具以前每次请求都新建
+httpx.AsyncClient，每次都要重新建立 TCP（外部 API 还有 TLS）连接。现在统一通过
+get_client(url) 取得按 scheme://host 复用的客户端：
+
+  - keep-alive 连接池，安装了 h2 时对支持的服务端启用 HTTP/2
+  - 连接上限         HTTP_POOL_MAX_CONNECTIONS（默认 100）
+  - 空闲连接上限     HTTP_POOL_MAX_KEEPALIVE（默认 20）
+  - 空闲连接保留     HTTP_POOL_KEEPALIVE_EXPIRY（秒，默认 120）
+
+超时由调用方按请求传入（client.post(..., timeout=...)），与原先各处的设置保持一致；
+原来 `async with httpx.AsyncClient(timeout=30) as client:` 的写法可换成
+`async with pooled(url, timeout=30) as client:`，退出时不关闭共享连接。
+服务 lifespan 结束时调用 aclose_http_pool() 关闭全部连接；统计见 get_http_pool_stats()。
+客户端按事件循环分开（进程内 MCP 工具运行在多个事件循环线程上，连接不能跨循环复用）。
+LLM 请求的连接池在 llm_factory 中单独管理。
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from urllib.parse import urlparse
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# event loop -> base URL (scheme://host) -> shared client
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = \
+    weakref.WeakKeyDictionary()
+_requests: dict[str, int] = {}
+_closed_total = 0
+_lock = threading.Lock()
+
+
+def _base_key(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme or 'http'}://{(parsed.netloc or parsed.path).lower()}"
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "120")),
+    )
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Return the shared keep-alive AsyncClient for the base URL of `url`.
+
+    Must be called from the event loop that will use it. Do not close it
+    (no `async with`); pass per-request timeouts.
+    """
+    key = _base_key(url)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        loop_clients = _clients.get(loop)
+        if loop_clients is None:
+            loop_clients = _clients[loop] = {}
+        client = loop_clients.get(key)
+        if client is not None and not client.is_closed:
+            return client
+
+        async def _count(request):
+            with _lock:
+                _requests[key] = _requests.get(key, 0) + 1
+
+        client = loop_clients[key] = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=_limits(),
+            event_hooks={"request": [_count]},
+        )
+        return client
+
+
+class PooledClient:
+    """`async with` view of a shared client with a default per-request timeout."""
+
+    def __init__(self, client: httpx.AsyncClient, timeout):
+        self._client = client
+        self._timeout = timeout
+
+    async def __aenter__(self) -> "PooledClient":
+        return self
+
+    async def __aexit__(self, *exc) -> bool:
+        return False  # the shared client (and its connections) stays open
+
+    def _kw(self, kwargs: dict) -> dict:
+        kwargs.setdefault("timeout", self._timeout)
+        return kwargs
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return await self._client.request(method, url, **self._kw(kwargs))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self._client.get(url, **self._kw(kwargs))
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self._client.post(url, **self._kw(kwargs))
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self._client.put(url, **self._kw(kwargs))
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self._client.patch(url, **self._kw(kwargs))
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self._client.delete(url, **self._kw(kwargs))
+
+    def stream(self, method: str, url: str, **kwargs):
+        return self._client.stream(method, url, **self._kw(kwargs))
+
+
+def pooled(url: str, timeout=5.0) -> PooledClient:
+    """Shared client for `url` with a default timeout (httpx's default is 5s)."""
+    return PooledClient(get_client(url), timeout)
+
+
+def _open_connections(client: httpx.AsyncClient) -> int:
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    return len(getattr(pool, "connections", []) or [])
+
+
+def get_http_pool_stats() -> dict:
+    """Per-base-URL request counts and connection reuse."""
+    open_conns: dict[str, int] = {}
+    clients = 0
+    with _lock:
+        per_loop = [list(c.items()) for c in _clients.values()]
+        requests_by_key = dict(_requests)
+        loops = len(per_loop)
+    for loop_clients in per_loop:
+        for key, client in loop_clients:
+            open_conns[key] = open_conns.get(key, 0) + _open_connections(client)
+            clients += 1
+    hosts = {}
+    for key, requests in requests_by_key.items():
+        hosts[key] = {
+            "requests": requests,
+            "open_connections": open_conns.get(key, 0),
+            "reused_requests": max(requests - open_conns.get(key, 0), 0),
+        }
+    return {
+        "clients": clients,
+        "event_loops": loops,
+        "closed_clients": _closed_total,
+        "http2": _HTTP2_AVAILABLE,
+        "hosts": hosts,
+    }
+
+
+async def aclose_http_pool():
+    """Close the current event loop's shared clients. Call once from the service lifespan."""
+    global _closed_total
+    with _lock:
+        clients = list(_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception:
+            pass
+    _closed_total += len(clients)
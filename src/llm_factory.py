@@ -4,15 +4,29 @@ Factory helpers for creating the shared LangChain chat model instance.
 This module supports provider-specific SDKs when available and falls back to
 OpenAI-compatible routing for the rest. It also normalizes OpenAI base URLs so
 users can provide either a root URL or a full endpoint URL.
+
+Model instances are pooled: ``create_chat_model`` returns a cached instance per
+(provider, model, base_url, temperature, max_tokens, ...) key, and
+OpenAI-compatible providers share one keep-alive httpx client per upstream
+host. The pool is dropped automatically when any LLM_* environment variable
+changes (e.g. after ``/settings`` rewrites ``.env``).
 """
 
 from __future__ import annotations
 
 import os
+import threading
 from urllib.parse import urlparse
 
+import httpx
 from langchain_core.language_models.chat_models import BaseChatModel
 
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
 
 def extract_text(content) -> str:
     """Convert provider-specific message payloads into plain text."""
@@ -105,6 +119,124 @@ def _should_use_responses_api(model: str, base_url: str) -> bool:
     )
 
 
+# ----------------------------------------------------------------------
+# Model / transport pool
+# ----------------------------------------------------------------------
+
+_ENV_KEYS = ("LLM_API_KEY", "LLM_BASE_URL", "LLM_MODEL", "LLM_PROVIDER")
+
+_pool_lock = threading.Lock()
+_env_fingerprint: tuple | None = None
+_model_cache: dict[tuple, BaseChatModel] = {}
+# host -> (sync client, async client)
+_transports: dict[str, tuple[httpx.Client, httpx.AsyncClient]] = {}
+_stats = {"hits": 0, "misses": 0, "rebuilds": 0}
+_host_requests: dict[str, int] = {}
+
+
+def _current_env_fingerprint() -> tuple:
+    return tuple(os.getenv(k, "") for k in _ENV_KEYS)
+
+
+def _check_env_locked():
+    """Drop cached models when the LLM_* configuration changed (caller holds lock)."""
+    global _env_fingerprint
+    fingerprint = _current_env_fingerprint()
+    if _env_fingerprint is not None and fingerprint != _env_fingerprint and _model_cache:
+        _model_cache.clear()
+        _stats["rebuilds"] += 1
+        print("[llm_factory] ♻️ LLM 配置已变更，模型实例池已重建")
+    _env_fingerprint = fingerprint
+
+
+def _host_key(base_url: str) -> str:
+    parsed = urlparse(base_url)
+    return f"{parsed.scheme or 'https'}://{(parsed.netloc or parsed.path).lower()}"
+
+
+def _get_transports(base_url: str) -> tuple[httpx.Client, httpx.AsyncClient]:
+    """Return the shared keep-alive (sync, async) httpx clients for an upstream host."""
+    host = _host_key(base_url)
+    clients = _transports.get(host)
+    if clients is not None:
+        return clients
+
+    def _count_sync(request):
+        _host_requests[host] = _host_requests.get(host, 0) + 1
+
+    async def _count_async(request):
+        _host_requests[host] = _host_requests.get(host, 0) + 1
+
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=120.0)
+    clients = (
+        httpx.Client(http2=_HTTP2_AVAILABLE, limits=limits,
+                     event_hooks={"request": [_count_sync]}),
+        httpx.AsyncClient(http2=_HTTP2_AVAILABLE, limits=limits,
+                          event_hooks={"request": [_count_async]}),
+    )
+    _transports[host] = clients
+    return clients
+
+
+def _open_connections(client) -> int:
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    return len(getattr(pool, "connections", []) or [])
+
+
+def get_model_pool_stats() -> dict:
+    """Return hit/miss counters and per-host connection reuse figures."""
+    with _pool_lock:
+        hosts = {}
+        for host, (sync_client, async_client) in _transports.items():
+            requests = _host_requests.get(host, 0)
+            open_conns = _open_connections(sync_client) + _open_connections(async_client)
+            hosts[host] = {
+                "requests": requests,
+                "open_connections": open_conns,
+                "reused_requests": max(requests - open_conns, 0),
+            }
+        return {
+            **_stats,
+            "cached_models": len(_model_cache),
+            "http2": _HTTP2_AVAILABLE,
+            "hosts": hosts,
+        }
+
+
+def reset_model_pool():
+    """Drop all cached model instances (transports are kept for reuse)."""
+    global _env_fingerprint
+    with _pool_lock:
+        if _model_cache:
+            _stats["rebuilds"] += 1
+        _model_cache.clear()
+        _env_fingerprint = _current_env_fingerprint()
+
+
+async def aclose_model_pool():
+    """Close all shared HTTP transports. Call once from the service lifespan."""
+    with _pool_lock:
+        clients = list(_transports.values())
+        _transports.clear()
+        _model_cache.clear()
+    for sync_client, async_client in clients:
+        try:
+            await async_client.aclose()
+            sync_client.close()
+        except Exception:
+            pass
+
+
+def _resolve_provider(model: str, provider: str) -> str:
+    if provider:
+        return provider
+    model_lower = model.lower()
+    for pattern, detected_provider in _MODEL_PROVIDER_PATTERNS.items():
+        if pattern in model_lower:
+            return detected_provider
+    return "openai"
+
+
 def create_chat_model(
     *,
     temperature: float = 0.7,
@@ -113,7 +245,10 @@ def create_chat_model(
     max_retries: int = 2,
 ) -> BaseChatModel:
     """
-    Create a chat model from TeamClaw environment variables.
+    Return a (pooled) chat model configured from TeamClaw environment variables.
+
+    Instances are cached per (provider, model, base_url, temperature,
+    max_tokens, timeout, max_retries); callers must not mutate the result.
 
     Required env vars:
       - LLM_API_KEY
@@ -123,22 +258,42 @@ def create_chat_model(
     api_key = os.getenv("LLM_API_KEY")
     base_url = os.getenv("LLM_BASE_URL", "https://api.deepseek.com").strip()
     model = os.getenv("LLM_MODEL", "deepseek-chat")
-    provider = os.getenv("LLM_PROVIDER", "").strip().lower()
+    provider = _resolve_provider(model, os.getenv("LLM_PROVIDER", "").strip().lower())
 
     if not api_key:
         raise ValueError("LLM_API_KEY is not configured.")
 
+    key = (provider, model, base_url, temperature, max_tokens, timeout, max_retries)
+    with _pool_lock:
+        _check_env_locked()
+        cached = _model_cache.get(key)
+        if cached is not None:
+            _stats["hits"] += 1
+            return cached
+        _stats["misses"] += 1
+        instance = _build_chat_model(
+            provider, model, base_url, api_key,
+            temperature=temperature, max_tokens=max_tokens,
+            timeout=timeout, max_retries=max_retries,
+        )
+        _model_cache[key] = instance
+        return instance
+
+
+def _build_chat_model(
+    provider: str,
+    model: str,
+    base_url: str,
+    api_key: str,
+    *,
+    temperature: float,
+    max_tokens: int,
+    timeout: int,
+    max_retries: int,
+) -> BaseChatModel:
+    """Construct a new provider-specific chat model instance."""
     supports_temp = _model_supports_temperature(model)
 
-    if not provider:
-        model_lower = model.lower()
-        for pattern, detected_provider in _MODEL_PROVIDER_PATTERNS.items():
-            if pattern in model_lower:
-                provider = detected_provider
-                break
-        else:
-            provider = "openai"
-
     if provider == "google":
         from langchain_google_genai import ChatGoogleGenerativeAI
 
@@ -183,6 +338,8 @@ def create_chat_model(
             "max_retries": max_retries,
             "use_responses_api": False,
         }
+        if base_url:
+            kwargs["http_client"], kwargs["http_async_client"] = _get_transports(base_url)
         if supports_temp:
             kwargs["temperature"] = temperature
         return ChatDeepSeek(**kwargs)
@@ -202,5 +359,6 @@ def create_chat_model(
         kwargs["temperature"] = temperature
     if _should_use_responses_api(model, openai_base):
         kwargs["use_responses_api"] = True
+    kwargs["http_client"], kwargs["http_async_client"] = _get_transports(openai_base)
 
     return ChatOpenAI(**kwargs)
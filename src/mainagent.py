@@ -9,7 +9,6 @@ import uuid
 from contextlib import asynccontextmanager
 
 import aiosqlite
-import httpx
 from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
@@ -27,6 +26,14 @@ patch_langchain_file_mime()
 
 from agent import MiniTimeAgent
 from llm_factory import extract_text as _extract_text
+from llm_factory import aclose_model_pool, get_model_pool_stats, reset_model_pool
+from http_pool import aclose_http_pool, get_client, get_http_pool_stats
+from group_bus import GroupBus, verify_stream_token
+from system_inbox import SystemInbox, merge_texts
+from admission import AdmissionFull, AdmissionScheduler, classify
+import context_budget
+import session_index
+import checkpoint_compactor
 
 # --- Path setup ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -141,16 +148,16 @@ async def _transcribe_audio_input(audio_b64: str, audio_fmt: str = "webm") -> st
     filename = f"recording.{audio_fmt}"
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            resp = await client.post(
-                transcription_url,
-                headers={"Authorization": f"Bearer {api_key}"},
-                data={
-                    "model": _get_stt_model(),
-                    "response_format": "json",
-                },
-                files={"file": (filename, audio_bytes, mime)},
-            )
+        resp = await get_client(transcription_url).post(
+            transcription_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            data={
+                "model": _get_stt_model(),
+                "response_format": "json",
+            },
+            files={"file": (filename, audio_bytes, mime)},
+            timeout=60.0,
+        )
     except Exception as exc:
         print(f"[audio] transcription request failed: {exc}")
         return ""
@@ -238,13 +245,44 @@ def verify_password(username: str, password: str) -> bool:
 agent = MiniTimeAgent(src_dir=current_dir, db_path=db_path)
 
 
+# --- Checkpoint 后台压缩 ---
+# CHECKPOINT_KEEP_LAST: 每个会话保留的最新 checkpoint 数
+# CHECKPOINT_COMPACT_INTERVAL: 压缩周期（秒），0 表示关闭
+_CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", str(checkpoint_compactor.DEFAULT_KEEP_LAST)))
+_CHECKPOINT_COMPACT_INTERVAL = int(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "21600"))
+_last_compact_report: dict = {}
+
+
+async def _checkpoint_compactor_loop():
+    """周期性压缩 agent_memory.db；跳过正在运行的会话，sqlite 操作放到线程池执行。"""
+    global _last_compact_report
+    while True:
+        await asyncio.sleep(_CHECKPOINT_COMPACT_INTERVAL)
+        busy = agent.get_busy_threads()
+        try:
+            _last_compact_report = await asyncio.to_thread(
+                checkpoint_compactor.compact, db_path, _CHECKPOINT_KEEP_LAST, skip_threads=busy,
+            )
+            print(f"[Compactor] 🧹 {checkpoint_compactor.format_report(_last_compact_report)}")
+        except Exception as e:
+            print(f"[Compactor] ❌ 压缩失败: {e}")
+
+
 # --- FastAPI lifespan ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await agent.startup()
+    await session_index.ensure_index(db_path, reset_busy=True)   # 会话索引表（首次启动时回填）
     await _init_group_db()   # 初始化群聊数据库（on_event 与 lifespan 不兼容）
+    compactor_task = None
+    if _CHECKPOINT_COMPACT_INTERVAL > 0:
+        compactor_task = asyncio.create_task(_checkpoint_compactor_loop())
     yield
+    if compactor_task:
+        compactor_task.cancel()
     await agent.shutdown()
+    await aclose_model_pool()
+    await aclose_http_pool()
 
 
 app = FastAPI(lifespan=lifespan, docs_url=None, redoc_url=None, openapi_url=None)
@@ -322,6 +360,8 @@ class ChatCompletionRequest(BaseModel):
     session_id: Optional[str] = "default"
     password: Optional[str] = None
     enabled_tools: Optional[list[str]] = None
+    context_budget: Optional[int] = None  # 会话级上下文 token 预算（0 关闭，持久化到该会话）
+    priority: Optional[str] = None  # 排队优先级，只能降级：bot / oasis / system（见 admission.py）
 
 
 def _decode_pdf_data_uri(data_uri: str) -> bytes:
@@ -534,6 +574,45 @@ async def get_tools_list(
     raise HTTPException(status_code=403, detail="认证失败")
 
 
+@app.get("/llm_stats")
+async def llm_stats(x_internal_token: str | None = Header(None)):
+    """返回 LLM 模型实例池的命中/未命中与连接复用统计（内部接口）。"""
+    verify_internal_token(x_internal_token)
+    return {"status": "success", "stats": get_model_pool_stats()}
+
+
+@app.get("/http_pool_stats")
+async def http_pool_stats(x_internal_token: str | None = Header(None)):
+    """返回共享 HTTP 客户端池（群聊广播、语音接口、进程内 MCP 工具）的连接复用统计（内部接口）。"""
+    verify_internal_token(x_internal_token)
+    return {"status": "success", "stats": get_http_pool_stats()}
+
+
+@app.get("/tool_stats")
+async def tool_stats(x_internal_token: str | None = Header(None)):
+    """返回每个 MCP 工具的并发上限、当前并发与延迟直方图（内部接口）。"""
+    verify_internal_token(x_internal_token)
+    return {"status": "success", "stats": agent.get_tool_stats()}
+
+
+@app.get("/thread_registry_stats")
+async def thread_registry_stats(x_internal_token: str | None = Header(None)):
+    """返回会话锁 / 会话状态登记表的条目数与空闲回收数（内部接口）。"""
+    verify_internal_token(x_internal_token)
+    return {"status": "success", "stats": agent.get_thread_registry_stats()}
+
+
+@app.get("/db_compact_stats")
+async def db_compact_stats(x_internal_token: str | None = Header(None)):
+    """最近一次后台 checkpoint 压缩的报告。"""
+    verify_internal_token(x_internal_token)
+    return {
+        "keep_last": _CHECKPOINT_KEEP_LAST,
+        "interval": _CHECKPOINT_COMPACT_INTERVAL,
+        "last_report": _last_compact_report,
+    }
+
+
 @app.post("/login")
 async def login(req: LoginRequest):
     if verify_password(req.user_id, req.password):
@@ -599,29 +678,29 @@ async def text_to_speech(req: TTSRequest, x_internal_token: str | None = Header(
     tts_url = _build_audio_api_url(base_url, "/audio/speech")
 
     async def audio_stream():
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            async with client.stream(
-                "POST",
-                tts_url,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": tts_model,
-                    "input": tts_text,
-                    "voice": tts_voice,
-                    "response_format": "mp3",
-                },
-            ) as resp:
-                if resp.status_code != 200:
-                    error_body = await resp.aread()
-                    raise HTTPException(
-                        status_code=resp.status_code,
-                        detail=f"TTS API 错误: {error_body.decode('utf-8', errors='replace')[:200]}",
-                    )
-                async for chunk in resp.aiter_bytes(chunk_size=4096):
-                    yield chunk
+        async with get_client(tts_url).stream(
+            "POST",
+            tts_url,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": tts_model,
+                "input": tts_text,
+                "voice": tts_voice,
+                "response_format": "mp3",
+            },
+            timeout=60.0,
+        ) as resp:
+            if resp.status_code != 200:
+                error_body = await resp.aread()
+                raise HTTPException(
+                    status_code=resp.status_code,
+                    detail=f"TTS API 错误: {error_body.decode('utf-8', errors='replace')[:200]}",
+                )
+            async for chunk in resp.aiter_bytes(chunk_size=4096):
+                yield chunk
 
     return StreamingResponse(
         audio_stream(),
@@ -654,70 +733,32 @@ async def list_sessions(req: SessionListRequest, x_internal_token: str | None =
     """列出用户的所有会话，返回 session_id 列表及每个会话的摘要信息。"""
     verify_auth_or_token(req.user_id, req.password, x_internal_token)
 
-    prefix = f"{req.user_id}#"
-    sessions = []
-
-    # 从 checkpoint DB 中查询该用户的所有 thread_id
-    async with aiosqlite.connect(db_path) as db:
-        cursor = await db.execute(
-            "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id LIKE ? ORDER BY thread_id",
-            (f"{prefix}%",),
-        )
-        rows = await cursor.fetchall()
-
-    for (thread_id,) in rows:
-        sid = thread_id[len(prefix):]
-
-        # 获取最新 checkpoint 中的第一条和最后一条用户消息作为摘要
-        config = {"configurable": {"thread_id": thread_id}}
-        snapshot = await agent.agent_app.aget_state(config)
-        msgs = snapshot.values.get("messages", []) if snapshot and snapshot.values else []
-
-        # 找第一条用户消息作为标题
-        first_human = ""
-        last_human = ""
-        msg_count = 0
-        for m in msgs:
-            if hasattr(m, "content") and type(m).__name__ == "HumanMessage":
-                # 多模态 content 可能是 list，提取其中的文本部分
-                raw = m.content
-                if isinstance(raw, str):
-                    content = raw
-                elif isinstance(raw, list):
-                    content = " ".join(
-                        p.get("text", "") for p in raw if isinstance(p, dict) and p.get("type") == "text"
-                    ) or "(图片消息)"
-                else:
-                    content = str(raw)
-                # 跳过系统触发消息
-                if content.startswith("[系统触发]") or content.startswith("[外部学术会议邀请]"):
-                    continue
-                msg_count += 1
-                if not first_human:
-                    first_human = content[:50]
-                last_human = content[:50]
-
-        if not first_human:
-            continue  # 空会话或纯系统会话，不展示
-
-        sessions.append({
-            "session_id": sid,
-            "title": first_human,
-            "last_message": last_human,
-            "message_count": msg_count,
-        })
+    # 直接读 session_index，不再逐个反序列化 checkpoint
+    rows = await session_index.list_user_sessions(db_path, req.user_id)
+    sessions = [
+        {
+            "session_id": r["session_id"],
+            "title": r["title"][:50],
+            "last_message": r["last_message"][:50],
+            "message_count": r["message_count"],
+            "updated_at": r["updated_at"],
+        }
+        for r in rows
+    ]
 
     return {"status": "success", "sessions": sessions}
 
 
 @app.post("/sessions_status")
 async def sessions_status(req: SessionListRequest, x_internal_token: str | None = Header(None)):
-    """返回用户所有 session 的忙碌状态、来源和待处理系统消息数。"""
+    """返回用户所有 session 的忙碌状态、来源、待处理与排队中的系统消息数。"""
     verify_auth_or_token(req.user_id, req.password, x_internal_token)
 
     prefix = f"{req.user_id}#"
     # 从 agent 内存中获取所有已知 thread 的状态
     all_status = agent.get_all_thread_status(prefix)
+    for thread_id in system_inbox.threads(prefix):
+        all_status.setdefault(thread_id, {"busy": False, "source": "", "pending_system": 0})
 
     result = []
     for thread_id, info in all_status.items():
@@ -727,6 +768,7 @@ async def sessions_status(req: SessionListRequest, x_internal_token: str | None
             "busy": info["busy"],
             "source": info["source"],       # "user" | "system" | ""
             "pending_system": info["pending_system"],
+            "queued_system": system_inbox.depth(thread_id),  # 排队等待合并运行的系统消息
         })
 
     return {"status": "success", "sessions": result}
@@ -802,9 +844,12 @@ async def delete_session(
 
                 # 删除单个会话
                 thread_id = f"{req.user_id}#{req.session_id}"
+                system_inbox.discard(thread_id)
                 for table in ("checkpoints", "writes"):
                     await db.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                await session_index.delete_thread(db, thread_id)
                 await db.commit()
+                _forget_agent_title(thread_id)
                 return {"status": "success", "message": f"会话 {req.session_id} 已删除"}
             else:
                 # 取消该用户所有正在运行的 agent tasks
@@ -812,12 +857,16 @@ async def delete_session(
                 keys_to_cancel = [k for k in agent._active_tasks if k.startswith(prefix)]
                 for k in keys_to_cancel:
                     await agent.cancel_task(k)
+                for k in system_inbox.threads(prefix):
+                    system_inbox.discard(k)
 
                 # 删除该用户所有会话
                 pattern = f"{req.user_id}#%"
                 for table in ("checkpoints", "writes"):
                     await db.execute(f"DELETE FROM {table} WHERE thread_id LIKE ?", (pattern,))
+                await session_index.delete_user(db, req.user_id)
                 await db.commit()
+                _forget_agent_title(user_id=req.user_id)
                 return {"status": "success", "message": f"用户 {req.user_id} 的所有会话已删除"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"删除失败: {e}")
@@ -945,6 +994,12 @@ def _write_env_settings(updates: dict):
     with open(env_path, "w", encoding="utf-8") as f:
         f.writelines(new_lines)
 
+    # LLM_* 配置热生效：同步到 os.environ，并让 llm_factory 重建模型实例池
+    llm_updates = {k: v for k, v in updates.items() if k.startswith("LLM_")}
+    if llm_updates:
+        os.environ.update(llm_updates)
+        reset_model_pool()
+
 
 class SettingsUpdateRequest(BaseModel):
     user_id: str
@@ -1042,63 +1097,118 @@ async def restart_services(req: SettingsUpdateRequest, x_internal_token: str | N
 @app.post("/system_trigger")
 async def system_trigger(req: SystemTriggerRequest, x_internal_token: str | None = Header(None)):
     verify_internal_token(x_internal_token)
-    thread_id = f"{req.user_id}#{req.session_id}"
-    config = {"configurable": {"thread_id": thread_id}}
-    system_input = {
-        "messages": [HumanMessage(content=req.text)],
-        "trigger_source": "system",
-        "enabled_tools": None,
-        "user_id": req.user_id,
-        "session_id": req.session_id,
-    }
+    await dispatch_system_trigger(req.user_id, req.session_id, req.text)
+    return {"status": "received", "message": f"系统触发已收到，用户 {req.user_id}"}
+
+
+async def dispatch_system_trigger(user_id: str, session_id: str, text: str):
+    """系统触发的进程内入口（/system_trigger 与群聊广播共用）：消息进入该会话的
+    system_inbox 排队，立刻返回；会话忙碌期间到达的消息合并到下一次运行。"""
+    depth = system_inbox.submit(f"{user_id}#{session_id}", text)
+    if depth > 1:
+        print(f"[SystemTrigger] 📥 {user_id}#{session_id} 排队中的系统消息: {depth}")
 
-    async def _wait_and_invoke():
-        task_key = f"{req.user_id}#{req.session_id}"
-        lock = await agent.get_thread_lock(thread_id)
-        print(f"[SystemTrigger] ⏳ Waiting for lock on {thread_id} ...")
-        async with lock:
-            agent.set_thread_busy_source(thread_id, "system")
-            print(f"[SystemTrigger] 🔒 Acquired lock on {thread_id}, invoking graph ...")
+
+def _assign_message_ids(messages: list) -> None:
+    """给本轮输入消息预先分配 id，运行中断时可据此核对是否已写入 checkpoint。"""
+    for m in messages:
+        if not getattr(m, "id", None):
+            m.id = str(uuid.uuid4())
+
+
+async def _persisted_input(config: dict, input_messages: list, admitted: bool, finished: bool) -> list:
+    """本轮实际写入 checkpoint 的输入消息（交给 session_index.record_run）。
+
+    未拿到运行槽位（排队时被取消）→ 空；正常结束 → 全部；
+    运行中途失败 / 被取消 → 按 id 核对 checkpoint（只在异常路径多读一次状态）。
+    """
+    if not admitted or not input_messages:
+        return []
+    if finished:
+        return input_messages
+    ids = {m.id for m in input_messages if getattr(m, "id", None)}
+    try:
+        snapshot = await agent.agent_app.aget_state(config)
+    except Exception as e:
+        print(f"[session_index] ⚠️ 无法核对 {config['configurable']['thread_id']} 的输入是否已写入: {e}")
+        return []
+    present = ids & {getattr(m, "id", None) for m in snapshot.values.get("messages", [])}
+    return [m for m in input_messages if m.id in present]
+
+
+async def _run_system_batch(thread_id: str, take):
+    """system_inbox worker：拿到会话锁后取出一批消息，合并为一条 HumanMessage 运行 graph。"""
+    user_id, _, session_id = thread_id.partition("#")
+    task_key = thread_id
+    config = {"configurable": {"thread_id": thread_id}}
+    lock = await agent.get_thread_lock(thread_id)
+    print(f"[SystemTrigger] ⏳ Waiting for lock on {thread_id} ...")
+    async with lock:
+        texts = take()
+        if not texts:
+            return
+        system_input = {
+            "messages": [HumanMessage(content=merge_texts(texts))],
+            "trigger_source": "system",
+            "enabled_tools": None,
+            "user_id": user_id,
+            "session_id": session_id,
+        }
+        _assign_message_ids(system_input["messages"])
+        # 持锁期间才登记为该会话的活动任务，用户点停止 / 发新消息时可取消
+        current = asyncio.current_task()
+        agent.register_task(task_key, current)
+        try:
+            await admission.acquire(user_id, "system", thread_id=thread_id)
+        except BaseException:
+            agent.unregister_task(task_key, current)
+            raise
+        agent.set_thread_busy_source(thread_id, "system")
+        await session_index.mark_busy(db_path, thread_id, "system")
+        print(f"[SystemTrigger] 🔒 Acquired lock on {thread_id}, invoking graph with {len(texts)} message(s) ...")
+        finished = False
+        try:
+            # 用 astream_events 替代 ainvoke，这样每个 event 都是一个
+            # await 点，task.cancel() 可以在任意 event 间隙注入
+            async for event in agent.agent_app.astream_events(
+                system_input, config, version="v2"
+            ):
+                pass  # 不需要处理事件，只是消费完整个流
+            finished = True
+            agent.add_pending_system_message(thread_id)
+            print(f"[SystemTrigger] ✅ Done for {thread_id}")
+        except asyncio.CancelledError:
+            print(f"[SystemTrigger] 🛑 Cancelled for {thread_id}")
+            # 修复 checkpoint 中可能不完整的消息序列
             try:
-                # 用 astream_events 替代 ainvoke，这样每个 event 都是一个
-                # await 点，task.cancel() 可以在任意 event 间隙注入
-                async for event in agent.agent_app.astream_events(
-                    system_input, config, version="v2"
-                ):
-                    pass  # 不需要处理事件，只是消费完整个流
-                agent.add_pending_system_message(thread_id)
-                print(f"[SystemTrigger] ✅ Done for {thread_id}")
-            except asyncio.CancelledError:
-                print(f"[SystemTrigger] 🛑 Cancelled for {thread_id}")
-                # 修复 checkpoint 中可能不完整的消息序列
-                try:
-                    snapshot = await agent.agent_app.aget_state(config)
-                    last_msgs = snapshot.values.get("messages", [])
-                    if last_msgs:
-                        last_msg = last_msgs[-1]
-                        if hasattr(last_msg, "tool_calls") and last_msg.tool_calls:
-                            tool_messages = [
-                                ToolMessage(
-                                    content="⚠️ 系统调用被用户终止",
-                                    tool_call_id=tc["id"],
-                                )
-                                for tc in last_msg.tool_calls
-                            ]
-                            await agent.agent_app.aupdate_state(config, {"messages": tool_messages})
-                except Exception:
-                    pass
-            except Exception as e:
-                print(f"[SystemTrigger] ❌ Error for {thread_id}: {e}")
-            finally:
-                agent.clear_thread_busy_source(thread_id)
-                agent.unregister_task(task_key)
+                snapshot = await agent.agent_app.aget_state(config)
+                last_msgs = snapshot.values.get("messages", [])
+                if last_msgs:
+                    last_msg = last_msgs[-1]
+                    if hasattr(last_msg, "tool_calls") and last_msg.tool_calls:
+                        tool_messages = [
+                            ToolMessage(
+                                content="⚠️ 系统调用被用户终止",
+                                tool_call_id=tc["id"],
+                            )
+                            for tc in last_msg.tool_calls
+                        ]
+                        await agent.agent_app.aupdate_state(config, {"messages": tool_messages})
+            except Exception:
+                pass
+            raise  # 交给 system_inbox 丢弃剩余排队消息
+        except Exception as e:
+            print(f"[SystemTrigger] ❌ Error for {thread_id}: {e}")
+        finally:
+            admission.release(user_id, thread_id)
+            agent.clear_thread_busy_source(thread_id)
+            await session_index.record_run(db_path, thread_id, await _persisted_input(
+                config, system_input["messages"], True, finished))
+            agent.unregister_task(task_key, current)
 
-    # fire-and-forget：立刻返回，graph 在后台异步执行
-    task_key = f"{req.user_id}#{req.session_id}"
-    await agent.cancel_task(task_key)  # 取消该会话可能正在运行的任务
-    task = asyncio.create_task(_wait_and_invoke())
-    agent.register_task(task_key, task)
-    return {"status": "received", "message": f"系统触发已收到，用户 {req.user_id}"}
+
+system_inbox = SystemInbox(_run_system_batch)
+admission = AdmissionScheduler()  # graph 运行的并发上限与按优先级公平排队
 
 
 # ------------------------------------------------------------------
@@ -1323,6 +1433,7 @@ def _auth_openai_request(req: ChatCompletionRequest, auth_header: str | None):
 async def openai_chat_completions(
     req: ChatCompletionRequest,
     authorization: str | None = Header(None),
+    x_parent_thread: str | None = Header(None),
 ):
     """OpenAI 兼容的 /v1/chat/completions 端点。
 
@@ -1339,6 +1450,9 @@ async def openai_chat_completions(
     - enabled_tools: 启用的工具列表 (null=全部)
     - tools: 外部工具定义（OpenAI function calling 格式）
     - tool_choice: 工具选择策略
+
+    X-Parent-Thread（仅 INTERNAL_TOKEN 认证时有效）：发起该调用、正同步等待结果的 thread_id
+    （send_internal_message wait=True），本次运行借用其运行槽位，见 admission.py。
     """
     user_id, authenticated, session_override = _auth_openai_request(req, authorization)
     if not authenticated:
@@ -1418,8 +1532,21 @@ async def openai_chat_completions(
         "session_id": session_id,
         "external_tools": req.tools,
     }
+    if req.context_budget is not None:
+        user_input["context_budget"] = req.context_budget
+    _assign_message_ids(input_messages)
 
     model_name = req.model or "teambot"
+    priority = classify(session_id, "user", req.priority)
+    parent_thread = None
+    if x_parent_thread and authorization and authorization[7:].split(":")[0] == INTERNAL_TOKEN:
+        parent_thread = x_parent_thread if admission.holds(x_parent_thread) else None
+    if parent_thread is None:
+        try:
+            admission.check(priority)
+        except AdmissionFull as e:
+            raise HTTPException(status_code=503, detail=f"服务繁忙：{e}",
+                                headers={"Retry-After": str(e.retry_after)})
     thread_lock = await agent.get_thread_lock(thread_id)
 
     # --- 非流式 ---
@@ -1430,10 +1557,19 @@ async def openai_chat_completions(
         async def _non_stream_worker():
             async with thread_lock:
                 agent.set_thread_busy_source(thread_id, "user")
+                await session_index.mark_busy(db_path, thread_id, "user")
+                admitted = finished = False
                 try:
-                    return await agent.agent_app.ainvoke(user_input, config)
+                    async with admission.slot(user_id, priority, thread_id=thread_id, parent=parent_thread):
+                        admitted = True
+                        result = await agent.agent_app.ainvoke(user_input, config)
+                        finished = True
+                        return result
                 finally:
                     agent.clear_thread_busy_source(thread_id)
+                    await session_index.record_run(db_path, thread_id, await _persisted_input(
+                        config, input_messages, admitted, finished))
+                    _forget_agent_title(thread_id, untitled_only=True)
 
         task = asyncio.create_task(_non_stream_worker())
         agent.register_task(task_key, task)
@@ -1459,7 +1595,7 @@ async def openai_chat_completions(
                 pass
             return _make_openai_response("⚠️ 已终止", model=model_name)
         finally:
-            agent.unregister_task(task_key)
+            agent.unregister_task(task_key, task)
 
         last_msg = result["messages"][-1]
 
@@ -1483,12 +1619,23 @@ async def openai_chat_completions(
         collected_tokens = []
         _chatbot_round = 0          # chatbot 节点轮次计数
         _active_tool_names = []     # 当前批次的工具名称列表
+        admitted = finished = False
         async with thread_lock:
             agent.set_thread_busy_source(thread_id, "user")
+            await session_index.mark_busy(db_path, thread_id, "user")
             try:
                 # 发送 role chunk
                 await queue.put(_make_openai_chunk("", model=model_name, completion_id=completion_id))
 
+                # 等待运行槽位；排队期间推送排队位置，前端据此显示「排队中」
+                def _on_wait(position: int):
+                    queue.put_nowait(_make_openai_chunk(
+                        model=model_name, completion_id=completion_id,
+                        meta={"type": "queued", "position": position, "priority": priority}))
+
+                await admission.acquire(user_id, priority, _on_wait, thread_id, parent_thread)
+                admitted = True
+
                 async for event in agent.agent_app.astream_events(user_input, config, version="v2"):
                     kind = event.get("event", "")
                     ev_name = event.get("name", "")
@@ -1539,8 +1686,18 @@ async def openai_chat_completions(
                                 model=model_name, completion_id=completion_id,
                                 meta={"type": "tool_end", "name": tool_name, "result": output_str}))
 
+                    # --- 单个工具调用的排队/执行耗时（UserAwareToolNode 发出） ---
+                    elif kind == "on_custom_event" and ev_name == "tool_timing":
+                        timing = event.get("data") or {}
+                        if timing.get("name") not in external_tool_names:
+                            await queue.put(_make_openai_chunk(
+                                model=model_name, completion_id=completion_id,
+                                meta={"type": "tool_timing", **timing}))
+
                     # --- LLM 流式 token ---
                     elif kind == "on_chat_model_stream":
+                        if context_budget.SUMMARY_TAG in (event.get("tags") or ()):
+                            continue  # 滚动摘要的 token 不属于回复
                         chunk = event.get("data", {}).get("chunk")
                         if chunk and hasattr(chunk, "content") and chunk.content:
                             text = _extract_text(chunk.content)
@@ -1549,6 +1706,8 @@ async def openai_chat_completions(
                                 await queue.put(_make_openai_chunk(
                                 text, model=model_name, completion_id=completion_id))
 
+                finished = True
+
                 # 流式结束后，检查是否有外部工具调用
                 snapshot = await agent.agent_app.aget_state(config)
                 last_msgs = snapshot.values.get("messages", [])
@@ -1612,9 +1771,14 @@ async def openai_chat_completions(
                     "", model=model_name, finish_reason="stop", completion_id=completion_id))
                 await queue.put("data: [DONE]\n\n")
             finally:
+                if admitted:
+                    admission.release(user_id, thread_id)
                 agent.clear_thread_busy_source(thread_id)
+                await session_index.record_run(db_path, thread_id, await _persisted_input(
+                    config, input_messages, admitted, finished))
+                _forget_agent_title(thread_id, untitled_only=True)
                 await queue.put(None)
-                agent.unregister_task(task_key)
+                agent.unregister_task(task_key, asyncio.current_task())
 
     task = asyncio.create_task(_stream_worker())
     agent.register_task(task_key, task)
@@ -1717,6 +1881,8 @@ class GroupMessageRequest(BaseModel):
 # --- Helpers ---
 
 _group_muted: set[str] = set()  # 被静音的群 group_id 集合，广播时跳过
+group_bus = GroupBus()  # 新消息推送给 /groups/{group_id}/stream 订阅者
+_GROUP_BROADCAST_CONCURRENCY = max(1, int(os.getenv("GROUP_BROADCAST_CONCURRENCY", "8")))
 
 def _parse_group_auth(authorization: str | None, x_internal_token: str | None = None):
     """从 Bearer token 解析用户认证，返回 (user_id, password, session_id)。
@@ -1743,8 +1909,37 @@ def _parse_group_auth(authorization: str | None, x_internal_token: str | None =
     return uid, pw, sid
 
 
+# 群成员标题索引：thread_id → (title, 是否已确定, 写入时间)
+# 标题取第一条非系统触发的 HumanMessage，一旦确定不再变化；尚无标题的会话在用户下次
+# 发消息后失效。会话删除时清除；mcp_session 等其他进程的删除靠 TTL 兜底。
+_agent_titles: dict[str, tuple[str, bool, float]] = {}
+_AGENT_TITLE_TTL = int(os.getenv("GROUP_TITLE_CACHE_TTL", "600"))
+
+
+def _forget_agent_title(thread_id: str | None = None, user_id: str | None = None, untitled_only: bool = False):
+    """使标题索引失效：单个会话 / 某用户全部会话。"""
+    if user_id is not None:
+        for tid in [t for t in _agent_titles if t.startswith(f"{user_id}#")]:
+            _agent_titles.pop(tid, None)
+        return
+    entry = _agent_titles.get(thread_id)
+    if entry is not None and (not untitled_only or not entry[1]):
+        _agent_titles.pop(thread_id, None)
+
+
 async def _get_agent_title(user_id: str, session_id: str) -> str:
-    """从 checkpoint 提取 agent 的 session title（第一条非系统触发 HumanMessage 前50字）"""
+    """agent 的 session title（第一条非系统触发 HumanMessage 前50字），带缓存。"""
+    tid = f"{user_id}#{session_id}"
+    cached = _agent_titles.get(tid)
+    if cached is not None and time.time() - cached[2] < _AGENT_TITLE_TTL:
+        return cached[0]
+    title = await _load_agent_title(user_id, session_id)
+    _agent_titles[tid] = (title or session_id, bool(title), time.time())
+    return title or session_id
+
+
+async def _load_agent_title(user_id: str, session_id: str) -> str:
+    """从 checkpoint 提取 agent 的 session title；还没有时返回空串。"""
     tid = f"{user_id}#{session_id}"
     try:
         config = {"configurable": {"thread_id": tid}}
@@ -1766,7 +1961,7 @@ async def _get_agent_title(user_id: str, session_id: str) -> str:
                 return content[:50]
     except Exception:
         pass
-    return session_id
+    return ""
 
 
 async def _broadcast_to_group(group_id: str, sender: str, content: str, exclude_user: str = "", exclude_session: str = "", mentions: list[str] | None = None):
@@ -1783,53 +1978,51 @@ async def _broadcast_to_group(group_id: str, sender: str, content: str, exclude_
         )
         members = await cursor.fetchall()
 
+    targets = []
     for user_id, session_id, is_agent in members:
-        if group_id in _group_muted:
-            print(f"[GroupChat] 群 {group_id} 广播中途被静音，停止")
-            return
         if not is_agent:
             continue  # 人类成员不需要异步通知
         if user_id == exclude_user and session_id == exclude_session:
             continue  # 不通知发送者自己
+        # 如果有 mentions 列表，只发给被 @ 的 agent
+        if mentions and f"{user_id}#{session_id}" not in mentions:
+            continue
+        targets.append((user_id, session_id))
 
-        member_key = f"{user_id}#{session_id}"
+    # 并发投递（上限 GROUP_BROADCAST_CONCURRENCY），各 agent 几乎同时收到消息
+    sem = asyncio.Semaphore(_GROUP_BROADCAST_CONCURRENCY)
+    skipped = []
 
-        # 如果有 mentions 列表，只发给被 @ 的 agent
-        if mentions:
-            if member_key not in mentions:
-                continue
+    async def _deliver(user_id: str, session_id: str):
+        member_key = f"{user_id}#{session_id}"
+        async with sem:
+            # 获取目标 agent 的 title，让它知道自己的身份
+            my_title = await _get_agent_title(user_id, session_id)
+            if mentions and member_key in mentions:
+                # 被 @ 的消息：强调这是专门发送的，必须回复
+                msg_text = (f"[群聊 {group_id}] {sender} @你 说:\n{content}\n\n"
+                            f"(⚠️ 这是专门 @你 的消息，你必须回复！"
+                            f"你在群聊中的身份/角色是「{my_title}」，回复时请体现你的专业角色视角。"
+                            f"请使用 send_to_group 工具回复，group_id={group_id}。)")
+            else:
+                # 普通广播消息
+                msg_text = (f"[群聊 {group_id}] {sender} 说:\n{content}\n\n"
+                            f"(你在群聊中的身份/角色是「{my_title}」，回复时请体现你的专业角色视角。"
+                            f"仅当消息与你直接相关、点名你、向你提问、或面向所有人时，"
+                            f"才使用 send_to_group 工具回复，group_id={group_id}。"
+                            f"其他情况请忽略，不要回应。)")
+            if group_id in _group_muted:
+                skipped.append(member_key)
+                return
+            try:
+                # 进程内直接投递（原先经 loopback HTTP 调用自身的 /system_trigger）
+                await dispatch_system_trigger(user_id, session_id, msg_text)
+            except Exception as e:
+                print(f"[GroupChat] 广播到 {member_key} 失败: {e}")
 
-        # 获取目标 agent 的 title，让它知道自己的身份
-        my_title = await _get_agent_title(user_id, session_id)
-        # 用 system_trigger 异步投递
-        trigger_url = f"http://127.0.0.1:{os.getenv('PORT_AGENT', '51200')}/system_trigger"
-
-        if mentions and member_key in mentions:
-            # 被 @ 的消息：强调这是专门发送的，必须回复
-            msg_text = (f"[群聊 {group_id}] {sender} @你 说:\n{content}\n\n"
-                        f"(⚠️ 这是专门 @你 的消息，你必须回复！"
-                        f"你在群聊中的身份/角色是「{my_title}」，回复时请体现你的专业角色视角。"
-                        f"请使用 send_to_group 工具回复，group_id={group_id}。)")
-        else:
-            # 普通广播消息
-            msg_text = (f"[群聊 {group_id}] {sender} 说:\n{content}\n\n"
-                        f"(你在群聊中的身份/角色是「{my_title}」，回复时请体现你的专业角色视角。"
-                        f"仅当消息与你直接相关、点名你、向你提问、或面向所有人时，"
-                        f"才使用 send_to_group 工具回复，group_id={group_id}。"
-                        f"其他情况请忽略，不要回应。)")
-        try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                await client.post(
-                    trigger_url,
-                    headers={"X-Internal-Token": INTERNAL_TOKEN},
-                    json={
-                        "user_id": user_id,
-                        "session_id": session_id,
-                        "text": msg_text,
-                    },
-                )
-        except Exception as e:
-            print(f"[GroupChat] 广播到 {user_id}#{session_id} 失败: {e}")
+    await asyncio.gather(*(_deliver(uid, sid) for uid, sid in targets))
+    if skipped:
+        print(f"[GroupChat] 群 {group_id} 广播中途被静音，跳过 {len(skipped)} 个成员")
 
 
 # --- API 端点 ---
@@ -1932,6 +2125,74 @@ async def get_group_messages(group_id: str, after_id: int = 0, authorization: st
     return {"messages": messages}
 
 
+@app.get("/groups/{group_id}/stream")
+async def stream_group_messages(group_id: str, after_id: int = 0, token: str | None = None,
+                                authorization: str | None = Header(None),
+                                last_event_id: str | None = Header(None)):
+    """群聊消息推送（SSE）：先补发 after_id（或 Last-Event-ID）之后的消息，再实时推送新消息。
+
+    每条消息一帧 `id: <消息id>` + `event: message`；空闲时发送 `: ping` 心跳；
+    群被删除时发送 `event: deleted` 后结束。
+    浏览器直连时用 ?token=（前端 /proxy_groups/{id}/stream_token 签发），否则走 Bearer 认证。
+    """
+    if token is not None:
+        if not verify_stream_token(INTERNAL_TOKEN, token, group_id):
+            raise HTTPException(status_code=401, detail="stream token 无效或已过期")
+    else:
+        _parse_group_auth(authorization)
+    if last_event_id and last_event_id.isdigit():
+        after_id = max(after_id, int(last_event_id))
+    async with aiosqlite.connect(_GROUP_DB_PATH) as db:
+        cursor = await db.execute("SELECT group_id FROM groups WHERE group_id = ?", (group_id,))
+        if not await cursor.fetchone():
+            raise HTTPException(status_code=404, detail="群聊不存在")
+
+    async def load_backlog(cursor_id: int) -> list[dict]:
+        async with aiosqlite.connect(_GROUP_DB_PATH) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT id, sender, sender_session, content, timestamp FROM group_messages WHERE group_id = ? AND id > ? ORDER BY id ASC LIMIT 200",
+                (group_id, cursor_id),
+            )
+            return [dict(r) for r in await cursor.fetchall()]
+
+    async def event_generator():
+        async for kind, msg in group_bus.subscribe(group_id, after_id, load_backlog):
+            if kind == "message":
+                yield f"id: {msg['id']}\nevent: message\ndata: {json.dumps(msg, ensure_ascii=False)}\n\n"
+            elif kind == "ping":
+                yield ": ping\n\n"
+            else:
+                yield "event: deleted\ndata: {}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/admission_stats")
+async def admission_stats(x_internal_token: str | None = Header(None)):
+    """返回运行槽位占用、各优先级排队数、等待时间与拒绝数（内部接口）。"""
+    verify_internal_token(x_internal_token)
+    return {"status": "success", "stats": admission.stats()}
+
+
+@app.get("/system_inbox_stats")
+async def system_inbox_stats(x_internal_token: str | None = Header(None)):
+    """返回系统触发消息队列的排队数、合并运行次数与丢弃数（内部接口）。"""
+    verify_internal_token(x_internal_token)
+    return {"status": "success", "stats": system_inbox.stats()}
+
+
+@app.get("/group_stream_stats")
+async def group_stream_stats(x_internal_token: str | None = Header(None)):
+    """返回群聊推送的订阅数与补读次数（内部接口）。"""
+    verify_internal_token(x_internal_token)
+    return {"status": "success", "stats": group_bus.stats()}
+
+
 @app.post("/groups/{group_id}/messages")
 async def post_group_message(group_id: str, req: GroupMessageRequest, authorization: str | None = Header(None),
                               x_internal_token: str | None = Header(None)):
@@ -1947,19 +2208,25 @@ async def post_group_message(group_id: str, req: GroupMessageRequest, authorizat
         sender = uid
         sender_session = sid
 
-    # 存入消息
-    now = time.time()
-    async with aiosqlite.connect(_GROUP_DB_PATH) as db:
-        # 校验群存在
-        cursor = await db.execute("SELECT group_id FROM groups WHERE group_id = ?", (group_id,))
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail="群聊不存在")
-        cursor2 = await db.execute(
-            "INSERT INTO group_messages (group_id, sender, sender_session, content, timestamp) VALUES (?, ?, ?, ?, ?)",
-            (group_id, sender, sender_session, req.content, now),
-        )
-        msg_id = cursor2.lastrowid
-        await db.commit()
+    # 存入消息；同一群的写入串行，publish 顺序与 id 顺序一致（订阅者按 id 游标去重）
+    async with group_bus.post_lock(group_id):
+        now = time.time()
+        async with aiosqlite.connect(_GROUP_DB_PATH) as db:
+            # 校验群存在
+            cursor = await db.execute("SELECT group_id FROM groups WHERE group_id = ?", (group_id,))
+            if not await cursor.fetchone():
+                raise HTTPException(status_code=404, detail="群聊不存在")
+            cursor2 = await db.execute(
+                "INSERT INTO group_messages (group_id, sender, sender_session, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (group_id, sender, sender_session, req.content, now),
+            )
+            msg_id = cursor2.lastrowid
+            await db.commit()
+
+        group_bus.publish(group_id, {
+            "id": msg_id, "sender": sender, "sender_session": sender_session,
+            "content": req.content, "timestamp": now,
+        })
 
     # 异步广播给群内 agent（如有 mentions 则只发给被 @ 的）
     # sender 可能是 "username#session_id" 格式，提取纯 user_id 用于排除
@@ -2022,6 +2289,7 @@ async def delete_group(group_id: str, authorization: str | None = Header(None)):
         await db.execute("DELETE FROM group_members WHERE group_id = ?", (group_id,))
         await db.execute("DELETE FROM groups WHERE group_id = ?", (group_id,))
         await db.commit()
+    group_bus.close(group_id)
     return {"status": "deleted"}
 
 
@@ -2050,47 +2318,15 @@ async def group_mute_status(group_id: str, authorization: str | None = Header(No
 
 @app.get("/groups/{group_id}/sessions")
 async def list_available_sessions(group_id: str, authorization: str | None = Header(None)):
-    """列出可以加入群聊的 agent sessions（直接查 checkpoint DB）"""
+    """列出可以加入群聊的 agent sessions（读 session_index）"""
     uid, pw, _ = _parse_group_auth(authorization)
-    # 复用 mainagent 自身的 list_sessions 逻辑
-    prefix = f"{uid}#"
     sessions = []
     try:
-        async with aiosqlite.connect(db_path) as db:
-            cursor = await db.execute(
-                "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id LIKE ? ORDER BY thread_id",
-                (f"{prefix}%",),
-            )
-            rows = await cursor.fetchall()
-
-        for (thread_id,) in rows:
-            sid = thread_id[len(prefix):]
-            # 获取摘要作为标题
-            config = {"configurable": {"thread_id": thread_id}}
-            snapshot = await agent.agent_app.aget_state(config)
-            msgs = snapshot.values.get("messages", []) if snapshot and snapshot.values else []
-
-            first_human = ""
-            for m in msgs:
-                if hasattr(m, "content") and type(m).__name__ == "HumanMessage":
-                    raw = m.content
-                    if isinstance(raw, str):
-                        content = raw
-                    elif isinstance(raw, list):
-                        content = " ".join(
-                            p.get("text", "") for p in raw if isinstance(p, dict) and p.get("type") == "text"
-                        ) or "(图片消息)"
-                    else:
-                        content = str(raw)
-                    if content.startswith("[系统触发]") or content.startswith("[外部学术会议邀请]"):
-                        continue
-                    if not first_human:
-                        first_human = content[:80]
-                        break
-
+        for r in await session_index.list_user_sessions(db_path, uid, include_empty=True):
+            sid = r["session_id"]
             sessions.append({
                 "session_id": sid,
-                "title": first_human or f"Session {sid}",
+                "title": r["title"] or f"Session {sid}",
             })
     except Exception as e:
         return {"sessions": [], "error": str(e)}
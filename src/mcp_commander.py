@@ -319,10 +319,11 @@ async def run_python_code(username: str, code: str) -> str:
 
 
 @mcp.tool()
-async def list_allowed_commands() -> str:
+async def list_allowed_commands(refresh: bool = False) -> str:
     """
     列出所有允许执行的系统命令白名单。
     用户想了解能执行哪些命令时调用此工具。
+    :param refresh: 结果会短时间缓存；白名单刚被修改时设为 true 重新读取
     """
     # 按类别分组（动态匹配当前生效的白名单，按平台区分）
     if IS_WINDOWS:
@@ -27,10 +27,11 @@ def _safe_path(username: str, filename: str) -> str:
 
 
 @mcp.tool()
-async def list_files(username: str) -> str:
+async def list_files(username: str, refresh: bool = False) -> str:
     """
     列出当前用户的所有文件。
     :param username: 用户名（由系统自动注入，无需手动传递）
+    :param refresh: 结果会短时间缓存；文件被其他途径改动后设为 true 重新读取
     """
     user_path = _user_dir(username)
     try:
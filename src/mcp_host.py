@@ -0,0 +1,364 @@
+"""
+MCP tool host: 内置 MCP 工具的三种承载方式 + 单工具并发限制 / 延迟直方图
+
+MCP_TOOL_MODE 选择内置工具（mcp_*.py）的运行方式：
+
+  stdio      每个 mcp_*.py 一个 stdio server（默认，兼容旧行为）。
+             注意：langchain-mcp-adapters 在未持有 session 时每次工具调用都会
+             新建 session，对 stdio 而言即每次调用启动一个子进程。
+  worker     单个常驻子进程（python mcp_host.py --serve）把所有 mcp_*.py 的工具
+             注册到一个 FastMCP 上，以 streamable-http 提供服务；请求按 HTTP 并发复用。
+  inprocess  在 Agent 进程内直接导入 mcp_*.py，工具协程在若干个独立事件循环线程上执行
+             （避免工具内部的同步阻塞代码卡住主服务的事件循环）。
+
+无论哪种模式，ToolGovernor 都会给每个工具包一层：
+  - 并发上限（MCP_TOOL_CONCURRENCY 默认值，MCP_TOOL_LIMITS 按工具覆盖，JSON）
+  - 排队等待时间与执行耗时直方图、错误数、当前并发数
+"""
+
+import asyncio
+import bisect
+import importlib
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any
+
+# mcp_*.py 模块与 stdio 模式下的 server 名称（单一来源）
+MCP_SERVER_MODULES: dict[str, str] = {
+    "scheduler_service": "mcp_scheduler",
+    "search_service": "mcp_search",
+    "file_service": "mcp_filemanager",
+    "commander_service": "mcp_commander",
+    "oasis_service": "mcp_oasis",
+    "session_service": "mcp_session",
+    "telegram_service": "mcp_telegram",
+    "llmapi_service": "mcp_llmapi",
+}
+
+TOOL_MODES = ("stdio", "worker", "inprocess")
+
+
+def tool_mode() -> str:
+    mode = os.getenv("MCP_TOOL_MODE", "stdio").strip().lower()
+    return mode if mode in TOOL_MODES else "stdio"
+
+
+def worker_port() -> int:
+    return int(os.getenv("MCP_WORKER_PORT", "51203"))
+
+
+def stdio_connections(src_dir: str) -> dict[str, dict]:
+    """stdio 模式：每个模块一个 server 的连接配置。"""
+    return {
+        name: {
+            "command": sys.executable,
+            "args": [os.path.join(src_dir, f"{module}.py")],
+            "transport": "stdio",
+        }
+        for name, module in MCP_SERVER_MODULES.items()
+    }
+
+
+def worker_connections(port: int) -> dict[str, dict]:
+    """worker 模式：所有工具由同一个 streamable-http server 提供。"""
+    return {
+        "teamclaw_tools": {
+            "transport": "streamable_http",
+            "url": f"http://127.0.0.1:{port}/mcp",
+        }
+    }
+
+
+# ------------------------------------------------------------------
+# Latency histogram & per-tool governor
+# ------------------------------------------------------------------
+
+# 直方图桶上界（毫秒），最后一个桶为 +Inf
+_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图（毫秒）。"""
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(_BUCKETS_MS, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> float | None:
+        """按桶上界估算分位数。"""
+        if not self.total:
+            return None
+        target = q * self.total
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                return float(_BUCKETS_MS[i]) if i < len(_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        labels = [f"le_{b}" for b in _BUCKETS_MS] + ["le_inf"]
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 2) if self.total else None,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "buckets": {label: c for label, c in zip(labels, self.counts) if c},
+        }
+
+
+class _ToolStats:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+
+
+class ToolGovernor:
+    """为每个工具加并发上限与延迟统计。"""
+
+    def __init__(self, default_limit: int | None = None, limits: dict[str, int] | None = None):
+        if default_limit is None:
+            default_limit = int(os.getenv("MCP_TOOL_CONCURRENCY", "16"))
+        if limits is None:
+            try:
+                limits = json.loads(os.getenv("MCP_TOOL_LIMITS", "") or "{}")
+            except ValueError:
+                print("[mcp_host] ⚠️ MCP_TOOL_LIMITS 不是合法 JSON，已忽略")
+                limits = {}
+        self._default_limit = max(1, default_limit)
+        self._limits = {k: max(1, int(v)) for k, v in limits.items()}
+        self._stats: dict[str, _ToolStats] = {}
+
+    def _get(self, name: str) -> _ToolStats:
+        st = self._stats.get(name)
+        if st is None:
+            st = self._stats[name] = _ToolStats(self._limits.get(name, self._default_limit))
+        return st
+
+    def wrap(self, tool):
+        """返回一个同名同 schema 的 StructuredTool，调用时受并发上限约束并记录耗时。"""
+        from langchain_core.tools import StructuredTool
+
+        inner = tool.coroutine
+        st = self._get(tool.name)
+
+        async def _governed(**kwargs):
+            queued = time.perf_counter()
+            st.waiting += 1
+            try:
+                await st.semaphore.acquire()
+            finally:
+                st.waiting -= 1
+            started = time.perf_counter()
+            st.queue_wait.observe((started - queued) * 1000)
+            st.in_flight += 1
+            try:
+                return await inner(**kwargs)
+            except Exception:
+                st.errors += 1
+                raise
+            finally:
+                st.in_flight -= 1
+                st.semaphore.release()
+                st.latency.observe((time.perf_counter() - started) * 1000)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=_governed,
+            response_format=tool.response_format,
+            metadata=tool.metadata,
+            handle_tool_error=tool.handle_tool_error,
+        )
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "limit": st.limit,
+                "in_flight": st.in_flight,
+                "waiting": st.waiting,
+                "errors": st.errors,
+                "latency": st.latency.snapshot(),
+                "queue_wait": st.queue_wait.snapshot(),
+            }
+            for name, st in sorted(self._stats.items())
+        }
+
+
+# ------------------------------------------------------------------
+# inprocess 模式
+# ------------------------------------------------------------------
+
+class _LoopThread:
+    """在独立线程上运行的事件循环。"""
+
+    def __init__(self, name: str):
+        self.loop = asyncio.new_event_loop()
+        self.in_flight = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def run(self, coro) -> Any:
+        self.in_flight += 1
+        try:
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+        finally:
+            self.in_flight -= 1
+
+    def stop(self):
+        # 先关闭该循环上的共享 HTTP 连接（工具里的 http_pool 客户端），再停止循环
+        from http_pool import aclose_http_pool
+        closing = asyncio.run_coroutine_threadsafe(aclose_http_pool(), self.loop)
+        closing.add_done_callback(lambda _: self.loop.call_soon_threadsafe(self.loop.stop))
+
+
+def _result_to_text(result) -> str:
+    """FastMCP.call_tool 的返回值（content blocks，新版本可能为 (content, structured)）转文本。"""
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, dict):
+        return json.dumps(result, ensure_ascii=False)
+    parts = []
+    for block in result or []:
+        text = getattr(block, "text", None)
+        parts.append(text if text is not None else str(block))
+    return "\n".join(parts)
+
+
+class InProcessToolHost:
+    """在当前进程内加载 mcp_*.py 的工具，转为 LangChain StructuredTool。"""
+
+    def __init__(self, src_dir: str, loops: int | None = None):
+        if loops is None:
+            loops = int(os.getenv("MCP_INPROCESS_LOOPS", "4"))
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+        self._workers = [_LoopThread(f"mcp-tools-{i}") for i in range(max(1, loops))]
+        self._rr = itertools.count()
+
+    def _pick(self) -> _LoopThread:
+        # 优先选择当前并发最少的线程，相同时轮询
+        start = next(self._rr) % len(self._workers)
+        ordered = self._workers[start:] + self._workers[:start]
+        return min(ordered, key=lambda w: w.in_flight)
+
+    async def load_tools(self) -> list:
+        from langchain_core.tools import StructuredTool, ToolException
+
+        tools = []
+        for module_name in MCP_SERVER_MODULES.values():
+            module = importlib.import_module(module_name)
+            server = module.mcp
+            for mcp_tool in await server.list_tools():
+
+                async def _call(_server=server, _name=mcp_tool.name, **kwargs):
+                    try:
+                        result = await self._pick().run(_server.call_tool(_name, kwargs))
+                    except Exception as e:
+                        raise ToolException(str(e)) from e
+                    return _result_to_text(result)
+
+                tools.append(StructuredTool(
+                    name=mcp_tool.name,
+                    description=mcp_tool.description or "",
+                    args_schema=mcp_tool.inputSchema,
+                    coroutine=_call,
+                    handle_tool_error=True,
+                ))
+        return tools
+
+    def close(self):
+        for w in self._workers:
+            w.stop()
+
+
+# ------------------------------------------------------------------
+# worker 模式
+# ------------------------------------------------------------------
+
+class WorkerProcess:
+    """管理常驻的 MCP 工具 worker 子进程。"""
+
+    def __init__(self, src_dir: str, port: int):
+        self._src_dir = src_dir
+        self.port = port
+        self._proc: asyncio.subprocess.Process | None = None
+
+    async def start(self, timeout: float = 60.0):
+        import httpx
+
+        self._proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(self._src_dir, "mcp_host.py"),
+            "--serve", "--port", str(self.port),
+        )
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if self._proc.returncode is not None:
+                    raise RuntimeError(f"MCP worker 启动失败 (exit {self._proc.returncode})")
+                try:
+                    await client.get(f"http://127.0.0.1:{self.port}/mcp", timeout=1.0)
+                    print(f"[mcp_host] ✅ MCP worker 已就绪 (port {self.port}, pid {self._proc.pid})")
+                    return
+                except httpx.TransportError:
+                    await asyncio.sleep(0.3)
+        raise RuntimeError(f"MCP worker 在 {timeout}s 内未就绪 (port {self.port})")
+
+    async def stop(self):
+        if self._proc and self._proc.returncode is None:
+            self._proc.terminate()
+            try:
+                await asyncio.wait_for(self._proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self._proc.kill()
+
+
+def serve(port: int):
+    """worker 进程入口：把所有 mcp_*.py 的工具注册到一个 FastMCP 上。"""
+    from mcp.server.fastmcp import FastMCP
+
+    hub = FastMCP("TeamClaw Tools", host="127.0.0.1", port=port)
+    count = 0
+    for module_name in MCP_SERVER_MODULES.values():
+        module = importlib.import_module(module_name)
+        for t in module.mcp._tool_manager.list_tools():
+            hub.add_tool(t.fn, name=t.name, description=t.description)
+            count += 1
+    print(f"[mcp_host] 🧰 worker 已加载 {count} 个工具，监听 127.0.0.1:{port}")
+    hub.run(transport="streamable-http")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="TeamClaw MCP tool worker")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--port", type=int, default=worker_port())
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.port)
+    else:
+        parser.print_help()
@@ -19,6 +19,7 @@ Runs as a stdio MCP server.
 import os
 import json
 import httpx
+from http_pool import pooled
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 
@@ -93,7 +94,7 @@ async def call_llm_api(
         payload["temperature"] = temperature
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with pooled(api_url, timeout=timeout) as client:
             response = await client.post(
                 api_url,
                 headers={
@@ -205,12 +206,14 @@ async def send_internal_message(
         }
 
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
+            async with pooled(_AGENT_URL, timeout=timeout) as client:
                 response = await client.post(
                     _AGENT_URL,
                     headers={
                         "Authorization": f"Bearer {api_key}",
                         "Content-Type": "application/json",
+                        # 本会话阻塞等待期间，目标运行借用本会话的运行槽位（避免占满每用户上限后互相等待）
+                        "X-Parent-Thread": f"{username}#{source_session}",
                     },
                     json=payload,
                 )
@@ -256,7 +259,7 @@ async def send_internal_message(
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with pooled(trigger_url, timeout=30) as client:
                 response = await client.post(
                     trigger_url,
                     headers={
@@ -310,7 +313,7 @@ async def send_to_group(
 
     url = f"http://127.0.0.1:{_AGENT_PORT}/groups/{group_id}/messages"
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
+        async with pooled(url, timeout=15) as client:
             response = await client.post(
                 url,
                 headers={
@@ -18,6 +18,7 @@ import os
 import re
 
 import httpx
+from http_pool import pooled
 import aiosqlite
 import yaml as _yaml
 from mcp.server.fastmcp import FastMCP
@@ -43,7 +44,7 @@ _serde = JsonPlusSerializer()
 # ======================================================================
 
 @mcp.tool()
-async def list_oasis_experts(username: str = "") -> str:
+async def list_oasis_experts(username: str = "", refresh: bool = False) -> str:
     """
     List all available expert personas on the OASIS forum.
     Shows both public (built-in) experts and the current user's custom experts.
@@ -51,13 +52,14 @@ async def list_oasis_experts(username: str = "") -> str:
 
     Args:
         username: (auto-injected) current user identity; do NOT set manually
+        refresh: Results are cached briefly; set true to bypass the cache and re-fetch.
 
     Returns:
         Formatted list of experts with their tags, personas, and source (public/custom)
     """
     effective_user = username or _FALLBACK_USER
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with pooled(OASIS_BASE_URL, timeout=30) as client:
             resp = await client.get(
                 f"{OASIS_BASE_URL}/experts",
                 params={"user_id": effective_user},
@@ -149,7 +151,7 @@ async def add_oasis_expert(
         Confirmation with the created expert info
     """
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with pooled(OASIS_BASE_URL, timeout=30) as client:
             resp = await client.post(
                 f"{OASIS_BASE_URL}/experts/user",
                 json={
@@ -208,7 +210,7 @@ async def update_oasis_expert(
         if temperature >= 0:
             body["temperature"] = temperature
 
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with pooled(OASIS_BASE_URL, timeout=30) as client:
             resp = await client.put(
                 f"{OASIS_BASE_URL}/experts/user/{tag}",
                 json=body,
@@ -244,7 +246,7 @@ async def delete_oasis_expert(username: str, tag: str) -> str:
         Confirmation of deletion
     """
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with pooled(OASIS_BASE_URL, timeout=30) as client:
             resp = await client.delete(
                 f"{OASIS_BASE_URL}/experts/user/{tag}",
                 params={"user_id": username},
@@ -284,7 +286,7 @@ async def list_oasis_sessions(username: str = "") -> str:
     effective_user = username or _FALLBACK_USER
     # Prefer calling OASIS HTTP API so both MCP and curl can access sessions
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with pooled(OASIS_BASE_URL, timeout=30) as client:
             resp = await client.get(f"{OASIS_BASE_URL}/sessions/oasis", params={"user_id": effective_user})
             if resp.status_code != 200:
                 return f"❌ 查询失败: {resp.text}"
@@ -411,6 +413,10 @@ async def post_to_oasis(
                     content: "请聚焦可行性"
 
             instruction 字段（可选）：给专家的专项指令，专家会在发言时重点关注该指令。
+            executor 字段（可选，顶层）：默认 superstep（逐步同步执行）；dataflow 时每个节点在其上游
+            完成后立即开始，互不等待的分支不会被慢节点拖住，max_concurrency 限制同时运行的节点数。
+            context 字段（可选，顶层）：长讨论的上下文压缩，如 {max_tokens: 3000, top_k: 8}，
+            专家只看到高分帖、各作者最新帖、与自己相关的回复和最近几条，其余按轮摘要。
         username: (auto-injected) current user identity; do NOT set manually
         max_rounds: Maximum number of discussion rounds (1-20, default 5)
         schedule_file: Filename or path to a saved YAML workflow file. Short names (e.g. "review.yaml")
@@ -433,7 +439,7 @@ async def post_to_oasis(
         return "❌ 必须提供 schedule_yaml 或 schedule_file（至少一个）。如果已有保存的工作流文件，用 schedule_file 指定文件名即可。"
 
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(timeout=300.0)) as client:
+        async with pooled(OASIS_BASE_URL, timeout=httpx.Timeout(timeout=300.0)) as client:
             body: dict = {
                 "question": question,
                 "user_id": effective_user,
@@ -513,7 +519,7 @@ async def check_oasis_discussion(topic_id: str, username: str = "") -> str:
     """
     effective_user = username or _FALLBACK_USER
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with pooled(OASIS_BASE_URL, timeout=30) as client:
             resp = await client.get(
                 f"{OASIS_BASE_URL}/topics/{topic_id}",
                 params={"user_id": effective_user},
@@ -574,7 +580,7 @@ async def cancel_oasis_discussion(topic_id: str, username: str = "") -> str:
     """
     effective_user = username or _FALLBACK_USER
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
+        async with pooled(OASIS_BASE_URL, timeout=10) as client:
             resp = await client.delete(
                 f"{OASIS_BASE_URL}/topics/{topic_id}",
                 params={"user_id": effective_user},
@@ -608,7 +614,7 @@ async def list_oasis_topics(username: str = "") -> str:
         Formatted list of all discussion topics
     """
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with pooled(OASIS_BASE_URL, timeout=30) as client:
             effective_user = username or _FALLBACK_USER
             resp = await client.get(
                 f"{OASIS_BASE_URL}/topics",
@@ -678,7 +684,7 @@ async def set_oasis_workflow(
     effective_user = username or _FALLBACK_USER
     # Proxy to OASIS HTTP API
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with pooled(OASIS_BASE_URL, timeout=30) as client:
             payload = {
                 "user_id": effective_user,
                 "name": name,
@@ -707,20 +713,21 @@ async def set_oasis_workflow(
 
 
 @mcp.tool()
-async def list_oasis_workflows(username: str = "", team: str = "") -> str:
+async def list_oasis_workflows(username: str = "", team: str = "", refresh: bool = False) -> str:
     """
     List all saved YAML workflows for the current user.
 
     Args:
         username: (auto-injected) current user identity; do NOT set manually
         team: Team name. When provided, lists workflows from the team directory.
+        refresh: Results are cached briefly; set true to bypass the cache and re-fetch.
 
     Returns:
         List of saved workflow files with preview
     """
     effective_user = username or _FALLBACK_USER
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with pooled(OASIS_BASE_URL, timeout=30) as client:
             params = {"user_id": effective_user}
             if team:
                 params["team"] = team
@@ -764,7 +771,7 @@ async def get_publicnet_info() -> str:
         Human-readable public network info including tunnel status and public URL.
     """
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
+        async with pooled(OASIS_BASE_URL, timeout=10) as client:
             resp = await client.get(f"{OASIS_BASE_URL}/publicnet/info")
             if resp.status_code != 200:
                 return f"❌ 查询失败: {resp.text}"
@@ -1558,7 +1565,7 @@ async def yaml_to_layout(
 
     # Use OASIS HTTP API for layout generation
     try:
-        async with httpx.AsyncClient(timeout=60) as client:
+        async with pooled(OASIS_BASE_URL, timeout=60) as client:
             payload = {
                 "user_id": effective_user,
                 "yaml_source": yaml_source,
@@ -1,5 +1,5 @@
 from mcp.server.fastmcp import FastMCP
-import httpx
+from http_pool import pooled
 import os
 from dotenv import load_dotenv
 
@@ -23,7 +23,7 @@ async def add_alarm(username: str, cron: str, text: str, session_id: str = "defa
     :param text: 到点时需要执行的指令内容
     :param session_id: 会话ID（系统自动注入，无需手动传递）
     """
-    async with httpx.AsyncClient() as client:
+    async with pooled(SCHEDULER_URL) as client:
         try:
             payload = {"user_id": username, "cron": cron, "text": text, "session_id": session_id}
             resp = await client.post(SCHEDULER_URL, json=payload, timeout=10.0)
@@ -40,7 +40,7 @@ async def list_alarms(username: str) -> str:
     获取当前用户已设置的定时任务列表。
     :param username: 用户唯一标识符（系统自动注入，无需手动传递）
     """
-    async with httpx.AsyncClient() as client:
+    async with pooled(SCHEDULER_URL) as client:
         try:
             resp = await client.get(SCHEDULER_URL)
             tasks = resp.json()
@@ -63,7 +63,7 @@ async def delete_alarm(username: str, task_id: str) -> str:
     :param username: 用户唯一标识符（系统自动注入，无需手动传递）
     :param task_id: 之前创建任务时分配的 8 位 ID
     """
-    async with httpx.AsyncClient() as client:
+    async with pooled(SCHEDULER_URL) as client:
         try:
             # 先查询任务列表，确认任务属于该用户
             resp = await client.get(SCHEDULER_URL)
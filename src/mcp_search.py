@@ -5,11 +5,12 @@ mcp = FastMCP("WebSearcher")
 
 
 @mcp.tool()
-async def web_search(query: str, max_results: int = 5) -> str:
+async def web_search(query: str, max_results: int = 5, refresh: bool = False) -> str:
     """
     使用 DuckDuckGo 进行联网搜索，返回相关网页结果。
     :param query: 搜索关键词
     :param max_results: 返回结果数量，默认 5 条，最多 10 条
+    :param refresh: 相同搜索短时间内会复用缓存结果；需要最新结果时设为 true
     """
     max_results = min(max_results, 10)
     try:
@@ -31,11 +32,12 @@ async def web_search(query: str, max_results: int = 5) -> str:
 
 
 @mcp.tool()
-async def web_news(query: str, max_results: int = 5) -> str:
+async def web_news(query: str, max_results: int = 5, refresh: bool = False) -> str:
     """
     使用 DuckDuckGo 搜索最新新闻资讯。
     :param query: 新闻搜索关键词
     :param max_results: 返回结果数量，默认 5 条，最多 10 条
+    :param refresh: 相同搜索短时间内会复用缓存结果；需要最新结果时设为 true
     """
     max_results = min(max_results, 10)
     try:
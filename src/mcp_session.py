@@ -10,10 +10,9 @@ Runs as a stdio MCP server, just like the other mcp_*.py tools.
 """
 
 import os
-import json
-import aiosqlite
 from mcp.server.fastmcp import FastMCP
-from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+import session_index
 
 mcp = FastMCP("Session Management")
 
@@ -23,9 +22,6 @@ _DB_PATH = os.path.join(
     "data", "agent_memory.db",
 )
 
-# LangGraph checkpoint serde (msgpack-based, not plain JSON)
-_serde = JsonPlusSerializer()
-
 
 @mcp.tool()
 async def get_current_session(
@@ -79,86 +75,10 @@ async def list_sessions(
     if not os.path.exists(_DB_PATH):
         return "❌ 对话记录数据库不存在"
 
-    prefix = f"{username}#"
-    sessions = []
-
+    # 读 session_index（由 mainagent 在每次运行后增量维护），不再反序列化 checkpoint
     try:
-        async with aiosqlite.connect(_DB_PATH) as db:
-            cursor = await db.execute(
-                "SELECT DISTINCT thread_id FROM checkpoints "
-                "WHERE thread_id LIKE ? ORDER BY thread_id",
-                (f"{prefix}%",),
-            )
-            rows = await cursor.fetchall()
-
-            for (thread_id,) in rows:
-                sid = thread_id[len(prefix):]
-
-                # Get latest checkpoint data to extract summary
-                ckpt_cursor = await db.execute(
-                    "SELECT type, checkpoint FROM checkpoints "
-                    "WHERE thread_id = ? ORDER BY ROWID DESC LIMIT 1",
-                    (thread_id,),
-                )
-                ckpt_row = await ckpt_cursor.fetchone()
-                if not ckpt_row:
-                    continue
-
-                # Parse checkpoint using LangGraph serde (msgpack format)
-                try:
-                    ckpt_data = _serde.loads_typed((ckpt_row[0], ckpt_row[1]))
-                except Exception:
-                    continue
-
-                # Extract channel_values -> messages from checkpoint
-                channel_values = ckpt_data.get("channel_values", {})
-                messages = channel_values.get("messages", [])
-
-                first_human = ""
-                last_human = ""
-                msg_count = 0
-
-                for m in messages:
-                    # After proper deserialization, messages are LangChain objects
-                    # Check type by class name (HumanMessage, AIMessage, etc.)
-                    type_name = type(m).__name__
-
-                    if type_name != "HumanMessage":
-                        continue
-
-                    content = getattr(m, "content", "")
-                    if not content:
-                        continue
-
-                    # Handle multimodal content (list of parts)
-                    if isinstance(content, list):
-                        text_parts = []
-                        for p in content:
-                            if isinstance(p, dict) and p.get("type") == "text":
-                                text_parts.append(p.get("text", ""))
-                        content = " ".join(text_parts) or "(多媒体消息)"
-                    elif not isinstance(content, str):
-                        content = str(content)
-
-                    # Skip system trigger messages
-                    if content.startswith("[系统触发]"):
-                        continue
-
-                    msg_count += 1
-                    if not first_human:
-                        first_human = content[:80]
-                    last_human = content[:80]
-
-                if not first_human:
-                    continue  # Skip empty or system-only sessions
-
-                sessions.append({
-                    "session_id": sid,
-                    "title": first_human,
-                    "last_message": last_human,
-                    "message_count": msg_count,
-                })
-
+        await session_index.ensure_index(_DB_PATH)
+        sessions = await session_index.list_user_sessions(_DB_PATH, username)
     except Exception as e:
         return f"❌ 查询会话列表失败: {str(e)}"
 
@@ -172,6 +92,7 @@ async def list_sessions(
             f"     标题: {s['title']}\n"
             f"     最新消息: {s['last_message']}\n"
             f"     消息数: {s['message_count']}\n"
+            + (f"     状态: 运行中（{s['busy_source']}）\n" if s["busy"] else "")
         )
     return "\n".join(lines)
 
@@ -11,6 +11,7 @@ MCP Telegram Push Notification Service
 import os
 import json
 import httpx
+from http_pool import pooled
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 
@@ -170,7 +171,7 @@ async def send_telegram_message(
     if parse_mode:
         payload["parse_mode"] = parse_mode
 
-    async with httpx.AsyncClient() as client:
+    async with pooled(TELEGRAM_API) as client:
         try:
             resp = await client.post(
                 f"{TELEGRAM_API}/sendMessage",
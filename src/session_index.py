@@ -0,0 +1,255 @@
+"""
+Session index: 会话列表的轻量索引表（agent_memory.db → session_index）
+
+/sessions、群聊可选会话列表、mcp_session.list_sessions 原先都要
+SELECT DISTINCT thread_id 再逐个反序列化最新 checkpoint，才能拿到标题/消息数。
+这里维护一张小表，每次 graph 运行结束后增量更新，删除会话时同步删除：
+
+  session_index(thread_id, user_id, session_id, title, last_human,
+                message_count, updated_at, busy, busy_source)
+
+首次启动时做一次性回填（backfill），之后只读索引。
+mainagent 与 mcp_session（独立进程）共用本模块。
+"""
+
+import os
+import time
+
+import aiosqlite
+
+# 不计入标题/消息数的系统消息前缀
+_SKIP_PREFIXES = ("[系统触发]", "[外部学术会议邀请]")
+
+# 索引中保存的文本最大长度（各调用方再按需截断）
+_TEXT_LIMIT = 80
+
+_BACKFILL_KEY = "backfill_v1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_index (
+    thread_id     TEXT PRIMARY KEY,
+    user_id       TEXT NOT NULL,
+    session_id    TEXT NOT NULL,
+    title         TEXT NOT NULL DEFAULT '',
+    last_human    TEXT NOT NULL DEFAULT '',
+    message_count INTEGER NOT NULL DEFAULT 0,
+    updated_at    REAL NOT NULL DEFAULT 0,
+    busy          INTEGER NOT NULL DEFAULT 0,
+    busy_source   TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_session_index_user ON session_index(user_id);
+CREATE TABLE IF NOT EXISTS session_index_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _split_thread_id(thread_id: str) -> tuple[str, str]:
+    user_id, _, session_id = thread_id.partition("#")
+    return user_id, session_id
+
+
+def human_text(msg) -> str | None:
+    """返回用户消息用于索引的文本；非用户消息或系统触发消息返回 None。"""
+    if type(msg).__name__ != "HumanMessage":
+        return None
+    raw = getattr(msg, "content", "")
+    if isinstance(raw, str):
+        content = raw
+    elif isinstance(raw, list):
+        # 多模态 content 可能是 list，提取其中的文本部分
+        content = " ".join(
+            p.get("text", "") for p in raw if isinstance(p, dict) and p.get("type") == "text"
+        ) or "(图片消息)"
+    else:
+        content = str(raw)
+    if not content or content.startswith(_SKIP_PREFIXES):
+        return None
+    return content[:_TEXT_LIMIT]
+
+
+def summarize_messages(messages) -> tuple[str, str, int]:
+    """从消息列表计算 (title, last_human, message_count)。"""
+    title = ""
+    last_human = ""
+    count = 0
+    for m in messages:
+        text = human_text(m)
+        if text is None:
+            continue
+        count += 1
+        if not title:
+            title = text
+        last_human = text
+    return title, last_human, count
+
+
+# ------------------------------------------------------------------
+# Schema & backfill
+# ------------------------------------------------------------------
+
+async def _checkpoints_exist(db: aiosqlite.Connection) -> bool:
+    cursor = await db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'checkpoints'"
+    )
+    return await cursor.fetchone() is not None
+
+
+async def _load_latest_messages(db: aiosqlite.Connection, thread_id: str) -> list:
+    """解码某个 thread 最新 checkpoint 中的 messages（仅回填时使用）。"""
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    cursor = await db.execute(
+        "SELECT type, checkpoint FROM checkpoints "
+        "WHERE thread_id = ? AND checkpoint_ns = '' ORDER BY ROWID DESC LIMIT 1",
+        (thread_id,),
+    )
+    row = await cursor.fetchone()
+    if not row:
+        return []
+    ckpt = JsonPlusSerializer().loads_typed((row[0], row[1]))
+    return ckpt.get("channel_values", {}).get("messages", [])
+
+
+async def ensure_index(db_path: str, reset_busy: bool = False) -> None:
+    """建表，并在首次运行时从现有 checkpoints 回填索引（幂等）。
+
+    reset_busy=True 仅由 mainagent 启动时传入：进程重启后 busy 标志全部失效。
+    """
+    async with aiosqlite.connect(db_path) as db:
+        await db.executescript(_SCHEMA)
+        if reset_busy:
+            await db.execute("UPDATE session_index SET busy = 0, busy_source = '' WHERE busy != 0")
+        await db.commit()
+
+        cursor = await db.execute(
+            "SELECT value FROM session_index_meta WHERE key = ?", (_BACKFILL_KEY,)
+        )
+        if await cursor.fetchone() is not None:
+            return
+        if not await _checkpoints_exist(db):
+            return
+
+        cursor = await db.execute(
+            "SELECT DISTINCT thread_id FROM checkpoints "
+            "WHERE thread_id NOT IN (SELECT thread_id FROM session_index)"
+        )
+        thread_ids = [r[0] for r in await cursor.fetchall()]
+        now = time.time()
+        filled = 0
+        for thread_id in thread_ids:
+            try:
+                messages = await _load_latest_messages(db, thread_id)
+            except Exception as e:
+                print(f"[session_index] ⚠️ 回填 {thread_id} 失败: {e}")
+                continue
+            title, last_human, count = summarize_messages(messages)
+            user_id, session_id = _split_thread_id(thread_id)
+            await db.execute(
+                "INSERT OR REPLACE INTO session_index "
+                "(thread_id, user_id, session_id, title, last_human, message_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, user_id, session_id, title, last_human, count, now),
+            )
+            filled += 1
+        await db.execute(
+            "INSERT OR REPLACE INTO session_index_meta (key, value) VALUES (?, ?)",
+            (_BACKFILL_KEY, str(now)),
+        )
+        await db.commit()
+        if filled:
+            print(f"[session_index] ✅ 已回填 {filled} 个会话")
+
+
+# ------------------------------------------------------------------
+# Incremental updates
+# ------------------------------------------------------------------
+
+async def mark_busy(db_path: str, thread_id: str, source: str) -> None:
+    """graph 开始运行时标记 busy（失败不影响主流程）。"""
+    user_id, session_id = _split_thread_id(thread_id)
+    try:
+        async with aiosqlite.connect(db_path) as db:
+            await db.execute(
+                "INSERT INTO session_index (thread_id, user_id, session_id, updated_at, busy, busy_source) "
+                "VALUES (?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET busy = 1, busy_source = excluded.busy_source",
+                (thread_id, user_id, session_id, time.time(), source),
+            )
+            await db.commit()
+    except Exception as e:
+        print(f"[session_index] ⚠️ mark_busy {thread_id} 失败: {e}")
+
+
+async def record_run(db_path: str, thread_id: str, input_messages) -> None:
+    """graph 运行结束后，用本轮输入消息增量更新索引并清除 busy。
+
+    本轮新增的用户消息只可能来自输入（agent 不会生成 HumanMessage），
+    因此无需重新读取整段历史。
+    """
+    title, last_human, count = summarize_messages(input_messages or [])
+    user_id, session_id = _split_thread_id(thread_id)
+    try:
+        async with aiosqlite.connect(db_path) as db:
+            await db.execute(
+                "INSERT INTO session_index "
+                "(thread_id, user_id, session_id, title, last_human, message_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET "
+                "  title = CASE WHEN session_index.title = '' THEN excluded.title ELSE session_index.title END, "
+                "  last_human = CASE WHEN excluded.message_count > 0 "
+                "                    THEN excluded.last_human ELSE session_index.last_human END, "
+                "  message_count = session_index.message_count + excluded.message_count, "
+                "  updated_at = excluded.updated_at, "
+                "  busy = 0, busy_source = ''",
+                (thread_id, user_id, session_id, title, last_human, count, time.time()),
+            )
+            await db.commit()
+    except Exception as e:
+        print(f"[session_index] ⚠️ record_run {thread_id} 失败: {e}")
+
+
+async def delete_thread(db: aiosqlite.Connection, thread_id: str) -> None:
+    """删除单个会话的索引行（调用方负责 commit）。"""
+    await db.execute("DELETE FROM session_index WHERE thread_id = ?", (thread_id,))
+
+
+async def delete_user(db: aiosqlite.Connection, user_id: str) -> None:
+    """删除某用户全部会话的索引行（调用方负责 commit）。"""
+    await db.execute("DELETE FROM session_index WHERE user_id = ?", (user_id,))
+
+
+# ------------------------------------------------------------------
+# Queries
+# ------------------------------------------------------------------
+
+async def list_user_sessions(db_path: str, user_id: str, include_empty: bool = False) -> list[dict]:
+    """读取某用户的会话索引，按 session_id 排序。
+
+    include_empty=False 时跳过没有用户消息的会话（空会话或纯系统会话）。
+    """
+    if not os.path.exists(db_path):
+        return []
+    sql = (
+        "SELECT session_id, title, last_human, message_count, updated_at, busy, busy_source "
+        "FROM session_index WHERE user_id = ?"
+    )
+    if not include_empty:
+        sql += " AND title != ''"
+    sql += " ORDER BY thread_id"
+    async with aiosqlite.connect(db_path) as db:
+        cursor = await db.execute(sql, (user_id,))
+        rows = await cursor.fetchall()
+    return [
+        {
+            "session_id": r[0],
+            "title": r[1],
+            "last_message": r[2],
+            "message_count": r[3],
+            "updated_at": r[4],
+            "busy": bool(r[5]),
+            "busy_source": r[6],
+        }
+        for r in rows
+    ]
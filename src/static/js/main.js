@@ -110,6 +110,7 @@ const i18n = {
         oasis_back: '← 返回',
         oasis_conclusion: '讨论结论',
         oasis_waiting: '等待专家发言...',
+        oasis_drafting: '生成中...',
         oasis_status_pending: '等待中',
         oasis_status_discussing: '讨论中',
         oasis_status_concluded: '已完成',
@@ -603,6 +604,7 @@ orch_openclaw_sessions: '🦞 OpenClaw',
         oasis_back: '← Back',
         oasis_conclusion: 'Conclusion',
         oasis_waiting: 'Waiting for experts...',
+        oasis_drafting: 'Writing...',
         oasis_status_pending: 'Pending',
         oasis_status_discussing: 'Discussing',
         oasis_status_concluded: 'Completed',
@@ -3045,6 +3047,11 @@ async function handleSend() {
                         } else if (m.type === 'ai_start') {
                             // 新一轮 LLM 开始 → 创建新文本气泡
                             startNewBubble();
+                        } else if (m.type === 'queued') {
+                            // 服务繁忙，等待运行槽位
+                            if (!fullText) {
+                                agentDiv.innerHTML = `<span class="text-gray-400">⏳ 排队中，前面还有 ${Math.max(m.position - 1, 0)} 个请求…</span>`;
+                            }
                         }
                         continue;
                     }
@@ -3640,7 +3647,7 @@ function renderTopicDetail(detail) {
     btns += `<button onclick="deleteOasisTopic('${detail.topic_id}')" class="oasis-detail-action-btn delete">🗑 ${t('oasis_delete')}</button>`;
     actionsEl.innerHTML = btns;
 
-    renderPosts(detail.posts || [], detail.timeline || [], detail.discussion !== false);
+    renderPosts(detail.posts || [], detail.timeline || [], detail.discussion !== false, detail.drafts || []);
 
     // Show/hide conclusion
     const conclusionArea = document.getElementById('oasis-conclusion-area');
@@ -3674,10 +3681,11 @@ function fmtElapsed(sec) {
     return 'T+' + m + 'm' + (s % 60) + 's';
 }
 
-function renderPosts(posts, timeline, isDiscussion) {
+function renderPosts(posts, timeline, isDiscussion, drafts) {
     const box = document.getElementById('oasis-posts-box');
+    drafts = drafts || [];
 
-    if (posts.length === 0 && (!timeline || timeline.length === 0)) {
+    if (posts.length === 0 && (!timeline || timeline.length === 0) && drafts.length === 0) {
         box.innerHTML = `
             <div class="text-center text-gray-400 text-sm py-8">
                 <div class="text-2xl mb-2">💭</div>
@@ -3703,7 +3711,7 @@ function renderPosts(posts, timeline, isDiscussion) {
     box.innerHTML = items.map(item => {
         if (item.type === 'event') {
             const ev = item.data;
-            const evIcons = {start:'🚀', round:'📢', agent_call:'⏳', agent_done:'✅', conclude:'🏁', manual_post:'📝', if_branch:'🔀'};
+            const evIcons = {start:'🚀', round:'📢', agent_call:'⏳', agent_done:'✅', conclude:'🏁', manual_post:'📝', if_branch:'🔀', queue_wait:'🚦'};
             const icon = evIcons[ev.event] || '⏱';
             const label = ev.agent ? ev.agent + (ev.detail ? ' · ' + ev.detail : '') : (ev.detail || ev.event);
             return `
@@ -3753,6 +3761,22 @@ function renderPosts(posts, timeline, isDiscussion) {
                     </div>
                 </div>
             </div>`;
+    }).join('') + drafts.map(d => {
+        // 流式生成中的草稿（stream_drafts），发布后由正式帖子替换
+        const avatar = getExpertAvatar(d.author);
+        return `
+            <div class="oasis-post bg-gray-50 rounded-xl p-3 border border-dashed shadow-sm opacity-80">
+                <div class="flex items-start space-x-2">
+                    <div class="oasis-expert-avatar ${avatar.cls}" title="${escapeHtml(d.author)}">${avatar.icon}</div>
+                    <div class="flex-1 min-w-0">
+                        <div class="flex items-center justify-between">
+                            <span class="text-xs font-semibold text-gray-700">${escapeHtml(d.author)}</span>
+                            <span class="text-[10px] text-gray-400">✍️ ${t('oasis_drafting')}</span>
+                        </div>
+                        <div class="text-xs text-gray-500 mt-1 leading-relaxed whitespace-pre-wrap">${escapeHtml(d.content || '')}</div>
+                    </div>
+                </div>
+            </div>`;
     }).join('');
 
     // Auto-scroll to bottom
@@ -3768,6 +3792,7 @@ function startDetailPolling(topicId) {
     stopOasisPolling();
     let lastPostCount = 0;
     let lastTimelineCount = 0;
+    let lastDraftSig = '';
     let errorCount = 0;
     oasisPollingTimer = setInterval(async () => {
         if (oasisCurrentTopicId !== topicId) {
@@ -3791,10 +3816,13 @@ function startDetailPolling(topicId) {
             // Re-render if posts or timeline changed
             const currentPostCount = (detail.posts || []).length;
             const currentTimelineCount = (detail.timeline || []).length;
-            if (currentPostCount !== lastPostCount || currentTimelineCount !== lastTimelineCount || detail.status !== 'discussing') {
+            const draftSig = (detail.drafts || []).map(d => d.author + ':' + (d.content || '').length).join('|');
+            if (currentPostCount !== lastPostCount || currentTimelineCount !== lastTimelineCount
+                    || draftSig !== lastDraftSig || detail.status !== 'discussing') {
                 renderTopicDetail(detail);
                 lastPostCount = currentPostCount;
                 lastTimelineCount = currentTimelineCount;
+                lastDraftSig = draftSig;
             }
 
             // Stop polling when discussion ends
@@ -3977,7 +4005,9 @@ function applyAgentColor(el, sender) {
 let currentPage = 'group'; // 'chat' or 'group' or 'orchestrate'
 let currentGroupId = null;
 let groupPollingTimer = null;
+let groupEventSource = null;     // 群聊消息推送（SSE），不支持时退回轮询
 let groupLastMsgId = 0;
+const groupShownMsgIds = new Set();  // 已显示的消息 id（推送与本地回显去重）
 let groupMuted = false;
 const groupSenderTitles = {};  // sender -> display title mapping
 
@@ -4112,6 +4142,7 @@ function switchPage(page) {
 
 function stopGroupPolling() {
     if (groupPollingTimer) { clearInterval(groupPollingTimer); groupPollingTimer = null; }
+    if (groupEventSource) { groupEventSource.close(); groupEventSource = null; }
 }
 
 let _groupListPollingTimer = null;
@@ -4163,6 +4194,7 @@ function renderGroupList(teams) {
 async function openGroup(teamName) {
     currentGroupId = teamName;
     groupLastMsgId = 0;
+    groupShownMsgIds.clear();
     stopGroupPolling();
 
     let overlay = document.getElementById('team-members-overlay');
@@ -4296,6 +4328,8 @@ function appendGroupMessages(messages) {
     if (placeholder && messages.length > 0) placeholder.remove();
 
     for (const m of messages) {
+        if (m.id && groupShownMsgIds.has(m.id)) continue;
+        if (m.id) groupShownMsgIds.add(m.id);
         const isSelf = m.sender === currentUserId || m.sender === currentUserId;
         const isAgent = !isSelf && m.sender_session;
         const msgClass = isSelf ? 'self' : (isAgent ? 'agent' : 'other');
@@ -4315,8 +4349,43 @@ function appendGroupMessages(messages) {
     box.scrollTop = box.scrollHeight;
 }
 
-function startGroupPolling(groupId) {
+async function startGroupPolling(groupId) {
     stopGroupPolling();
+    if (window.EventSource) {
+        // 推送：服务端按 after_id / Last-Event-ID 补发缺失消息，断线后浏览器自动重连。
+        // 优先直连 mainagent（短期 token），不可直连时走前端中继
+        let streamUrl = `/proxy_groups/${groupId}/stream?after_id=${groupLastMsgId}`;
+        let direct = false;
+        try {
+            const resp = await fetch(`/proxy_groups/${groupId}/stream_token`);
+            const data = resp.ok ? await resp.json() : {};
+            if (data.url) {
+                streamUrl = `${data.url}?token=${encodeURIComponent(data.token)}&after_id=${groupLastMsgId}`;
+                direct = true;
+            }
+        } catch (e) {
+            // silent：使用中继
+        }
+        if (currentGroupId !== groupId || currentPage !== 'group' || groupPollingTimer || groupEventSource) return;
+        const es = new EventSource(streamUrl);
+        groupEventSource = es;
+        let opened = false;
+        es.addEventListener('open', () => { opened = true; });
+        es.addEventListener('error', () => {
+            // 直连被拒（token 过期 / 地址不可达）时浏览器不会再重连：
+            // 连过的重新取 token，从未连上的退回中继
+            if (!direct || es.readyState !== EventSource.CLOSED || groupEventSource !== es) return;
+            groupEventSource = null;
+            if (opened) {
+                startGroupPolling(groupId);
+            } else {
+                groupEventSource = new EventSource(`/proxy_groups/${groupId}/stream?after_id=${groupLastMsgId}`);
+                _bindGroupStream(groupEventSource, groupId);
+            }
+        });
+        _bindGroupStream(es, groupId);
+        return;
+    }
     groupPollingTimer = setInterval(async () => {
         if (currentGroupId !== groupId || currentPage !== 'group') {
             stopGroupPolling();
@@ -4337,6 +4406,27 @@ function startGroupPolling(groupId) {
     }, 5000);
 }
 
+function _bindGroupStream(es, groupId) {
+    es.addEventListener('message', (e) => {
+        if (currentGroupId !== groupId || currentPage !== 'group') {
+            stopGroupPolling();
+            return;
+        }
+        try {
+            const msg = JSON.parse(e.data);
+            if (groupShownMsgIds.has(msg.id)) return;
+            appendGroupMessages([msg]);
+            // 有新消息时也刷新群列表（更新消息计数）
+            loadGroupList();
+        } catch (err) {
+            // silent
+        }
+    });
+    es.addEventListener('deleted', () => {
+        if (groupEventSource === es) stopGroupPolling();
+    });
+}
+
 async function sendGroupMessage() {
     const input = document.getElementById('group-input');
     const text = input.value.trim();
@@ -0,0 +1,125 @@
+"""
+System inbox: 系统触发消息的按会话队列（替代 cancel-and-replace）
+
+/system_trigger 以前每来一条消息就取消该会话正在运行的任务再重新开始，群聊消息、
+OASIS 回调、定时提醒扎堆时会反复打断已经跑了一半的 graph。现在：
+
+  - 每个会话（thread_id）一个队列 + 至多一个后台 worker
+  - worker 先等待 SYSTEM_INBOX_BATCH_WAIT_MS（默认 300ms）攒一批，再由 run_batch
+    拿到会话锁后调用 take() 取出最多 SYSTEM_INBOX_MAX_BATCH（默认 8）条，
+    合并成一条 HumanMessage 运行一次；会话忙碌期间到达的消息都会并入下一批
+  - worker 被取消（用户点停止 / 发新消息 / 删除会话）时丢弃该会话剩余的排队消息，
+    与原先「用户操作打断系统任务」的语义一致
+
+单事件循环使用（mainagent 进程）。
+"""
+
+import asyncio
+import os
+from collections import deque
+from typing import Awaitable, Callable
+
+# 合并多条消息时的分隔
+_SEPARATOR = "\n\n---\n\n"
+
+
+class SystemInbox:
+    """按 thread_id 排队、合并系统触发消息。
+
+    run_batch(thread_id, take) 负责加锁运行 graph：拿到锁后调用 take() 取出本批消息
+    （空列表表示已被清空，直接返回）；被取消时应重新抛出 CancelledError。
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[str, Callable[[], list[str]]], Awaitable[None]],
+        max_batch: int | None = None,
+        batch_wait: float | None = None,
+    ):
+        self._run_batch = run_batch
+        self.max_batch = max(1, max_batch or int(os.getenv("SYSTEM_INBOX_MAX_BATCH", "8")))
+        if batch_wait is None:
+            batch_wait = int(os.getenv("SYSTEM_INBOX_BATCH_WAIT_MS", "300")) / 1000
+        self.batch_wait = max(0.0, batch_wait)
+        self._queues: dict[str, deque[str]] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self.submitted = 0
+        self.runs = 0
+        self.dropped = 0
+
+    def submit(self, thread_id: str, text: str) -> int:
+        """消息入队，必要时启动 worker；返回当前排队数。"""
+        queue = self._queues.setdefault(thread_id, deque())
+        queue.append(text)
+        self.submitted += 1
+        if thread_id not in self._workers:
+            self._workers[thread_id] = asyncio.create_task(self._drain(thread_id))
+        return len(queue)
+
+    def depth(self, thread_id: str) -> int:
+        return len(self._queues.get(thread_id) or ())
+
+    def threads(self, prefix: str = "") -> list[str]:
+        """有排队消息或运行中 worker 的 thread_id。"""
+        return [t for t in {*self._queues, *self._workers} if t.startswith(prefix)]
+
+    def discard(self, thread_id: str) -> int:
+        """丢弃排队消息并取消 worker（删除会话时调用）；返回丢弃条数。"""
+        dropped = len(self._queues.pop(thread_id, None) or ())
+        self.dropped += dropped
+        worker = self._workers.pop(thread_id, None)
+        if worker is not None and not worker.done():
+            worker.cancel()
+        return dropped
+
+    def _take(self, thread_id: str) -> list[str]:
+        queue = self._queues.get(thread_id)
+        if not queue:
+            return []
+        batch = [queue.popleft() for _ in range(min(self.max_batch, len(queue)))]
+        if batch:
+            self.runs += 1
+        return batch
+
+    async def _drain(self, thread_id: str):
+        try:
+            while self._queues.get(thread_id):
+                if self.batch_wait:
+                    await asyncio.sleep(self.batch_wait)
+                try:
+                    await self._run_batch(thread_id, lambda: self._take(thread_id))
+                except Exception as e:
+                    print(f"[SystemInbox] ❌ {thread_id} 批处理异常: {e}")
+        except asyncio.CancelledError:
+            if self._workers.get(thread_id) is not asyncio.current_task():
+                return  # discard() 已清空队列，之后的新消息由新 worker 处理
+            dropped = len(self._queues.pop(thread_id, None) or ())
+            if dropped:
+                self.dropped += dropped
+                print(f"[SystemInbox] 🛑 {thread_id} 已取消，丢弃 {dropped} 条排队消息")
+        finally:
+            if self._workers.get(thread_id) is asyncio.current_task():
+                del self._workers[thread_id]
+                if not self._queues.get(thread_id):
+                    self._queues.pop(thread_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "threads": len(self._workers),
+            "queued": sum(len(q) for q in self._queues.values()),
+            "submitted": self.submitted,
+            "runs": self.runs,
+            "dropped": self.dropped,
+            "max_batch": self.max_batch,
+            "batch_wait_ms": int(self.batch_wait * 1000),
+        }
+
+
+def merge_texts(texts: list[str]) -> str:
+    """一批消息合并为一条 HumanMessage 文本（单条原样返回）。"""
+    if len(texts) == 1:
+        return texts[0]
+    return (
+        _SEPARATOR.join(texts)
+        + f"{_SEPARATOR}(以上 {len(texts)} 条系统消息在你忙碌期间陆续到达，已合并为一次处理，请逐条酌情回应。)"
+    )
@@ -0,0 +1,186 @@
+"""
+Thread registry: 会话锁与会话运行状态的登记表（带空闲回收与按用户索引）
+
+MiniTimeAgent 以前用几张普通 dict 记录每个 thread 的锁、锁来源、待读系统消息数，
+以及每个用户上一次的工具启用状态；条目只增不删，长期运行的进程内存缓慢上涨。
+get_thread_lock 还要先经过一把全局 asyncio.Lock，状态查询要 startswith 扫描全部 thread。
+
+  - 锁放在 WeakValueDictionary 中：只要还有协程持有或等待某个锁，它就一直存在，
+    同一 thread 不会同时出现两把锁；没人引用后自动回收。懒创建过程中没有 await，
+    单事件循环下不需要额外的全局锁
+  - busy_source / pending_system 放在每个 thread 的状态条目里；条目空闲
+    （未被占用、没有未读系统消息、且超过 THREAD_STATE_IDLE_TTL 秒未访问，默认 86400）
+    后由周期性清扫移除。未读计数在用户查看前一直保留
+  - 用户 → thread_id 的二级索引：按用户查询只遍历该用户的会话
+  - 每用户上一次的工具启用状态同样按空闲时间回收
+
+单事件循环使用（mainagent 进程）。
+"""
+
+import asyncio
+import os
+import time
+import weakref
+
+# 两次清扫之间的最短间隔（秒），清扫在访问时顺带进行
+_SWEEP_INTERVAL = 60.0
+
+
+class _ThreadState:
+    __slots__ = ("busy_source", "pending_system", "touched")
+
+    def __init__(self):
+        self.busy_source = ""
+        self.pending_system = 0
+        self.touched = time.monotonic()
+
+
+class ThreadRegistry:
+    """thread_id（"user#session"）→ 锁 + 运行状态；user_id → thread_id 集合。"""
+
+    def __init__(self, idle_ttl: float | None = None):
+        if idle_ttl is None:
+            idle_ttl = float(os.getenv("THREAD_STATE_IDLE_TTL", "86400"))
+        self.idle_ttl = idle_ttl
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._states: dict[str, _ThreadState] = {}
+        self._by_user: dict[str, set[str]] = {}
+        # user_id → (enabled tool names, touched)
+        self._tool_states: dict[str, tuple[frozenset[str], float]] = {}
+        self._last_sweep = time.monotonic()
+        self.evicted = 0
+
+    # ── Index ──
+
+    @staticmethod
+    def _user_of(thread_id: str) -> str:
+        return thread_id.partition("#")[0]
+
+    def _index(self, thread_id: str):
+        self._by_user.setdefault(self._user_of(thread_id), set()).add(thread_id)
+
+    def _unindex(self, thread_id: str):
+        if thread_id in self._states or thread_id in self._locks:
+            return
+        user = self._user_of(thread_id)
+        threads = self._by_user.get(user)
+        if threads is not None:
+            threads.discard(thread_id)
+            if not threads:
+                del self._by_user[user]
+
+    def _lock_collected(self, thread_id: str):
+        # weakref.finalize 回调：锁被回收后 WeakValueDictionary 已不含该键
+        self._unindex(thread_id)
+
+    # ── Locks ──
+
+    def lock(self, thread_id: str) -> asyncio.Lock:
+        """获取 thread 的锁（懒创建）。调用方在使用期间需持有返回的引用。"""
+        lock = self._locks.get(thread_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[thread_id] = lock
+            weakref.finalize(lock, self._lock_collected, thread_id)
+            self._index(thread_id)
+        self._maybe_sweep()
+        return lock
+
+    def is_busy(self, thread_id: str) -> bool:
+        lock = self._locks.get(thread_id)
+        return lock is not None and lock.locked()
+
+    def busy_threads(self) -> set[str]:
+        """当前被占用的 thread_id（只遍历仍存活的锁）。"""
+        return {tid for tid, lock in list(self._locks.items()) if lock.locked()}
+
+    # ── Per-thread state ──
+
+    def _state(self, thread_id: str) -> _ThreadState:
+        state = self._states.get(thread_id)
+        if state is None:
+            state = self._states[thread_id] = _ThreadState()
+            self._index(thread_id)
+        else:
+            state.touched = time.monotonic()
+        return state
+
+    def set_busy_source(self, thread_id: str, source: str):
+        self._state(thread_id).busy_source = source
+
+    def clear_busy_source(self, thread_id: str):
+        state = self._states.get(thread_id)
+        if state is not None:
+            state.busy_source = ""
+            state.touched = time.monotonic()
+
+    def busy_source(self, thread_id: str) -> str:
+        state = self._states.get(thread_id)
+        return state.busy_source if state is not None else ""
+
+    def add_pending(self, thread_id: str):
+        self._state(thread_id).pending_system += 1
+
+    def pending(self, thread_id: str) -> int:
+        state = self._states.get(thread_id)
+        return state.pending_system if state is not None else 0
+
+    def consume_pending(self, thread_id: str) -> int:
+        state = self._states.get(thread_id)
+        if state is None:
+            return 0
+        count, state.pending_system = state.pending_system, 0
+        state.touched = time.monotonic()
+        return count
+
+    def user_threads(self, user_id: str) -> list[str]:
+        """该用户已登记的 thread_id（有锁或有状态条目）。"""
+        return list(self._by_user.get(user_id, ()))
+
+    # ── Per-user tool state ──
+
+    def last_tool_state(self, user_id: str) -> frozenset[str] | None:
+        entry = self._tool_states.get(user_id)
+        return entry[0] if entry is not None else None
+
+    def set_tool_state(self, user_id: str, enabled: frozenset[str]):
+        self._tool_states[user_id] = (enabled, time.monotonic())
+        self._maybe_sweep()
+
+    # ── Eviction ──
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= _SWEEP_INTERVAL:
+            self._last_sweep = now
+            self.sweep(now)
+
+    def sweep(self, now: float | None = None) -> int:
+        """移除空闲超过 idle_ttl 的状态条目与工具状态，返回移除数。
+
+        有未读系统消息（pending_system > 0）的条目不回收，否则未读计数会丢失。
+        """
+        now = time.monotonic() if now is None else now
+        cutoff = now - self.idle_ttl
+        stale = [
+            tid for tid, state in self._states.items()
+            if state.touched < cutoff and not state.pending_system and not self.is_busy(tid)
+        ]
+        for tid in stale:
+            del self._states[tid]
+            self._unindex(tid)
+        stale_users = [u for u, (_, touched) in self._tool_states.items() if touched < cutoff]
+        for user in stale_users:
+            del self._tool_states[user]
+        self.evicted += len(stale) + len(stale_users)
+        return len(stale) + len(stale_users)
+
+    def stats(self) -> dict:
+        return {
+            "locks": len(self._locks),
+            "states": len(self._states),
+            "users": len(self._by_user),
+            "tool_states": len(self._tool_states),
+            "evicted": self.evicted,
+            "idle_ttl": self.idle_ttl,
+        }
@@ -8,13 +8,14 @@ from typing import List, Optional
 from datetime import datetime
 from contextlib import asynccontextmanager
 
-import httpx
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import uvicorn
 from dotenv import load_dotenv
 
+from http_pool import aclose_http_pool, get_client
+
 # --- 路径配置 ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
 root_dir = os.path.dirname(current_dir)
@@ -74,16 +75,15 @@ INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN", "")
 
 async def trigger_agent(user_id: str, text: str, session_id: str = "default"):
     """到达定时时间，向 Agent 发送 HTTP 请求"""
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.post(AGENT_URL, json={
-                "user_id": user_id,
-                "text": text,
-                "session_id": session_id,
-            }, headers={"X-Internal-Token": INTERNAL_TOKEN}, timeout=10.0)
-            print(f"[{datetime.now()}] 任务触发：用户={user_id}, session={session_id}, 状态码={resp.status_code}")
-        except Exception as e:
-            print(f"[{datetime.now()}] 任务触发失败: {e}")
+    try:
+        resp = await get_client(AGENT_URL).post(AGENT_URL, json={
+            "user_id": user_id,
+            "text": text,
+            "session_id": session_id,
+        }, headers={"X-Internal-Token": INTERNAL_TOKEN}, timeout=10.0)
+        print(f"[{datetime.now()}] 任务触发：用户={user_id}, session={session_id}, 状态码={resp.status_code}")
+    except Exception as e:
+        print(f"[{datetime.now()}] 任务触发失败: {e}")
 
 def restore_tasks():
     """从 JSON 文件恢复所有定时任务到调度器"""
@@ -120,6 +120,7 @@ async def lifespan(app: FastAPI):
     yield
     print("定时调度中心关闭...")
     scheduler.shutdown()
+    await aclose_http_pool()
 
 app = FastAPI(title="TeamBot Scheduler", lifespan=lifespan)
 
@@ -0,0 +1,191 @@
+"""
+Tool result cache: 幂等工具的结果缓存 + 并发相同调用合并（single-flight）
+
+UserAwareToolNode 执行工具前按 (工具名, 规范化参数) 查缓存：
+
+  - 仅对 TOOL_CACHE_TTLS 中登记的工具生效（按工具设置 TTL 秒，0 关闭），
+    环境变量 TOOL_CACHE_TTLS（JSON）覆盖默认值，TOOL_CACHE_SIZE 限制条目数（LRU）
+  - 同一时刻的相同调用只执行一次，其余调用等待并复用结果
+    （OASIS all_experts 轮次中多个专家几乎同时发起相同搜索）
+  - 只缓存成功结果（不缓存 "⚠️"/"❌" 开头的错误文本）
+  - 可缓存工具都声明了可选参数 refresh（默认 false，工具本身忽略它）：
+    refresh=true 时跳过缓存并刷新；该参数在执行前剥离，不参与缓存键
+  - 写类工具会使同一用户相关的只读工具缓存失效（如 write_file → list_files）
+
+参数中包含 username 的工具，缓存天然按用户隔离。
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from langchain_core.messages import ToolMessage
+
+# 默认可缓存的工具及 TTL（秒）
+DEFAULT_TTLS = {
+    "web_search": 600,
+    "web_news": 300,
+    "list_files": 30,
+    "list_oasis_experts": 60,
+    "list_oasis_workflows": 60,
+    "list_allowed_commands": 3600,
+}
+
+# 写类工具 → 需要失效的只读工具（同一 username）
+INVALIDATES = {
+    "write_file": ("list_files",),
+    "append_file": ("list_files",),
+    "delete_file": ("list_files",),
+    "run_command": ("list_files",),
+    "run_python_code": ("list_files",),
+    "add_oasis_expert": ("list_oasis_experts",),
+    "update_oasis_expert": ("list_oasis_experts",),
+    "delete_oasis_expert": ("list_oasis_experts",),
+    "set_oasis_workflow": ("list_oasis_workflows",),
+}
+
+REFRESH_ARG = "refresh"
+
+# 工具内部捕获异常后以这些前缀返回错误文本（如 "⚠️ 搜索失败"），不缓存
+_FAILURE_PREFIXES = ("⚠️", "❌")
+
+
+def _canonical_args(args: dict) -> str:
+    return json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class _ToolCounters:
+    __slots__ = ("hits", "misses", "coalesced", "bypass")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypass = 0
+
+
+class ToolResultCache:
+    """进程内的工具结果缓存（单事件循环使用）。"""
+
+    def __init__(self, ttls: dict[str, float] | None = None, max_entries: int | None = None):
+        if ttls is None:
+            ttls = dict(DEFAULT_TTLS)
+            try:
+                ttls.update(json.loads(os.getenv("TOOL_CACHE_TTLS", "") or "{}"))
+            except ValueError:
+                print("[tools] ⚠️ TOOL_CACHE_TTLS 不是合法 JSON，已忽略")
+        self.ttls = {k: float(v) for k, v in ttls.items() if float(v) > 0}
+        self.max_entries = max_entries or int(os.getenv("TOOL_CACHE_SIZE", "512"))
+        # key -> (expires_at, ToolMessage)
+        self._entries: OrderedDict[tuple[str, str], tuple[float, ToolMessage]] = OrderedDict()
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+        self._counters: dict[str, _ToolCounters] = {}
+        self.evictions = 0
+
+    def _count(self, name: str) -> _ToolCounters:
+        c = self._counters.get(name)
+        if c is None:
+            c = self._counters[name] = _ToolCounters()
+        return c
+
+    @staticmethod
+    def _reply(msg: ToolMessage, tc: dict) -> ToolMessage:
+        """把缓存的结果改写为当前 tool_call 的 ToolMessage。"""
+        return msg.model_copy(update={"tool_call_id": tc["id"], "id": None})
+
+    def invalidate(self, tool_name: str, args: dict):
+        """写类工具执行后，清除同一用户相关只读工具的缓存。"""
+        targets = INVALIDATES.get(tool_name)
+        if not targets:
+            return
+        username = args.get("username")
+        for key in [k for k in self._entries if k[0] in targets]:
+            if username is None or json.loads(key[1]).get("username") == username:
+                del self._entries[key]
+
+    async def call(self, tc: dict, run: Callable[[dict], Awaitable[ToolMessage]]) -> ToolMessage:
+        """通过缓存执行一个 tool_call；不可缓存的工具直接执行。"""
+        name = tc["name"]
+        ttl = self.ttls.get(name)
+        if ttl is None:
+            msg = await run(tc)
+            self.invalidate(name, tc.get("args") or {})
+            return msg
+
+        args = dict(tc.get("args") or {})
+        refresh = bool(args.pop(REFRESH_ARG, False))
+        tc = {**tc, "args": args}
+        key = (name, _canonical_args(args))
+        counters = self._count(name)
+        now = time.monotonic()
+
+        if refresh:
+            counters.bypass += 1
+        else:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    counters.hits += 1
+                    return self._reply(entry[1], tc)
+                del self._entries[key]
+            pending = self._inflight.get(key)
+            if pending is not None:
+                try:
+                    result = await asyncio.shield(pending)
+                except asyncio.CancelledError:
+                    if not pending.cancelled():
+                        raise
+                    # 发起者被取消（例如所在会话被终止）：自行执行
+                else:
+                    counters.coalesced += 1
+                    return self._reply(result, tc)
+
+        counters.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            msg = await run(tc)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 没有等待者时避免 "exception was never retrieved"
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        future.set_result(msg)
+        content = msg.content if isinstance(msg.content, str) else ""
+        if getattr(msg, "status", "success") != "error" and not content.lstrip().startswith(_FAILURE_PREFIXES):
+            self._entries[key] = (time.monotonic() + ttl, msg)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return msg
+
+    def stats(self) -> dict:
+        tools = {}
+        for name, c in sorted(self._counters.items()):
+            lookups = c.hits + c.misses + c.coalesced
+            tools[name] = {
+                "ttl": self.ttls.get(name),
+                "hits": c.hits,
+                "coalesced": c.coalesced,
+                "misses": c.misses,
+                "bypass": c.bypass,
+                "hit_rate": round((c.hits + c.coalesced) / lookups, 3) if lookups else None,
+            }
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "evictions": self.evictions,
+            "tools": tools,
+        }
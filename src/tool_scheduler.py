@@ -0,0 +1,129 @@
+"""
+Tool scheduler: 一批 tool_calls 的并发执行
+
+LLM 一次返回多个 tool_calls 时，UserAwareToolNode 通过 ToolScheduler 并发执行：
+
+  - 批内并发上限           TOOL_BATCH_PARALLEL（默认 8）
+  - 单用户单工具并发上限   TOOL_USER_CONCURRENCY（默认 4），TOOL_USER_LIMITS 按工具覆盖（JSON）
+                           有副作用的文件/命令工具默认每用户串行
+  - 单工具超时             TOOL_TIMEOUT（默认 180s），TOOL_TIMEOUTS 按工具覆盖（JSON）
+                           超时的调用返回错误 ToolMessage，其余调用结果照常返回
+
+跨用户的单工具全局并发上限由 mcp_host.ToolGovernor 负责（MCP_TOOL_CONCURRENCY）。
+结果顺序与 tool_calls 顺序一致；每个调用的排队/执行耗时通过 timing 字典返回。
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable
+
+from langchain_core.messages import ToolMessage
+
+# 每用户默认串行的工具（写文件 / 执行命令，避免同一用户工作区内互相踩踏）
+USER_SERIAL_TOOLS = {
+    "write_file", "append_file", "delete_file",
+    "run_command", "run_python_code",
+}
+
+
+def _json_env(key: str) -> dict:
+    try:
+        value = json.loads(os.getenv(key, "") or "{}")
+    except ValueError:
+        print(f"[tools] ⚠️ {key} 不是合法 JSON，已忽略")
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+class _UserSlot:
+    """某用户某工具的信号量（引用计数为 0 时回收）。"""
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.refs = 0
+
+
+class ToolScheduler:
+    """按批并发执行 tool_calls，带每用户并发上限与超时。"""
+
+    def __init__(self):
+        self.batch_parallel = max(1, int(os.getenv("TOOL_BATCH_PARALLEL", "8")))
+        self.user_limit = max(1, int(os.getenv("TOOL_USER_CONCURRENCY", "4")))
+        self.user_limits = {name: 1 for name in USER_SERIAL_TOOLS}
+        self.user_limits.update({k: max(1, int(v)) for k, v in _json_env("TOOL_USER_LIMITS").items()})
+        self.timeout = float(os.getenv("TOOL_TIMEOUT", "180"))
+        self.timeouts = {k: float(v) for k, v in _json_env("TOOL_TIMEOUTS").items()}
+        self._user_slots: dict[tuple[str, str], _UserSlot] = {}
+
+    def timeout_for(self, tool_name: str) -> float | None:
+        t = self.timeouts.get(tool_name, self.timeout)
+        return t if t > 0 else None
+
+    def _acquire_slot(self, user_id: str, tool_name: str) -> _UserSlot:
+        key = (user_id, tool_name)
+        slot = self._user_slots.get(key)
+        if slot is None:
+            slot = self._user_slots[key] = _UserSlot(self.user_limits.get(tool_name, self.user_limit))
+        slot.refs += 1
+        return slot
+
+    def _release_slot(self, user_id: str, tool_name: str, slot: _UserSlot):
+        slot.refs -= 1
+        if slot.refs == 0 and self._user_slots.get((user_id, tool_name)) is slot:
+            del self._user_slots[(user_id, tool_name)]
+
+    async def _run_one(self, tc: dict, user_id: str, batch_sem: asyncio.Semaphore,
+                       run: Callable[[dict], Awaitable[ToolMessage]]) -> tuple[ToolMessage, dict]:
+        name = tc["name"]
+        queued = time.perf_counter()
+        slot = self._acquire_slot(user_id, name)
+        status = "success"
+        try:
+            async with batch_sem, slot.semaphore:
+                started = time.perf_counter()
+                timeout = self.timeout_for(name)
+                try:
+                    msg = await asyncio.wait_for(run(tc), timeout)
+                    if getattr(msg, "status", "success") == "error":
+                        status = "error"
+                except asyncio.TimeoutError:
+                    status = "timeout"
+                    print(f">>> [tools] ⏱️ 工具超时: {name} ({timeout:g}s)")
+                    msg = ToolMessage(
+                        content=f"⏱️ 工具 '{name}' 执行超时（{timeout:g}s），已取消。本批次其他工具的结果不受影响。",
+                        name=name,
+                        tool_call_id=tc["id"],
+                        status="error",
+                    )
+                finished = time.perf_counter()
+        finally:
+            self._release_slot(user_id, name, slot)
+
+        timing = {
+            "name": name,
+            "tool_call_id": tc["id"],
+            "status": status,
+            "queue_ms": round((started - queued) * 1000, 1),
+            "run_ms": round((finished - started) * 1000, 1),
+        }
+        return msg, timing
+
+    async def run_batch(self, calls: list[dict], user_id: str,
+                        run: Callable[[dict], Awaitable[ToolMessage]]) -> list[tuple[ToolMessage, dict]]:
+        """并发执行 calls，按原顺序返回 [(ToolMessage, timing), ...]。"""
+        batch_sem = asyncio.Semaphore(self.batch_parallel)
+        return list(await asyncio.gather(
+            *(self._run_one(tc, user_id, batch_sem, run) for tc in calls)
+        ))
+
+    def stats(self) -> dict:
+        return {
+            "batch_parallel": self.batch_parallel,
+            "user_limit": self.user_limit,
+            "user_limits": self.user_limits,
+            "timeout": self.timeout,
+            "timeouts": self.timeouts,
+            "active_user_slots": len(self._user_slots),
+        }
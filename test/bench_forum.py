@@ -0,0 +1,149 @@
+"""
+论坛帖子存储微基准：旧的线性扫描（_find / browse 过滤 / get_top_posts 全排序）对比索引实现
+模拟多专家多轮讨论（每轮每位专家发一帖并投若干票），帖子数每增长一段就在当前规模下
+测量一组典型读操作（每位专家 browse + 投票查找 + top-N），并校验两者结果一致。
+用法: python test/bench_forum.py [--posts 10000] [--experts 50] [--votes 3]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from oasis.forum import DiscussionForum
+
+
+# ── 旧实现（逐字照搬索引化之前的算法）──
+
+def _ref_find(posts, post_id):
+    return next((p for p in posts if p.id == post_id), None)
+
+
+def _ref_browse(posts, viewer=None, exclude_self=False, visible_authors=None, from_round=None):
+    result = list(posts)
+    if exclude_self and viewer:
+        result = [p for p in result if p.author != viewer]
+    if visible_authors is not None:
+        result = [p for p in result if p.author in visible_authors]
+    if from_round is not None:
+        result = [p for p in result if p.round_num >= from_round]
+    return result
+
+
+def _ref_top(posts, n):
+    return sorted(posts, key=lambda p: p.upvotes - p.downvotes, reverse=True)[:n]
+
+
+def _ids(posts) -> list[int]:
+    return [p.id for p in posts]
+
+
+# 一次探测 = 每位专家: browse(exclude_self) 取 len / 最后一帖、按作者集合 browse、
+# 按轮次 browse、votes 次按 id 查帖；最后取一次 top-5。计时只覆盖这些调用本身，
+# 结果转成 id 列表做比对放在计时之外。
+
+def _probe_ref(forum, experts, rng_seed, votes):
+    rng = random.Random(rng_seed)
+    posts = forum.posts
+    out = []
+    for name in experts:
+        others = _ref_browse(posts, viewer=name, exclude_self=True)
+        visible = set(rng.sample(experts, 5))
+        out.append((len(others), others[-1].id if others else None))
+        out.append(_ref_browse(posts, visible_authors=visible))
+        out.append(_ref_browse(posts, viewer=name, exclude_self=True,
+                               from_round=forum.current_round - 1))
+        for _ in range(votes):
+            out.append(_ref_find(posts, rng.randint(1, len(posts))))
+    out.append(_ref_top(posts, 5))
+    return out
+
+
+async def _probe_new(forum, experts, rng_seed, votes):
+    rng = random.Random(rng_seed)
+    out = []
+    for name in experts:
+        others = await forum.browse(viewer=name, exclude_self=True)
+        visible = set(rng.sample(experts, 5))
+        out.append((len(others), others[-1].id if others else None))
+        out.append(await forum.browse(visible_authors=visible))
+        out.append(await forum.browse(viewer=name, exclude_self=True,
+                                      from_round=forum.current_round - 1))
+        for _ in range(votes):
+            out.append(forum._find(rng.randint(1, len(forum.posts))))
+    out.append(await forum.get_top_posts(5))
+    return out
+
+
+def _normalize(results: list) -> list:
+    out = []
+    for r in results:
+        if r is None or isinstance(r, tuple):
+            out.append(r)
+        elif hasattr(r, "id"):
+            out.append(r.id)
+        else:
+            out.append(_ids(r))
+    return out
+
+
+async def run(args):
+    rng = random.Random(42)
+    experts = [f"专家{i}#temp#{i}" for i in range(args.experts)]
+    forum = DiscussionForum("bench", "基准测试问题", max_rounds=10 ** 6)
+
+    full_total = idx_total = 0.0
+    probes = 0
+    print(f"{'posts':>7} {'linear ms/probe':>16} {'indexed ms/probe':>17} {'speedup':>8}")
+    while len(forum.posts) < args.posts:
+        forum.current_round += 1
+        for name in experts:
+            if len(forum.posts) >= args.posts:
+                break
+            post = await forum.publish(name, f"第 {forum.current_round} 轮 {name} 的观点")
+            for _ in range(args.votes):
+                await forum.vote(name, rng.randint(1, post.id), rng.choice(("up", "up", "down")))
+
+            if len(forum.posts) % args.report_every == 0:
+                seed = len(forum.posts)
+                t0 = time.perf_counter()
+                expected = _probe_ref(forum, experts, seed, args.votes)
+                t1 = time.perf_counter()
+                got = await _probe_new(forum, experts, seed, args.votes)
+                t2 = time.perf_counter()
+                if _normalize(expected) != _normalize(got):
+                    print(f"❌ {len(forum.posts)} 帖时结果不一致")
+                    sys.exit(1)
+                full_total += t1 - t0
+                idx_total += t2 - t1
+                probes += 1
+                print(f"{len(forum.posts):>7} {(t1 - t0) * 1000:>16.2f} {(t2 - t1) * 1000:>17.2f} "
+                      f"{(t1 - t0) / max(t2 - t1, 1e-9):>7.1f}x")
+
+    # 从快照恢复后索引应与原论坛一致
+    restored = DiscussionForum.from_dict(forum.to_dict())
+    if (_normalize(await _probe_new(restored, experts, 7, args.votes))
+            != _normalize(_probe_ref(forum, experts, 7, args.votes))):
+        print("❌ from_dict 恢复后索引结果不一致")
+        sys.exit(1)
+
+    print(f"\n✅ 结果一致；{len(forum.posts)} 帖 / {args.experts} 位专家，{probes} 次探测，"
+          f"线性 {full_total * 1000:.1f} ms，索引 {idx_total * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--experts", type=int, default=50)
+    parser.add_argument("--votes", type=int, default=3, help="每次发言投票数")
+    parser.add_argument("--report-every", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
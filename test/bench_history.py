@@ -0,0 +1,115 @@
+"""
+消息预处理微基准：全量 _sanitize_messages + _strip_multimodal_parts 对比增量 _prepare_history
+模拟一个会话逐轮增长，每轮（含工具循环的多次 chatbot 调用）测量预处理耗时，并校验两者输出一致。
+用法: python test/bench_history.py [--turns 1000] [--tool-rounds 2]
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import logging
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+
+from agent import MiniTimeAgent
+
+
+def _human(i: int) -> HumanMessage:
+    if i % 10 == 0:
+        # 每 10 轮带一张图片，触发多模态清理
+        content = [
+            {"type": "text", "text": f"第 {i} 轮：请看这张图"},
+            {"type": "image_url", "image_url": {"url": "data:image/png;base64," + "A" * 2000}},
+        ]
+    else:
+        content = f"第 {i} 轮用户消息：" + "内容" * 50
+    return HumanMessage(content=content, id=str(uuid.uuid4()))
+
+
+def _tool_round(i: int, r: int) -> list:
+    call_id = f"call_{i}_{r}"
+    return [
+        AIMessage(content="", id=str(uuid.uuid4()), tool_calls=[
+            {"id": call_id, "name": "list_files", "args": {"path": f"/tmp/{i}/{r}"}},
+        ]),
+        ToolMessage(content="file_a\nfile_b\n" * 20, tool_call_id=call_id, id=str(uuid.uuid4())),
+    ]
+
+
+def _full(messages: list) -> list:
+    out = MiniTimeAgent._sanitize_messages(messages, set())
+    if len(out) > 1:
+        out = MiniTimeAgent._strip_multimodal_parts(out[:-1]) + [out[-1]]
+    return out
+
+
+def _same(a: list, b: list) -> bool:
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if type(x) is not type(y) or x.content != y.content:
+            return False
+        if getattr(x, "tool_calls", None) != getattr(y, "tool_calls", None):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--tool-rounds", type=int, default=2, help="每轮工具循环次数")
+    parser.add_argument("--report-every", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # 屏蔽 sanitize 的悬空 tool_calls 告警
+
+    agent = MiniTimeAgent.__new__(MiniTimeAgent)
+    agent._history_cache = OrderedDict()
+
+    history: list = []
+    full_total = incr_total = 0.0
+    calls = 0
+    print(f"{'turn':>6} {'msgs':>7} {'full ms/call':>13} {'incr ms/call':>13}")
+    for i in range(1, args.turns + 1):
+        history.append(_human(i))
+        window_full = window_incr = 0.0
+        window_calls = 0
+        for r in range(args.tool_rounds + 1):
+            t0 = time.perf_counter()
+            expected = _full(history)
+            t1 = time.perf_counter()
+            got = agent._prepare_history("bench#1", history)
+            t2 = time.perf_counter()
+            if not _same(expected, got):
+                print(f"❌ 第 {i} 轮第 {r} 次调用输出不一致")
+                sys.exit(1)
+            window_full += t1 - t0
+            window_incr += t2 - t1
+            window_calls += 1
+            if r < args.tool_rounds:
+                history.extend(_tool_round(i, r))
+        if i % 50 == 0:
+            # 模拟被终止的一轮：tool_calls 没有对应 ToolMessage（中间悬空，需剥离）
+            history.append(AIMessage(content="", id=str(uuid.uuid4()), tool_calls=[
+                {"id": f"call_{i}_cancelled", "name": "web_search", "args": {"q": str(i)}},
+            ]))
+        else:
+            history.append(AIMessage(content=f"第 {i} 轮回答", id=str(uuid.uuid4())))
+
+        full_total += window_full
+        incr_total += window_incr
+        calls += window_calls
+        if i % args.report_every == 0:
+            print(f"{i:>6} {len(history):>7} "
+                  f"{window_full / window_calls * 1000:>13.3f} {window_incr / window_calls * 1000:>13.3f}")
+
+    print(f"\n✅ 输出一致；共 {calls} 次调用，"
+          f"全量 {full_total * 1000:.1f} ms，增量 {incr_total * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Admission 嵌套调用检查：send_internal_message(wait=True) 的子运行借用父运行的槽位，
+嵌套深度 / 并发等待的会话数超过每用户上限时也不会互相卡死。
+用法: python test/check_admission_nested.py
+"""
+
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from admission import AdmissionScheduler
+
+MAX_PER_USER = 2
+DEPTH = 6          # 链式调用 A→B→C→…，深于每用户上限
+FAN = 4            # 同一用户同时有 4 个会话各自同步等待一个子会话
+
+
+async def _run(sched: AdmissionScheduler, thread_id: str, depth: int, parent: str | None = None) -> int:
+    async with sched.slot("alice", "interactive", thread_id=thread_id, parent=parent):
+        if depth == 0:
+            await asyncio.sleep(0.01)
+            return 1
+        # 持有槽位期间同步等待子会话（等价于 wait=True 的 /v1/chat/completions 调用）
+        return 1 + await _run(sched, f"{thread_id}>{depth}", depth - 1, parent=thread_id)
+
+
+async def main():
+    sched = AdmissionScheduler(max_concurrent=8, max_per_user=MAX_PER_USER, max_queue=64)
+
+    depth = await asyncio.wait_for(_run(sched, "alice#chain", DEPTH), 5)
+    assert depth == DEPTH + 1, depth
+
+    runs = await asyncio.wait_for(
+        asyncio.gather(*(_run(sched, f"alice#s{i}", 1) for i in range(FAN))), 5)
+    assert runs == [2] * FAN, runs
+
+    stats = sched.stats()
+    assert stats["running"] == 0 and stats["holders"] == 0, stats
+    assert stats["borrowed"]["interactive"] == DEPTH + FAN, stats
+    assert not stats["running_by_user"], stats
+
+    # 没有 parent 的请求仍受每用户上限约束
+    sched = AdmissionScheduler(max_concurrent=8, max_per_user=MAX_PER_USER, max_queue=64)
+    gate = asyncio.Event()
+
+    async def _hold(i: int):
+        async with sched.slot("alice", "interactive", thread_id=f"alice#h{i}"):
+            await gate.wait()
+
+    tasks = [asyncio.create_task(_hold(i)) for i in range(MAX_PER_USER + 1)]
+    await asyncio.sleep(0.05)
+    assert sched.running == MAX_PER_USER and sched.queued() == 1, sched.stats()
+    gate.set()
+    await asyncio.wait_for(asyncio.gather(*tasks), 5)
+    assert sched.running == 0
+
+    print(f"✅ 嵌套 {DEPTH} 层 / {FAN} 个会话并发等待均未卡住（每用户上限 {MAX_PER_USER}）")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+滚动摘要与流式输出隔离检查：触发上下文预算的一轮，astream_events 只应流出助手回复的 token
+（摘要调用的 token 不能进入客户端、collected_tokens 或 SessionExpert 的草稿）。
+用 fake 流式模型搭一个单节点 graph，节点内先走 _apply_context_budget 再生成回复，
+按 mainagent._stream_worker 的规则收集 on_chat_model_stream。
+用法: python test/check_context_stream.py
+"""
+
+import os
+import sys
+import uuid
+import asyncio
+from typing import Annotated, Optional, TypedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+import context_budget
+from agent import MiniTimeAgent
+from llm_factory import extract_text
+
+SUMMARY_TEXT = "摘要：用户在讨论第一到第二十轮的内容"
+REPLY_TEXT = "这是本轮的助手回复"
+
+
+class _State(TypedDict):
+    messages: Annotated[list, add_messages]
+    context_budget: Optional[int]
+    context_summary: Optional[dict]
+
+
+def _history(turns: int) -> list:
+    out = []
+    for i in range(1, turns + 1):
+        out.append(HumanMessage(content=f"第 {i} 轮用户消息：" + "内容" * 100, id=str(uuid.uuid4())))
+        out.append(AIMessage(content=f"第 {i} 轮回答：" + "回答" * 100, id=str(uuid.uuid4())))
+    out.append(HumanMessage(content="继续", id=str(uuid.uuid4())))
+    return out
+
+
+async def main():
+    agent = MiniTimeAgent.__new__(MiniTimeAgent)
+    agent._prompts = {}
+    summary_model = GenericFakeChatModel(messages=iter([AIMessage(content=SUMMARY_TEXT)]))
+    reply_model = GenericFakeChatModel(messages=iter([AIMessage(content=REPLY_TEXT)]))
+    agent._get_model = lambda: summary_model
+
+    async def chatbot(state: _State):
+        history, summary, changed = await agent._apply_context_budget(state, False)
+        assert changed and summary["text"] == SUMMARY_TEXT, "本轮应触发滚动摘要"
+        response = await reply_model.ainvoke(history)
+        return {"messages": [response], "context_summary": summary}
+
+    graph = StateGraph(_State)
+    graph.add_node("chatbot", chatbot)
+    graph.add_edge(START, "chatbot")
+    graph.add_edge("chatbot", END)
+    app = graph.compile()
+
+    collected_tokens: list[str] = []
+    tagged = 0
+    user_input = {"messages": _history(20), "context_budget": 2000, "context_summary": None}
+    async for event in app.astream_events(user_input, version="v2"):
+        if event.get("event") != "on_chat_model_stream":
+            continue
+        if context_budget.SUMMARY_TAG in (event.get("tags") or ()):
+            tagged += 1
+            continue
+        chunk = event.get("data", {}).get("chunk")
+        if chunk and chunk.content:
+            collected_tokens.append(extract_text(chunk.content))
+
+    streamed = "".join(collected_tokens)
+    if streamed != REPLY_TEXT:
+        print(f"❌ 流式输出混入了非回复内容: {streamed!r}")
+        sys.exit(1)
+    print(f"✅ 只流出了助手回复（摘要事件 {tagged} 个，已在节点内断开回调）")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())